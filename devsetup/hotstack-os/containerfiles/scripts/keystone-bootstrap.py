@@ -19,16 +19,19 @@ Keystone Bootstrap Script
 
 Efficiently manages Keystone resources (services, users, roles, endpoints) with
 proper retry logic and duplicate handling. Much faster than using the openstack
-CLI repeatedly since it loads Python and libraries only once.
+CLI repeatedly since it loads Python and libraries only once, lists each kind
+of resource once and creates the missing resources concurrently.
 """
 
 import argparse
 import json
 import logging
 import os
+import random
 import sys
 import time
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Set, Tuple
 
 from keystoneauth1 import session
 from keystoneauth1.identity import v3
@@ -41,7 +44,12 @@ LOG = logging.getLogger(__name__)
 
 
 class KeystoneBootstrap:
-    """Handles Keystone resource bootstrapping with retry logic."""
+    """Handles Keystone resource bootstrapping with retry logic.
+
+    The existing resources are listed once, then the missing ones are created
+    concurrently, in three rounds: domains, roles and the service, then users
+    and endpoints, then role assignments.
+    """
 
     def __init__(
         self,
@@ -52,6 +60,7 @@ class KeystoneBootstrap:
         user_domain_name: str = "Default",
         project_domain_name: str = "Default",
         max_retries: int = 5,
+        workers: int = 8,
     ):
         """Initialize Keystone client with authentication.
 
@@ -62,9 +71,21 @@ class KeystoneBootstrap:
         :param user_domain_name: User domain name
         :param project_domain_name: Project domain name
         :param max_retries: Maximum number of retries for transient failures
+        :param workers: Maximum number of concurrent Keystone requests
         """
         self.max_retries = max_retries
-        self.retry_delay = 2  # seconds
+        self.retry_delay = 1  # seconds, doubled on every retry
+        self.max_retry_delay = 16  # seconds
+        self.workers = workers
+
+        # Existing resources, loaded by load_state()
+        self.domains: Dict[str, str] = {}
+        self.users: Dict[Tuple[str, str], str] = {}
+        self.roles: Dict[str, str] = {}
+        self.projects: Dict[str, str] = {}
+        self.services: Dict[str, str] = {}
+        self.endpoints: Set[Tuple[str, str, str]] = set()
+        self.assignments: Set[Tuple[str, str, str, str]] = set()
 
         auth = v3.Password(
             auth_url=auth_url,
@@ -80,6 +101,9 @@ class KeystoneBootstrap:
     def _retry_operation(self, operation, operation_name: str, *args, **kwargs):
         """Execute an operation with retry logic for transient failures.
 
+        Retries back off exponentially with jitter, so that the services
+        bootstrapping at the same time do not retry in lockstep.
+
         :param operation: Callable to execute
         :param operation_name: Name of the operation for logging
         :returns: Result of the operation
@@ -97,13 +121,14 @@ class KeystoneBootstrap:
             ) as e:
                 last_exception = e
                 if attempt < self.max_retries - 1:
+                    delay = min(self.retry_delay * 2**attempt, self.max_retry_delay)
                     LOG.warning(
                         "%s attempt %d failed: %s, retrying...",
                         operation_name,
                         attempt + 1,
                         e,
                     )
-                    time.sleep(self.retry_delay)
+                    time.sleep(random.uniform(delay / 2, delay))
                 else:
                     LOG.error(
                         "ERROR: %s failed after %d attempts",
@@ -111,6 +136,9 @@ class KeystoneBootstrap:
                         self.max_retries,
                     )
                     raise
+            except keystone_exceptions.Conflict:
+                # Created concurrently, handled by the caller
+                raise
             except Exception as e:
                 # For non-transient errors, fail immediately
                 LOG.error("ERROR: %s failed: %s", operation_name, e)
@@ -119,317 +147,316 @@ class KeystoneBootstrap:
         if last_exception:
             raise last_exception
 
-    def ensure_user(self, username: str, password: str, domain: str = "default") -> str:
-        """Ensure user exists, return user ID.
+    def _run_concurrently(self, operations: List[Tuple[str, Any]]) -> None:
+        """Run operations concurrently, each with retry logic.
 
-        :param username: Username to create or verify
-        :param password: User password
-        :param domain: Domain name
-        :returns: User ID
+        :param operations: List of (operation name, callable) tuples
+        :raises: First exception raised by an operation, once all completed
         """
-        LOG.info("Ensuring %s user exists...", username)
-
-        def check_user():
-            domain_obj = self.keystone.domains.list(name=domain)[0]
-            users = self.keystone.users.list(name=username, domain=domain_obj.id)
-            return users[0] if users else None
-
-        user = self._retry_operation(check_user, f"Check user {username}")
-
-        if user:
-            LOG.info("User already exists")
-            return user.id
-
-        LOG.info("Creating %s user...", username)
-
-        def create_user():
-            domain_obj = self.keystone.domains.list(name=domain)[0]
-            return self.keystone.users.create(
-                name=username, password=password, domain=domain_obj.id
-            )
-
-        user = self._retry_operation(create_user, f"Create user {username}")
-        LOG.info("User created successfully")
-        return user.id
-
-    def ensure_domain(self, domain_name: str, description: str) -> str:
-        """Ensure domain exists, return domain ID.
+        if not operations:
+            return
 
-        :param domain_name: Domain name to create or verify
-        :param description: Domain description
-        :returns: Domain ID
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self._retry_operation, operation, name)
+                for name, operation in operations
+            ]
+        for future in futures:
+            future.result()
+
+    def _create(self, description: str, create, find) -> str:
+        """Create a resource, return its ID.
+
+        :param description: Resource description for logging
+        :param create: Callable creating the resource
+        :param find: Callable finding the resource, if it was created
+                     concurrently by another service
+        :returns: Resource ID
         """
-        LOG.info("Ensuring %s domain exists...", domain_name)
-
-        def check_domain():
-            domains = self.keystone.domains.list(name=domain_name)
-            return domains[0] if domains else None
-
-        domain = self._retry_operation(check_domain, f"Check domain {domain_name}")
-
-        if domain:
-            LOG.info("Domain already exists")
-            return domain.id
-
-        LOG.info("Creating %s domain...", domain_name)
-
-        def create_domain():
-            return self.keystone.domains.create(
-                name=domain_name, description=description, enabled=True
-            )
-
-        domain = self._retry_operation(create_domain, f"Create domain {domain_name}")
-        LOG.info("Domain created successfully")
-        return domain.id
+        LOG.info("Creating %s...", description)
+        try:
+            resource = create()
+        except keystone_exceptions.Conflict:
+            LOG.info("%s already exists", description.capitalize())
+            resource = find()
+        return resource.id
+
+    def load_state(self) -> None:
+        """List the existing Keystone resources, each with a single request."""
+        LOG.info("Loading existing Keystone resources...")
+        listings = {
+            "domains": self.keystone.domains.list,
+            "users": self.keystone.users.list,
+            "roles": self.keystone.roles.list,
+            "projects": self.keystone.projects.list,
+            "services": self.keystone.services.list,
+            "endpoints": self.keystone.endpoints.list,
+            "role assignments": self.keystone.role_assignments.list,
+        }
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                key: executor.submit(self._retry_operation, listing, f"List {key}")
+                for key, listing in listings.items()
+            }
+        state = {key: future.result() for key, future in futures.items()}
+
+        # Names are matched case-insensitively like the Keystone database does,
+        # the domain named Default is referred to as default
+        self.domains = {x.name.lower(): x.id for x in state["domains"]}
+        self.users = {(x.domain_id, x.name): x.id for x in state["users"]}
+        self.roles = {x.name: x.id for x in state["roles"]}
+        for project in state["projects"]:
+            self.projects.setdefault(project.name, project.id)
+        self.services = {x.name: x.id for x in state["services"]}
+        self.endpoints = {
+            (x.service_id, x.interface, x.region_id) for x in state["endpoints"]
+        }
+        for assignment in state["role assignments"]:
+            # Group assignments have no user
+            info = assignment._info
+            if "user" not in info:
+                continue
+            for scope, target in info.get("scope", {}).items():
+                if scope in ("project", "domain"):
+                    self.assignments.add(
+                        (info["role"]["id"], info["user"]["id"], scope, target["id"])
+                    )
 
-    def ensure_role(self, role_name: str) -> str:
-        """Ensure role exists, return role ID.
+    def _domain_id(self, domain: str) -> str:
+        """Return the ID of an existing domain.
 
-        :param role_name: Role name to create or verify
-        :returns: Role ID
+        :param domain: Domain name
+        :returns: Domain ID
+        :raises: ValueError if the domain does not exist
         """
-
-        def check_role():
-            roles = self.keystone.roles.list(name=role_name)
-            return roles[0] if roles else None
-
-        role = self._retry_operation(check_role, f"Check role {role_name}")
-
-        if role:
-            return role.id
-
-        def create_role():
-            return self.keystone.roles.create(name=role_name)
-
-        role = self._retry_operation(create_role, f"Create role {role_name}")
-        return role.id
-
-    def assign_role(
-        self,
-        user: str,
-        role: str,
-        project: Optional[str] = None,
-        domain: Optional[str] = None,
-        user_domain: str = "default",
-    ) -> None:
-        """Assign role to user on project or domain (idempotent).
-
-        :param user: Username
-        :param role: Role name
-        :param project: Project name (mutually exclusive with domain)
-        :param domain: Domain name (mutually exclusive with project)
-        :param user_domain: Domain where the user exists
+        try:
+            return self.domains[domain.lower()]
+        except KeyError:
+            raise ValueError(f"Domain {domain} not found") from None
+
+    def _lookup(self, resources: Dict, key, kind: str) -> str:
+        """Return the ID of an existing resource.
+
+        :param resources: Dictionary of existing resource IDs
+        :param key: Key of the resource
+        :param kind: Resource kind for error messages
+        :returns: Resource ID
+        :raises: ValueError if the resource does not exist
         """
-
-        def do_assign():
-            # Look up user domain first
-            user_domain_obj = self.keystone.domains.list(name=user_domain)[0]
-            user_obj = self.keystone.users.list(name=user, domain=user_domain_obj)[0]
-            role_obj = self.keystone.roles.list(name=role)[0]
-
-            if project:
-                project_obj = self.keystone.projects.list(name=project)[0]
-                # Check if already assigned
-                existing_roles = self.keystone.roles.list(
-                    user=user_obj.id, project=project_obj.id
-                )
-                if any(r.id == role_obj.id for r in existing_roles):
-                    return
-                self.keystone.roles.grant(
-                    role=role_obj.id, user=user_obj.id, project=project_obj.id
-                )
-            elif domain:
-                domain_obj = self.keystone.domains.list(name=domain)[0]
-                # Check if already assigned
-                existing_roles = self.keystone.roles.list(
-                    user=user_obj.id, domain=domain_obj.id
-                )
-                if any(r.id == role_obj.id for r in existing_roles):
-                    return
-                self.keystone.roles.grant(
-                    role=role_obj.id, user=user_obj.id, domain=domain_obj.id
-                )
-
         try:
-            self._retry_operation(do_assign, f"Assign role {role} to {user}")
-        except keystone_exceptions.Conflict:
-            # Role already assigned, ignore
-            pass
+            return resources[key]
+        except KeyError:
+            name = key[-1] if isinstance(key, tuple) else key
+            raise ValueError(f"{kind.capitalize()} {name} not found") from None
 
-    def ensure_domains(self, domains):
-        """Ensure multiple domains exist.
+    def domain_operations(self, domains) -> List[Tuple[str, Any]]:
+        """Return the operations creating the missing domains.
 
         :param domains: List of (name, description) tuples, or None
+        :returns: List of (operation name, callable) tuples
         """
-        if not domains:
-            return
-
-        LOG.info("Creating additional domains...")
-        for domain_name, description in domains:
-            self.ensure_domain(domain_name, description)
-
-    def ensure_users(self, users):
-        """Ensure multiple users exist.
-
-        :param users: List of (username, password, domain) tuples, or None
-        """
-        if not users:
-            return
+        operations = []
+        for domain_name, description in domains or []:
+            if domain_name.lower() in self.domains:
+                continue
+
+            def create_domain(domain_name=domain_name, description=description):
+                self.domains[domain_name.lower()] = self._create(
+                    f"{domain_name} domain",
+                    lambda: self.keystone.domains.create(
+                        name=domain_name, description=description, enabled=True
+                    ),
+                    lambda: self.keystone.domains.list(name=domain_name)[0],
+                )
 
-        LOG.info("Creating additional users...")
-        for username, password, domain in users:
-            self.ensure_user(username, password, domain)
+            operations.append((f"Create domain {domain_name}", create_domain))
+        return operations
 
-    def ensure_roles(self, roles):
-        """Ensure multiple roles exist.
+    def role_operations(self, roles) -> List[Tuple[str, Any]]:
+        """Return the operations creating the missing roles.
 
         :param roles: List of role names, or None
+        :returns: List of (operation name, callable) tuples
         """
-        if not roles:
-            return
+        operations = []
+        for role_name in roles or []:
+            if role_name in self.roles:
+                continue
+
+            def create_role(role_name=role_name):
+                self.roles[role_name] = self._create(
+                    f"{role_name} role",
+                    lambda: self.keystone.roles.create(name=role_name),
+                    lambda: self.keystone.roles.list(name=role_name)[0],
+                )
 
-        LOG.info("Creating additional roles...")
-        for role_name in roles:
-            self.ensure_role(role_name)
+            operations.append((f"Create role {role_name}", create_role))
+        return operations
 
-    def assign_project_roles(self, assignments):
-        """Assign multiple roles on projects.
+    def service_operations(
+        self, service_name: str, service_type: str, description: str
+    ) -> List[Tuple[str, Any]]:
+        """Return the operations creating the service if missing.
 
-        :param assignments: List of (user, role, project) tuples, or None
+        :param service_name: Service name
+        :param service_type: Service type
+        :param description: Service description
+        :returns: List of (operation name, callable) tuples
         """
-        if not assignments:
-            return
+        if service_name in self.services:
+            LOG.info("Service %s already exists", service_name)
+            return []
 
-        LOG.info("Assigning project roles...")
-        for user, role, project in assignments:
-            self.assign_role(user, role, project=project)
-
-    def assign_domain_roles(self, assignments):
-        """Assign multiple roles on domains.
-
-        :param assignments: List of (user, role, domain) tuples, or None
-        """
-        if not assignments:
-            return
+        def create_service():
+            self.services[service_name] = self._create(
+                f"{service_name} service",
+                lambda: self.keystone.services.create(
+                    name=service_name,
+                    type=service_type,
+                    description=description,
+                    enabled=True,
+                ),
+                lambda: self.keystone.services.list(name=service_name)[0],
+            )
 
-        LOG.info("Assigning domain roles...")
-        for user, role, domain in assignments:
-            self.assign_role(user, role, domain=domain)
+        return [(f"Create service {service_name}", create_service)]
 
-    def assign_domain_roles_with_user_domain(self, assignments):
-        """Assign multiple roles on domains with specific user domains.
+    def user_operations(self, users) -> List[Tuple[str, Any]]:
+        """Return the operations creating the missing users.
 
-        :param assignments: List of (user, role, domain, user_domain) tuples
+        :param users: List of (username, password, domain) tuples, or None
+        :returns: List of (operation name, callable) tuples
         """
-        if not assignments:
-            return
-
-        LOG.info("Assigning domain roles with user domain...")
-        for user, role, domain, user_domain in assignments:
-            self.assign_role(user, role, domain=domain, user_domain=user_domain)
+        operations = []
+        for username, password, domain in users or []:
+            domain_id = self._domain_id(domain)
+            if (domain_id, username) in self.users:
+                continue
+
+            def create_user(username=username, password=password, domain_id=domain_id):
+                def find_user():
+                    return self.keystone.users.list(name=username, domain=domain_id)[0]
+
+                self.users[(domain_id, username)] = self._create(
+                    f"{username} user",
+                    lambda: self.keystone.users.create(
+                        name=username, password=password, domain=domain_id
+                    ),
+                    find_user,
+                )
 
-    def ensure_service(
-        self, service_name: str, service_type: str, description: str
-    ) -> str:
-        """Ensure service exists, return service ID.
+            operations.append((f"Create user {username}", create_user))
+        return operations
 
-        :param service_name: Service name
-        :param service_type: Service type
-        :param description: Service description
-        :returns: Service ID
-        """
-        LOG.info("Ensuring %s service exists...", service_name)
+    def endpoint_operations(
+        self, service_id: str, region: str, url: str, service_name: str
+    ) -> List[Tuple[str, Any]]:
+        """Return the operations creating the missing standard endpoints.
 
-        def check_service():
-            services = self.keystone.services.list(name=service_name)
-            return services[0] if services else None
+        Public, internal, and admin endpoints are created with the same URL.
 
-        service = self._retry_operation(check_service, f"Check service {service_name}")
+        :param service_id: Service ID to create endpoints for
+        :param region: Region name
+        :param url: Endpoint URL (same for all interfaces)
+        :param service_name: Service name for logging
+        :returns: List of (operation name, callable) tuples
+        """
+        operations = []
+        for interface in ["public", "internal", "admin"]:
+            if (service_id, interface, region) in self.endpoints:
+                continue
+
+            def create_endpoint(interface=interface):
+                LOG.info("Creating %s %s endpoint...", service_name, interface)
+                self.keystone.endpoints.create(
+                    service=service_id,
+                    interface=interface,
+                    url=url,
+                    region=region,
+                    enabled=True,
+                )
 
-        if service:
-            LOG.info("Service already exists")
-            return service.id
+            operations.append(
+                (f"Create {interface} endpoint for {service_name}", create_endpoint)
+            )
+        return operations
 
-        LOG.info("Creating %s service...", service_name)
+    def assignment_operations(self, assignments) -> List[Tuple[str, Any]]:
+        """Return the operations assigning the missing roles.
 
-        def create_service():
-            return self.keystone.services.create(
-                name=service_name,
-                type=service_type,
-                description=description,
-                enabled=True,
+        :param assignments: List of (user, role, scope, target, user_domain)
+                            tuples, scope is project or domain
+        :returns: List of (operation name, callable) tuples
+        """
+        operations = []
+        for user, role, scope, target, user_domain in assignments:
+            user_id = self._lookup(
+                self.users, (self._domain_id(user_domain), user), "user"
             )
+            role_id = self._lookup(self.roles, role, "role")
+            if scope == "project":
+                target_id = self._lookup(self.projects, target, "project")
+            else:
+                target_id = self._domain_id(target)
+            if (role_id, user_id, scope, target_id) in self.assignments:
+                continue
+
+            def grant(
+                role_id=role_id, user_id=user_id, scope=scope, target_id=target_id
+            ):
+                try:
+                    self.keystone.roles.grant(
+                        role=role_id, user=user_id, **{scope: target_id}
+                    )
+                except keystone_exceptions.Conflict:
+                    # Role already assigned, ignore
+                    pass
 
-        service = self._retry_operation(
-            create_service, f"Create service {service_name}"
-        )
-        LOG.info("Service created successfully")
-        return service.id
+            operations.append((f"Assign role {role} to {user} on {target}", grant))
+        return operations
 
-    def ensure_endpoint(
+    def bootstrap(
         self,
-        service_id: str,
+        service_name: str,
+        service_type: str,
+        description: str,
         region: str,
-        interface: str,
         url: str,
-        service_name: str = None,
+        users,
+        domains=None,
+        roles=None,
+        assignments=None,
     ) -> str:
-        """Ensure endpoint exists, return endpoint ID.
+        """Ensure the service, its endpoints and the other resources exist.
 
-        :param service_id: Service ID
+        :param service_name: Service name
+        :param service_type: Service type
+        :param description: Service description
         :param region: Region name
-        :param interface: Interface type (public, internal, admin)
         :param url: Endpoint URL
-        :param service_name: Optional service name for logging
-        :returns: Endpoint ID
+        :param users: List of (username, password, domain) tuples
+        :param domains: List of (name, description) tuples, or None
+        :param roles: List of role names, or None
+        :param assignments: List of (user, role, scope, target, user_domain)
+                            tuples, or None
+        :returns: Service ID
         """
+        self.load_state()
 
-        def check_endpoint():
-            endpoints = self.keystone.endpoints.list(
-                service=service_id, interface=interface, region=region
-            )
-            return endpoints[0] if endpoints else None
-
-        endpoint = self._retry_operation(
-            check_endpoint,
-            f"Check {interface} endpoint"
-            + (f" for {service_name}" if service_name else ""),
+        self._run_concurrently(
+            self.domain_operations(domains)
+            + self.role_operations(roles)
+            + self.service_operations(service_name, service_type, description)
         )
 
-        if endpoint:
-            return endpoint.id
-
-        def create_endpoint():
-            return self.keystone.endpoints.create(
-                service=service_id,
-                interface=interface,
-                url=url,
-                region=region,
-                enabled=True,
-            )
-
-        endpoint = self._retry_operation(
-            create_endpoint,
-            f"Create {interface} endpoint"
-            + (f" for {service_name}" if service_name else ""),
+        service_id = self.services[service_name]
+        self._run_concurrently(
+            self.user_operations(users)
+            + self.endpoint_operations(service_id, region, url, service_name)
         )
-        return endpoint.id
 
-    def ensure_endpoints(
-        self, service_id: str, region: str, url: str, service_name: str = None
-    ):
-        """Ensure all standard endpoints exist for a service.
-
-        Creates public, internal, and admin endpoints with the same URL.
-
-        :param service_id: Service ID to create endpoints for
-        :param region: Region name
-        :param url: Endpoint URL (same for all interfaces)
-        :param service_name: Optional service name for logging
-        """
-        LOG.info("Creating %s endpoints...", service_name or "service")
-        for interface in ["public", "internal", "admin"]:
-            self.ensure_endpoint(service_id, region, interface, url, service_name)
+        self._run_concurrently(self.assignment_operations(assignments or []))
+        return service_id
 
 
 def parse_arguments():
@@ -492,6 +519,12 @@ def parse_arguments():
         metavar=("USER", "ROLE", "DOMAIN", "USER_DOMAIN"),
         help="Assign USER ROLE on DOMAIN with USER_DOMAIN (repeatable)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Maximum concurrent Keystone requests (default: 8)",
+    )
 
     return parser.parse_args()
 
@@ -515,9 +548,10 @@ def get_auth_credentials():
     return auth_url, admin_username, admin_password, admin_project
 
 
-def initialize_keystone_client():
+def initialize_keystone_client(workers: int = 8):
     """Initialize KeystoneBootstrap client with environment credentials.
 
+    :param workers: Maximum number of concurrent Keystone requests
     :returns: Initialized KeystoneBootstrap instance
     :raises: SystemExit if authentication fails or Keystone is unreachable
     """
@@ -529,6 +563,7 @@ def initialize_keystone_client():
             username=admin_username,
             password=admin_password,
             project_name=admin_project,
+            workers=workers,
         )
         return bootstrap
     except keystone_exceptions.Unauthorized as e:
@@ -551,36 +586,40 @@ def initialize_keystone_client():
 
 def main():
     args = parse_arguments()
-    bootstrap = initialize_keystone_client()
+    bootstrap = initialize_keystone_client(args.workers)
+
+    # Role assignments as (user, role, scope, target, user domain) tuples
+    assignments = (
+        [
+            (user, role, "project", project, "default")
+            for user, role, project in args.project_role_assignment or []
+        ]
+        + [
+            (user, role, "domain", domain, "default")
+            for user, role, domain in args.domain_role_assignment or []
+        ]
+        + [
+            (user, role, "domain", domain, user_domain)
+            for user, role, domain, user_domain in (
+                args.domain_role_assignment_with_user_domain or []
+            )
+        ]
+    )
 
     try:
-        # Create extra domains first (if any)
-        bootstrap.ensure_domains(args.extra_domain)
-
-        # Create main service user
-        bootstrap.ensure_user(args.username, args.password, args.user_domain)
-
-        # Create extra users (if any)
-        bootstrap.ensure_users(args.extra_user)
-
-        # Create extra roles (if any)
-        bootstrap.ensure_roles(args.extra_role)
-
-        # Assign roles
-        bootstrap.assign_project_roles(args.project_role_assignment)
-        bootstrap.assign_domain_roles(args.domain_role_assignment)
-        bootstrap.assign_domain_roles_with_user_domain(
-            args.domain_role_assignment_with_user_domain
-        )
-
-        # Create service
-        service_id = bootstrap.ensure_service(
-            args.service_name, args.service_type, args.service_description
-        )
-
-        # Create endpoints
-        bootstrap.ensure_endpoints(
-            service_id, args.region, args.endpoint_url, args.service_name
+        # Create the service user, extra domains, users, roles, the service
+        # and its endpoints, and assign roles
+        service_id = bootstrap.bootstrap(
+            args.service_name,
+            args.service_type,
+            args.service_description,
+            args.region,
+            args.endpoint_url,
+            users=[(args.username, args.password, args.user_domain)]
+            + (args.extra_user or []),
+            domains=args.extra_domain,
+            roles=args.extra_role,
+            assignments=assignments,
         )
 
         # Output result as JSON
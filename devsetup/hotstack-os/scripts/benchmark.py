@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Control plane benchmark for HotsTac(k)os
+
+Drives the OpenStack APIs at a configurable concurrency and measures the
+latency and throughput of:
+- Keystone token issue
+- Nova instance boot and delete
+- Neutron port create and delete
+- Glance image list
+- Heat stack create and delete
+
+The scenarios run one after the other, each with --iterations operations
+spread over --concurrency threads. Latency histograms and errors are
+reported per operation. Results saved with --output can be compared with
+--baseline, to measure the effect of the worker counts and service
+configuration in configs/.
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import openstack
+import requests
+from keystoneauth1 import loading
+from openstack import exceptions
+
+# Timeouts in seconds
+BOOT_TIMEOUT = 300
+DELETE_TIMEOUT = 300
+STACK_TIMEOUT = 300
+
+# Seconds between polls of instance and stack status
+POLL_INTERVAL = 0.5
+
+# Name prefix of the resources created by the benchmark
+RESOURCE_PREFIX = "hotstack-benchmark"
+
+# Upper bounds in seconds of the latency histogram buckets
+HISTOGRAM_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+HISTOGRAM_WIDTH = 40
+
+# Error messages kept per operation
+ERROR_SAMPLES = 5
+
+# Minimal stack, measures the Heat API and engine rather than other services
+HEAT_TEMPLATE = {
+    "heat_template_version": "2018-08-31",
+    "resources": {"none": {"type": "OS::Heat::None"}},
+}
+
+# Serializes the output of concurrent operations
+OUTPUT_LOCK = threading.Lock()
+
+
+# ANSI color codes and status indicators
+class Colors:
+    RED = "\033[0;31m"
+    GREEN = "\033[0;32m"
+    YELLOW = "\033[1;33m"
+    BLUE = "\033[0;34m"
+    NC = "\033[0m"  # No Color
+
+    # Status indicators
+    OK = f"{GREEN}[OK]{NC}"
+    WARNING = f"{YELLOW}[WARNING]{NC}"
+    ERROR = f"{RED}[ERROR]{NC}"
+    INFO = f"{BLUE}[INFO]{NC}"
+    DONE = f"{GREEN}[DONE]{NC}"
+
+
+def _print_line(line, file=None):
+    """Print a whole line, lines of concurrent operations do not mix"""
+    with OUTPUT_LOCK:
+        print(line, file=file, flush=True)
+
+
+def print_success(message, indent=True):
+    """Print success message in green"""
+    prefix = "  " if indent else ""
+    _print_line(f"{prefix}{Colors.OK} {message}")
+
+
+def print_warning(message, indent=True):
+    """Print warning message in yellow"""
+    prefix = "  " if indent else ""
+    _print_line(f"{prefix}{Colors.WARNING} {message}")
+
+
+def print_error(message, indent=True):
+    """Print error message in red"""
+    prefix = "  " if indent else ""
+    _print_line(f"{prefix}{Colors.ERROR} {message}", file=sys.stderr)
+
+
+def print_info(message, indent=True):
+    """Print info message in blue"""
+    prefix = "  " if indent else ""
+    _print_line(f"{prefix}{Colors.INFO} {message}")
+
+
+def load_env_var(var_name, default=None):
+    """Load a variable from .env file"""
+    env_file = Path(".env")
+    if not env_file.exists():
+        return default
+
+    with open(env_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                key, value = line.split("=", 1)
+                if key.strip() == var_name:
+                    return value.strip()
+    return default
+
+
+class Recorder:
+    """Latencies and errors of the benchmark operations, shared by threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(list)
+
+    @contextmanager
+    def measure(self, operation):
+        """Record the latency of an operation, or its error"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self.lock:
+                self.errors[operation].append(f"{type(e).__name__}: {e}")
+            raise
+        latency = time.perf_counter() - start
+        with self.lock:
+            self.latencies[operation].append(latency)
+
+
+def _resource_name():
+    """Unique name of a benchmark resource"""
+    return f"{RESOURCE_PREFIX}-{uuid.uuid4().hex[:8]}"
+
+
+def keystone_token_issue(conn, resources, recorder):
+    """Issue a token with a new authentication plugin, bypassing the cache"""
+    auth = resources["auth_loader"].load_from_options(**resources["auth_options"])
+    with recorder.measure("keystone.token_issue"):
+        auth.get_token(conn.session)
+
+
+def nova_boot_delete(conn, resources, recorder):
+    """Boot an instance until it is ACTIVE, then delete it"""
+    with recorder.measure("nova.boot"):
+        server = conn.compute.create_server(
+            name=_resource_name(),
+            image_id=resources["image"].id,
+            flavor_id=resources["flavor"].id,
+            networks=[{"uuid": resources["network"].id}],
+        )
+        try:
+            conn.compute.wait_for_server(
+                server,
+                status="ACTIVE",
+                failures=["ERROR"],
+                interval=POLL_INTERVAL,
+                wait=BOOT_TIMEOUT,
+            )
+        except Exception:
+            conn.compute.delete_server(server, ignore_missing=True)
+            raise
+
+    with recorder.measure("nova.delete"):
+        conn.compute.delete_server(server)
+        conn.compute.wait_for_delete(
+            server, interval=POLL_INTERVAL, wait=DELETE_TIMEOUT
+        )
+
+
+def neutron_port_create(conn, resources, recorder):
+    """Create a port, then delete it"""
+    with recorder.measure("neutron.port_create"):
+        port = conn.network.create_port(
+            name=_resource_name(), network_id=resources["network"].id
+        )
+
+    with recorder.measure("neutron.port_delete"):
+        conn.network.delete_port(port)
+
+
+def glance_image_list(conn, resources, recorder):
+    """List all images"""
+    with recorder.measure("glance.image_list"):
+        list(conn.image.images())
+
+
+def heat_stack_create(conn, resources, recorder):
+    """Create a stack until it is CREATE_COMPLETE, then delete it"""
+    with recorder.measure("heat.stack_create"):
+        stack = conn.orchestration.create_stack(
+            name=_resource_name(), template=HEAT_TEMPLATE
+        )
+        try:
+            conn.orchestration.wait_for_status(
+                stack,
+                status="CREATE_COMPLETE",
+                failures=["CREATE_FAILED"],
+                interval=POLL_INTERVAL,
+                wait=STACK_TIMEOUT,
+            )
+        except Exception:
+            conn.orchestration.delete_stack(stack, ignore_missing=True)
+            raise
+
+    with recorder.measure("heat.stack_delete"):
+        conn.orchestration.delete_stack(stack)
+        conn.orchestration.wait_for_delete(
+            stack, interval=POLL_INTERVAL, wait=STACK_TIMEOUT
+        )
+
+
+# Scenario name: (function, operations measured by the function)
+SCENARIOS = {
+    "keystone": (keystone_token_issue, ["keystone.token_issue"]),
+    "nova": (nova_boot_delete, ["nova.boot", "nova.delete"]),
+    "neutron": (neutron_port_create, ["neutron.port_create", "neutron.port_delete"]),
+    "glance": (glance_image_list, ["glance.image_list"]),
+    "heat": (heat_stack_create, ["heat.stack_create", "heat.stack_delete"]),
+}
+
+
+def find_resources(conn, args, scenarios):
+    """Find the resources the scenarios need
+
+    Returns:
+        Dictionary of resources passed to the scenario functions
+    """
+    resources = {}
+
+    if "keystone" in scenarios:
+        config = conn.config.config
+        resources["auth_loader"] = loading.get_plugin_loader(config["auth_type"])
+        resources["auth_options"] = config["auth"]
+
+    lookups = []
+    if "nova" in scenarios:
+        lookups.append(("image", conn.image.find_image, args.image_name))
+        lookups.append(("flavor", conn.compute.find_flavor, args.flavor_name))
+    if "nova" in scenarios or "neutron" in scenarios:
+        lookups.append(("network", conn.network.find_network, args.network_name))
+
+    for key, find, name in lookups:
+        resources[key] = find(name, ignore_missing=True)
+        if not resources[key]:
+            print_error(f"{key.capitalize()} '{name}' not found")
+            print_error("Run 'make post-setup' first")
+            sys.exit(1)
+
+    return resources
+
+
+def run_scenario(conn, scenario, resources, recorder, args):
+    """Run the iterations of a scenario concurrently
+
+    Returns:
+        Wall clock duration of the scenario in seconds
+    """
+    func, _ = SCENARIOS[scenario]
+    print_info(
+        f"Running {scenario}: {args.iterations} iterations, "
+        f"concurrency {args.concurrency}...",
+        indent=False,
+    )
+
+    def iteration(_):
+        try:
+            func(conn, resources, recorder)
+        except Exception:
+            # Recorded as an error of the failed operation
+            pass
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(iteration, range(args.iterations)))
+    return time.monotonic() - start
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list of values"""
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def histogram(values):
+    """Count values per histogram bucket, the last bucket has no upper bound"""
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for value in values:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+    return counts
+
+
+def summarize(latencies, errors, duration):
+    """Summarize the latencies and errors of an operation
+
+    Returns:
+        Dictionary of the operation statistics
+    """
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "errors": len(errors),
+        "error_samples": errors[:ERROR_SAMPLES],
+        "throughput": len(values) / duration if duration else 0,
+        "histogram": histogram(values),
+    }
+    if values:
+        summary.update(
+            {
+                "min": values[0],
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        )
+    return summary
+
+
+def _bucket_label(index):
+    """Label of a histogram bucket"""
+    if index < len(HISTOGRAM_BUCKETS):
+        return f"<= {HISTOGRAM_BUCKETS[index]}s"
+    return f"> {HISTOGRAM_BUCKETS[-1]}s"
+
+
+def print_operation(operation, summary):
+    """Print the statistics and latency histogram of an operation"""
+    print_info(operation, indent=False)
+    print(
+        f"  {summary['count']} ok, {summary['errors']} errors, "
+        f"{summary['throughput']:.2f}/s"
+    )
+    if summary["count"]:
+        print(
+            "  "
+            + "  ".join(
+                f"{x} {summary[x]:.3f}s"
+                for x in ("min", "p50", "p90", "p95", "p99", "max")
+            )
+        )
+
+        counts = summary["histogram"]
+        used = [i for i, x in enumerate(counts) if x]
+        for i in range(used[0], used[-1] + 1):
+            bar = "#" * math.ceil(HISTOGRAM_WIDTH * counts[i] / max(counts))
+            print(f"    {_bucket_label(i):>10} {counts[i]:>6} {bar}")
+
+    for error in summary["error_samples"]:
+        print_error(error)
+    print()
+
+
+def _error_rate(summary):
+    """Percentage of failed operations"""
+    total = summary["count"] + summary["errors"]
+    return 100 * summary["errors"] / total if total else 0
+
+
+def compare_baseline(results, baseline, threshold):
+    """Compare results against baseline results
+
+    Latencies (p50, p95) and throughput changing for the worse by more than
+    threshold percent, and any increase of the error rate, are regressions.
+
+    Args:
+        results: Benchmark results
+        baseline: Baseline benchmark results
+        threshold: Tolerated change in percent
+
+    Returns:
+        List of regressions
+    """
+    for key in ("concurrency", "iterations"):
+        if results[key] != baseline.get(key):
+            print_warning(
+                f"Baseline {key} {baseline.get(key)} differs from {results[key]}",
+                indent=False,
+            )
+
+    print_info("Comparison with baseline:", indent=False)
+    print(f"  {'':24} {'':10} {'baseline':>10} {'current':>10} {'change':>9}")
+
+    regressions = []
+    for operation, summary in results["operations"].items():
+        base = baseline.get("operations", {}).get(operation)
+        if not base:
+            continue
+
+        # Metric: (baseline, current, format, higher is worse), latencies and
+        # throughput are only compared when operations succeeded in both runs
+        metrics = {}
+        if base["count"] and summary["count"]:
+            metrics = {
+                "p50": (base["p50"], summary["p50"], "{:.3f}s", True),
+                "p95": (base["p95"], summary["p95"], "{:.3f}s", True),
+                "throughput": (
+                    base["throughput"],
+                    summary["throughput"],
+                    "{:.2f}/s",
+                    False,
+                ),
+            }
+        label = operation
+        for metric, (old, new, fmt, higher_is_worse) in metrics.items():
+            change = 100 * (new - old) / old if old else 0
+            worse = change > threshold if higher_is_worse else -change > threshold
+            if worse:
+                regressions.append(f"{operation} {metric} {change:+.1f}%")
+            color = Colors.RED if worse else ""
+            print(
+                f"  {label:24} {metric:10} {fmt.format(old):>10} "
+                f"{fmt.format(new):>10} {color}{change:>+8.1f}%{Colors.NC}"
+            )
+            label = ""
+
+        old, new = _error_rate(base), _error_rate(summary)
+        if new > old:
+            regressions.append(f"{operation} error rate {old:.1f}% -> {new:.1f}%")
+        color = Colors.RED if new > old else ""
+        print(
+            f"  {label:24} {'errors':10} {old:>9.1f}% {new:>9.1f}% "
+            f"{color}{new - old:>+8.1f}%{Colors.NC}"
+        )
+
+    return regressions
+
+
+def cleanup(conn):
+    """Delete the resources left behind by failed benchmark operations"""
+    leftovers = [
+        (x, conn.compute.delete_server)
+        for x in conn.compute.servers()
+        if x.name.startswith(RESOURCE_PREFIX)
+    ]
+    leftovers += [
+        (x, conn.network.delete_port)
+        for x in conn.network.ports()
+        if (x.name or "").startswith(RESOURCE_PREFIX)
+    ]
+    leftovers += [
+        (x, conn.orchestration.delete_stack)
+        for x in conn.orchestration.stacks()
+        if x.name.startswith(RESOURCE_PREFIX)
+    ]
+
+    if leftovers:
+        print_info(f"Deleting {len(leftovers)} resources left behind...", indent=False)
+    for resource, delete in leftovers:
+        try:
+            delete(resource, ignore_missing=True)
+            print_success(f"Deleted {resource.name}")
+        except exceptions.SDKException as e:
+            print_warning(f"Failed to delete {resource.name}: {e}")
+
+    return len(leftovers)
+
+
+def size_connection_pool(conn, size):
+    """Size the HTTP connection pool of a connection shared by threads"""
+    adapter = requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    conn.session.session.mount("http://", adapter)
+    conn.session.session.mount("https://", adapter)
+
+
+def run_benchmark(args):
+    """Main benchmark execution"""
+    print("HotsTac(k)os control plane benchmark...")
+    print()
+
+    # Check if running as root (not recommended)
+    if os.geteuid() == 0:
+        print_error("Do not run this script as root or with sudo!")
+        print_error("Run without sudo: make benchmark")
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print_error(f"Failed to load baseline {args.baseline}: {e}")
+            sys.exit(1)
+
+    # Connect to OpenStack
+    try:
+        conn = openstack.connect(cloud=args.cloud)
+        print_success(f"Connected to OpenStack cloud '{args.cloud}'")
+    except Exception as e:
+        print_error(f"Failed to connect to OpenStack: {e}")
+        sys.exit(1)
+
+    # Each operation runs in its own thread, and waits poll concurrently
+    size_connection_pool(conn, max(10, args.concurrency))
+
+    resources = find_resources(conn, args, args.scenario)
+    print()
+
+    recorder = Recorder()
+    results = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cloud": args.cloud,
+        "concurrency": args.concurrency,
+        "iterations": args.iterations,
+        "histogram_buckets": HISTOGRAM_BUCKETS,
+        "operations": {},
+    }
+    for scenario in args.scenario:
+        duration = run_scenario(conn, scenario, resources, recorder, args)
+        for operation in SCENARIOS[scenario][1]:
+            results["operations"][operation] = summarize(
+                recorder.latencies[operation], recorder.errors[operation], duration
+            )
+
+    cleanup(conn)
+    print()
+    for operation, summary in results["operations"].items():
+        print_operation(operation, summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print_success(f"Results saved to {args.output}", indent=False)
+        print()
+
+    if baseline:
+        regressions = compare_baseline(results, baseline, args.threshold)
+        print()
+        if regressions:
+            print_error(
+                f"Regressions from baseline (threshold {args.threshold}%):",
+                indent=False,
+            )
+            for regression in regressions:
+                print_error(f"  - {regression}")
+            sys.exit(1)
+
+    print(f"{Colors.DONE} Benchmark completed!")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="HotsTac(k)os benchmark - measure control plane API latency"
+    )
+
+    parser.add_argument(
+        "--cloud",
+        default=load_env_var("HOTSTACK_CLOUD", "hotstack-os"),
+        help="OpenStack cloud name from clouds.yaml (default: hotstack-os)",
+    )
+
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="Scenario to run, can be repeated (default: all)",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(load_env_var("HOTSTACK_BENCHMARK_CONCURRENCY", "4")),
+        help="Concurrent operations per scenario (default: 4)",
+    )
+
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=int(load_env_var("HOTSTACK_BENCHMARK_ITERATIONS", "20")),
+        help="Iterations of each scenario (default: 20)",
+    )
+
+    parser.add_argument(
+        "--image-name",
+        default="cirros",
+        help="Image for the nova scenario (default: cirros)",
+    )
+
+    parser.add_argument(
+        "--flavor-name",
+        default="hotstack.small",
+        help="Flavor for the nova scenario (default: hotstack.small)",
+    )
+
+    parser.add_argument(
+        "--network-name",
+        default="private",
+        help="Network for the nova and neutron scenarios (default: private)",
+    )
+
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Save the results to a JSON file, usable as a baseline",
+    )
+
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Compare the results against a JSON file saved with --output",
+    )
+
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=20,
+        help="Change from baseline in percent considered a regression (default: 20)",
+    )
+
+    parser.add_argument(
+        "--cleanup-only",
+        action="store_true",
+        help="Only delete resources left behind by the benchmark and exit",
+    )
+
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.iterations < 1:
+        parser.error("--concurrency and --iterations must be at least 1")
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    # Cleanup only mode
+    if args.cleanup_only:
+        print("HotsTac(k)os benchmark cleanup...")
+        print()
+        try:
+            conn = openstack.connect(cloud=args.cloud)
+            print_success(f"Connected to OpenStack cloud '{args.cloud}'")
+        except Exception as e:
+            print_error(f"Failed to connect to OpenStack: {e}")
+            sys.exit(1)
+
+        cleanup(conn)
+        print()
+        print_success("Cleanup complete")
+        sys.exit(0)
+
+    # Run benchmark
+    run_benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,15 +18,21 @@
 Build all HotsTac(k)os container images.
 
 Builds base images and all service container images with support for
-parallel builds and configurable service lists.
+parallel builds and configurable service lists. Dependencies between the
+images are taken from the FROM lines of the containerfiles, each image is
+built as soon as the images it builds from are done.
 """
 
 import argparse
+import hashlib
+import json
 import logging
 import os
+import shutil
 import subprocess
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -41,8 +47,24 @@ class Colors:
     # Status indicators
     DONE = f"{GREEN}[DONE]{NC}"
     FAILED = f"{RED}[FAILED]{NC}"
+    CACHED = f"{YELLOW}[UP TO DATE]{NC}"
 
 
+# Image label holding the hash of the build inputs
+BUILD_HASH_LABEL = "io.hotstack.build-hash"
+
+# Build history defaults for images that were not built before
+DEFAULT_BUILD_SECONDS = 300
+DEFAULT_BUILD_MEMORY = 2 * 1024**3
+# Number of builds per image kept in the build history
+HISTORY_RUNS = 5
+# Seconds between resource checks while a build waits for memory or disk
+RESOURCE_POLL_INTERVAL = 5
+# Seconds after starting a build before its memory use shows as used
+BUILD_RAMP_SECONDS = 60
+# Container storage used when buildah info does not report one
+DEFAULT_STORAGE_PATH = "/var/lib/containers/storage"
+
 # Default image lists
 # Infrastructure images (no OPENSTACK_BRANCH build arg needed)
 # Note: infra is a unified image containing dnsmasq, haproxy, mariadb, memcached, rabbitmq
@@ -60,6 +82,94 @@ DEFAULT_OPENSTACK_IMAGES = [
 ]
 
 
+def read_instructions(
+    containerfile: Path, target: Optional[str] = None
+) -> List[Tuple[str, List[str]]]:
+    """Read the instructions of a containerfile.
+
+    Continuation lines are joined. With a target, the stages after the
+    target stage are not built and not returned.
+
+    :param containerfile: Path to Containerfile
+    :param target: Optional build target stage
+    :returns: List of (instruction, arguments) tuples
+    """
+    instructions = []
+    in_target = False
+    line = ""
+    with open(containerfile) as f:
+        for raw_line in f:
+            if raw_line.lstrip().startswith("#"):
+                continue
+            line += raw_line.rstrip("\n")
+            if line.endswith("\\"):
+                line = line[:-1]
+                continue
+            words = line.split()
+            line = ""
+            if not words:
+                continue
+
+            instruction = words[0].upper()
+            if instruction == "FROM":
+                if in_target:
+                    break
+                args = [w for w in words[1:] if not w.startswith("--")]
+                in_target = len(args) >= 3 and args[2] == target
+            instructions.append((instruction, words[1:]))
+    return instructions
+
+
+def parse_from_images(containerfile: Path, target: Optional[str] = None) -> List[str]:
+    """Get the images a containerfile builds from.
+
+    Stages referring to an earlier stage by name are not images.
+
+    :param containerfile: Path to Containerfile
+    :param target: Optional build target stage
+    :returns: List of image references in FROM lines
+    """
+    images = []
+    stages = set()
+    for instruction, words in read_instructions(containerfile, target):
+        if instruction != "FROM":
+            continue
+        args = [w for w in words if not w.startswith("--")]
+        if args[0] not in stages and args[0] not in images:
+            images.append(args[0])
+        if len(args) >= 3 and args[1].upper() == "AS":
+            stages.add(args[2])
+    return images
+
+
+def parse_context_files(
+    containerfile: Path, context: Path, target: Optional[str] = None
+) -> List[Path]:
+    """Get the context files a containerfile copies into the image.
+
+    :param containerfile: Path to Containerfile
+    :param context: Build context directory
+    :param target: Optional build target stage
+    :returns: Sorted list of files below the context
+    """
+    files = set()
+    for instruction, words in read_instructions(containerfile, target):
+        if instruction not in ("COPY", "ADD"):
+            continue
+        if any(w.startswith("--from") for w in words):
+            continue
+        sources = [w for w in words if not w.startswith("--")][:-1]
+        for source in sources:
+            if "://" in source:
+                continue
+            for path in context.glob(source.lstrip("/")):
+                if path.is_dir():
+                    files.update(p for p in path.rglob("*") if p.is_file())
+                elif path.is_file():
+                    files.add(path)
+    return sorted(files)
+
+
 class ImageBuilder:
     """Handles building HotsTac(k)os container images."""
 
@@ -71,20 +181,42 @@ class ImageBuilder:
         infra_images: Optional[List[str]] = None,
         openstack_images: Optional[List[str]] = None,
         verbose: bool = False,
+        layers: bool = True,
+        no_cache: bool = False,
+        history_file: Optional[Path] = None,
+        min_free_memory: int = 0,
+        min_free_disk: int = 0,
     ):
         """Initialize the image builder.
 
         :param context: Containerfiles directory
         :param openstack_branch: OpenStack branch to build
-        :param parallel_jobs: Number of parallel builds
+        :param parallel_jobs: Maximum number of parallel builds, 0 for the
+            number of CPUs
         :param infra_images: Infrastructure images to build (or None for defaults)
         :param openstack_images: OpenStack images to build (or None for defaults)
         :param verbose: Show verbose build output
+        :param layers: Cache intermediate layers for reuse by later builds
+        :param no_cache: Rebuild all images, ignoring build hashes and layers
+        :param history_file: JSON file to record build durations and resource
+            usage in, used to order and throttle builds
+        :param min_free_memory: Bytes of memory to keep available when
+            starting another build
+        :param min_free_disk: Bytes of container storage to keep free when
+            starting another build
         """
         self.context = context
         self.openstack_branch = openstack_branch
-        self.parallel_jobs = parallel_jobs
+        self.parallel_jobs = parallel_jobs or os.cpu_count() or 1
         self.verbose = verbose
+        self.layers = layers
+        self.no_cache = no_cache
+        self.history_file = history_file
+        self.min_free_memory = min_free_memory
+        self.min_free_disk = min_free_disk
+        self.history = self._load_history()
+        self.build_stats = {}
+        self.storage_path = None
 
         # Use provided image lists or defaults
         self.infra_images = infra_images if infra_images else DEFAULT_INFRA_IMAGES
@@ -92,6 +224,13 @@ class ImageBuilder:
             openstack_images if openstack_images else DEFAULT_OPENSTACK_IMAGES
         )
 
+        self.builds = (
+            self._prepare_base_image_builds()
+            + self._prepare_infra_image_builds()
+            + self._prepare_openstack_image_builds()
+        )
+        self._resolve_dependencies()
+
         # Setup logging for verbose mode
         self.loggers = {}
         if self.verbose:
@@ -125,19 +264,142 @@ class ImageBuilder:
         return self.loggers[image]
 
     def print_build_plan(self) -> None:
-        """Print the build plan showing all images to be built."""
-        total = 2 + len(self.infra_images) + len(self.openstack_images)
+        """Print the build plan showing all images and their dependencies."""
         print("\n" + "=" * 60)
-        print(f"Build Plan (Total: {total} images, Parallelism: {self.parallel_jobs})")
-        print("=" * 60)
         print(
-            f"Phase 1 - Fedora-based images ({2 + len(self.infra_images)}): base-builder, base-runtime, {', '.join(self.infra_images)}"
+            f"Build Plan (Total: {len(self.builds)} images, Parallelism: {self.parallel_jobs})"
         )
+        print("=" * 60)
+        depth = self._build_depths()
+        for build in sorted(self.builds, key=lambda b: depth[b["image"]]):
+            image = build["image"]
+            parents = self.dependencies[image]
+            after = f" (after {', '.join(sorted(parents))})" if parents else ""
+            runs = self.history.get(image)
+            estimate = f" ~{self._estimate(image, 'duration', 0):.0f}s" if runs else ""
+            print(f"  {image}{after}{estimate}")
         print(
-            f"Phase 2 - OpenStack service images ({len(self.openstack_images)}): {', '.join(self.openstack_images)}"
+            f"Critical path: {max(depth.values(), default=0) + 1} builds, "
+            f"~{max(self._priorities().values(), default=0):.0f}s"
         )
         print("=" * 60)
 
+    def _load_history(self) -> Dict[str, List[Dict]]:
+        """Load the build history.
+
+        :returns: Dict of image name to its recorded builds, oldest first
+        """
+        if not self.history_file or not self.history_file.exists():
+            return {}
+        try:
+            with open(self.history_file) as f:
+                return json.load(f).get("images", {})
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable build history {self.history_file}: {e}")
+            return {}
+
+    def _save_history(self) -> None:
+        """Add the stats of this run's builds to the build history."""
+        if not self.history_file or not self.build_stats:
+            return
+        for image, stats in self.build_stats.items():
+            runs = self.history.setdefault(image, [])
+            runs.append(dict(stats, timestamp=int(time.time())))
+            del runs[:-HISTORY_RUNS]
+
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.history_file.with_name(self.history_file.name + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"images": self.history}, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.history_file)
+
+    def _estimate(self, image: str, key: str, default: float) -> float:
+        """Estimate a build stat of an image from the build history.
+
+        :param image: Image name
+        :param key: Stat name (duration, max_rss, read_bytes, write_bytes)
+        :param default: Value for images without build history
+        :returns: Mean of the recorded values
+        """
+        values = [run[key] for run in self.history.get(image, []) if key in run]
+        return sum(values) / len(values) if values else default
+
+    def _priorities(self) -> Dict[str, float]:
+        """Get the estimated seconds from starting each image to the last build.
+
+        Images on the longest remaining path are started first.
+
+        :returns: Dict of image name to estimated critical path seconds
+        """
+        depths = self._build_depths()
+        priorities = {}
+        for image in sorted(depths, key=depths.get, reverse=True):
+            children = [i for i, p in self.dependencies.items() if image in p]
+            priorities[image] = self._estimate(
+                image, "duration", DEFAULT_BUILD_SECONDS
+            ) + max((priorities[c] for c in children), default=0)
+        return priorities
+
+    def _free_memory(self) -> Optional[int]:
+        """Get the available memory in bytes, None if unknown."""
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def _free_disk(self) -> Optional[int]:
+        """Get the free bytes on the container storage, None if unknown."""
+        if self.storage_path is None:
+            result = subprocess.run(["buildah", "info"], capture_output=True, text=True)
+            try:
+                path = json.loads(result.stdout)["store"]["GraphRoot"]
+            except (ValueError, KeyError, TypeError):
+                path = DEFAULT_STORAGE_PATH
+            # The storage may not exist before the first build
+            self.storage_path = Path(path)
+            while not self.storage_path.exists() and self.storage_path.parent != (
+                self.storage_path
+            ):
+                self.storage_path = self.storage_path.parent
+        try:
+            return shutil.disk_usage(self.storage_path).free
+        except OSError:
+            return None
+
+    def _resources_available(self, image: str, running: Dict[str, float]) -> bool:
+        """Check there is memory and disk to start building an image.
+
+        Builds started less than BUILD_RAMP_SECONDS ago may not use their
+        memory yet, their estimated memory is reserved. The estimated disk
+        writes of all running builds are reserved.
+
+        :param image: Image name
+        :param running: Dict of running image names to their start time
+        :returns: True if the estimated usage of the build fits
+        """
+        now = time.monotonic()
+        memory = self._free_memory()
+        needed = self.min_free_memory + sum(
+            self._estimate(i, "max_rss", DEFAULT_BUILD_MEMORY)
+            for i in [image]
+            + [i for i, start in running.items() if now - start < BUILD_RAMP_SECONDS]
+        )
+        if memory is not None and memory < needed:
+            return False
+
+        disk = self._free_disk()
+        needed = self.min_free_disk + sum(
+            self._estimate(i, "write_bytes", 0) for i in [image, *running]
+        )
+        if disk is not None and disk < needed:
+            return False
+
+        return True
+
     def build_image(
         self,
         image: str,
@@ -145,6 +407,7 @@ class ImageBuilder:
         tag: str,
         build_args: Optional[Dict[str, str]] = None,
         target: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
     ) -> Tuple[str, bool, str]:
         """Build a single container image.
 
@@ -153,13 +416,22 @@ class ImageBuilder:
         :param tag: Image tag to apply
         :param build_args: Optional build arguments
         :param target: Optional build target stage
+        :param labels: Optional labels to set on the image
         :returns: Tuple of (image_name, success, error_message)
         """
         cmd = ["buildah", "bud"]
 
+        if self.layers:
+            cmd.append("--layers")
+        if self.no_cache:
+            cmd.append("--no-cache")
+
         if target:
             cmd.extend(["--target", target])
 
+        for key, value in (labels or {}).items():
+            cmd.extend(["--label", f"{key}={value}"])
+
         cmd.extend(["-t", tag, "-f", str(containerfile)])
 
         if build_args:
@@ -169,133 +441,303 @@ class ImageBuilder:
 
         cmd.append(str(self.context))
 
-        try:
-            if self.verbose:
-                # Get logger for this image
-                logger = self._get_logger(image)
-
-                # Log build info
-                logger.info("=" * 60)
-                logger.info(f"Building: {tag}")
-                logger.info(f"Command: {' '.join(cmd)}")
-                logger.info("=" * 60)
-
-                # Stream output line-by-line with image prefix
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                )
+        if self.verbose:
+            # Get logger for this image
+            logger = self._get_logger(image)
 
-                # Stream each line through logger
-                for line in process.stdout:
-                    logger.info(line.rstrip())
+            # Log build info
+            logger.info("=" * 60)
+            logger.info(f"Building: {tag}")
+            logger.info(f"Command: {' '.join(cmd)}")
+            logger.info("=" * 60)
 
-                process.wait()
-                if process.returncode != 0:
-                    return (image, False, "Build failed (see output above)")
-                return (image, True, "")
-            else:
-                # Capture output for quiet mode
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                return (image, True, "")
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr if e.stderr else e.stdout
+        start = time.monotonic()
+        if self.verbose:
+            # Stream output line-by-line with image prefix
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            )
+
+            # Stream each line through logger
+            for line in process.stdout:
+                logger.info(line.rstrip())
+            error_msg = "Build failed (see output above)"
+        else:
+            # Capture errors for quiet mode
+            process = subprocess.Popen(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+            )
+            error_msg = process.stderr.read()
+
+        # wait4 reports the resource usage of the build and its children
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        self.build_stats[image] = {
+            "duration": round(time.monotonic() - start, 1),
+            "max_rss": usage.ru_maxrss * 1024,
+            "read_bytes": usage.ru_inblock * 512,
+            "write_bytes": usage.ru_oublock * 512,
+        }
+
+        if process.returncode != 0:
             return (image, False, error_msg)
+        return (image, True, "")
+
+    def _inspect_image(self, tag: str) -> Optional[Dict]:
+        """Inspect a local image.
+
+        :param tag: Image tag
+        :returns: Image inspect data, or None if the image does not exist
+        """
+        result = subprocess.run(
+            ["buildah", "inspect", "--type", "image", tag],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            return None
+        return json.loads(result.stdout)
+
+    def _image_labels(self, tag: str) -> Dict[str, str]:
+        """Get the labels of a local image.
+
+        :param tag: Image tag
+        :returns: Dict of labels, empty if the image does not exist
+        """
+        data = self._inspect_image(tag) or {}
+        return (data.get("OCIv1") or {}).get("config", {}).get("Labels") or {}
+
+    def build_hash(self, build: Dict[str, any]) -> str:
+        """Compute the hash of the inputs of an image build.
+
+        The hash covers the containerfile, the target, the build arguments,
+        the context files copied into the image and the IDs of the parent
+        images, so an image is rebuilt when any of them changes.
+
+        :param build: Build configuration dictionary
+        :returns: Hex digest of the build inputs
+        """
+        containerfile = build["containerfile"]
+        target = build.get("target")
+        digest = hashlib.sha256()
+
+        def add(*values):
+            for value in values:
+                digest.update(value if isinstance(value, bytes) else value.encode())
+                digest.update(b"\0")
+
+        add("containerfile", containerfile.read_bytes(), "target", target or "")
+        for key, value in sorted((build.get("build_args") or {}).items()):
+            if value:
+                add("arg", key, value)
+        for path in parse_context_files(containerfile, self.context, target):
+            add("file", str(path.relative_to(self.context)), path.read_bytes())
+        for base_image in parse_from_images(containerfile, target):
+            data = self._inspect_image(base_image) or {}
+            add("from", base_image, data.get("FromImageID", ""))
+
+        return digest.hexdigest()
+
+    def _build(self, build: Dict[str, any]) -> Tuple[str, bool, str, bool]:
+        """Build an image unless it is up to date.
+
+        :param build: Build configuration dictionary
+        :returns: Tuple of (image_name, success, error_message, up_to_date)
+        """
+        build_hash = self.build_hash(build)
+        if not self.no_cache:
+            if self._image_labels(build["tag"]).get(BUILD_HASH_LABEL) == build_hash:
+                return (build["image"], True, "", True)
+
+        image, success, error = self.build_image(
+            build["image"],
+            build["containerfile"],
+            build["tag"],
+            build_args=build.get("build_args"),
+            target=build.get("target"),
+            labels={BUILD_HASH_LABEL: build_hash},
+        )
+        return (image, success, error, False)
 
     def pull_base_image(self) -> bool:
-        """Pull the Fedora base image to avoid parallel pulls during build.
+        """Pull the external parent images to avoid parallel pulls during build.
 
         :returns: True if successful, False otherwise
         """
         print("Pre-pulling base image...")
-        print("  quay.io/fedora/fedora-minimal:42")
-        try:
-            subprocess.run(
-                ["buildah", "pull", "quay.io/fedora/fedora-minimal:42"],
-                check=True,
-                capture_output=not self.verbose,
-                text=True,
-            )
-            print(f"  {Colors.DONE} Base image pulled\n")
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"  {Colors.FAILED} Failed to pull base image")
-            if self.verbose:
-                print(f"Error: {e.stderr if e.stderr else e.stdout}")
-            return False
+        for base_image in self.external_images:
+            print(f"  {base_image}")
+            try:
+                subprocess.run(
+                    ["buildah", "pull", base_image],
+                    check=True,
+                    capture_output=not self.verbose,
+                    text=True,
+                )
+            except subprocess.CalledProcessError as e:
+                print(f"  {Colors.FAILED} Failed to pull base image")
+                if self.verbose:
+                    print(f"Error: {e.stderr if e.stderr else e.stdout}")
+                return False
+        print(f"  {Colors.DONE} Base image pulled\n")
+        return True
 
-    def build_fedora_based_images(self) -> bool:
-        """Build base and infrastructure images (all based on fedora-minimal).
+    def _resolve_dependencies(self) -> None:
+        """Build the dependency graph from the FROM lines of the containerfiles.
 
-        :returns: True if successful, False otherwise
+        An image depends on every image built here that one of its FROM
+        lines refers to by tag. Other FROM images are external and pulled.
+
+        :raises ValueError: If the dependencies contain a cycle
+        """
+        tags = {build["tag"]: build["image"] for build in self.builds}
+        self.dependencies = {}
+        self.external_images = []
+        for build in self.builds:
+            parents = set()
+            for base_image in parse_from_images(
+                build["containerfile"], build.get("target")
+            ):
+                if base_image in tags:
+                    parents.add(tags[base_image])
+                elif base_image not in self.external_images:
+                    self.external_images.append(base_image)
+            self.dependencies[build["image"]] = parents
+
+        # Raises on cycles
+        self._build_depths()
+
+    def _build_depths(self) -> Dict[str, int]:
+        """Get the number of ancestors on the longest path to each image.
+
+        :returns: Dict of image name to depth
+        :raises ValueError: If the dependencies contain a cycle
         """
-        print("Building Fedora-based images (base + infrastructure)...")
+        depths = {}
+        remaining = dict(self.dependencies)
+        while remaining:
+            ready = [
+                image
+                for image, parents in remaining.items()
+                if all(parent in depths for parent in parents)
+            ]
+            if not ready:
+                raise ValueError(
+                    f"Dependency cycle between images: {', '.join(sorted(remaining))}"
+                )
+            for image in ready:
+                parents = remaining.pop(image)
+                depths[image] = max((depths[p] + 1 for p in parents), default=0)
+        return depths
 
-        build_args = {}
-        containerfile = self.context / "base-openstack.containerfile"
+    def build_images(self) -> bool:
+        """Build all images, each as soon as the images it depends on are built.
 
-        # Prepare all Fedora-based image builds
-        all_builds = [
-            {
-                "image": "base-builder",
-                "containerfile": containerfile,
-                "tag": "localhost/hotstack-os-base-builder:latest",
-                "target": "builder",
-                "build_args": build_args,
-            },
-            {
-                "image": "base-runtime",
-                "containerfile": containerfile,
-                "tag": "localhost/hotstack-os-base:latest",
-                "target": "runtime",
-                "build_args": build_args,
-            },
-        ]
+        At most parallel_jobs builds run at a time, images with the longest
+        estimated remaining build path first. Another build is only started
+        while there is enough free memory and disk for its usage recorded in
+        the build history. Images depending on a failed build are not built.
+        Images whose build hash matches the label of the existing image are
+        up to date and not rebuilt.
 
-        # Add infrastructure images
-        all_builds.extend(self._prepare_infra_image_builds())
+        :returns: True if successful, False otherwise
+        """
+        print("Building images...")
 
+        builds = {build["image"]: build for build in self.builds}
+        waiting = {image: set(parents) for image, parents in self.dependencies.items()}
         failed_builds = []
+        up_to_date = []
         completed = 0
-        total = len(all_builds)
+        total = len(builds)
+
+        def report(image, success, error, cached=False):
+            nonlocal completed
+            completed += 1
+            if cached:
+                print(f"  [{completed}/{total}] {image} {Colors.CACHED}")
+                up_to_date.append(image)
+            elif success:
+                print(f"  [{completed}/{total}] {image} {Colors.DONE}")
+            else:
+                print(f"  [{completed}/{total}] {image} {Colors.FAILED}")
+                failed_builds.append((image, error))
+
+        priorities = self._priorities()
+        ready = []
+        throttled = set()
+        started = {}
 
-        # Build all Fedora-based images in parallel
         with ThreadPoolExecutor(max_workers=self.parallel_jobs) as executor:
             future_to_image = {}
-            for build in all_builds:
-                future = executor.submit(
-                    self.build_image,
-                    build["image"],
-                    build["containerfile"],
-                    build["tag"],
-                    build_args=build.get("build_args"),
-                    target=build.get("target"),
+
+            def submit_ready():
+                """Start ready builds, returns True if throttled on resources"""
+                for image in [i for i in builds if i in waiting and not waiting[i]]:
+                    del waiting[image]
+                    ready.append(image)
+                ready.sort(key=lambda i: priorities[i], reverse=True)
+
+                while ready and len(future_to_image) < self.parallel_jobs:
+                    image = ready[0]
+                    # Always keep one build running
+                    running = {i: started[i] for i in future_to_image.values()}
+                    if running and not self._resources_available(image, running):
+                        if image not in throttled:
+                            print(f"  {image} waiting for free memory or disk")
+                            throttled.add(image)
+                        return True
+                    ready.pop(0)
+                    started[image] = time.monotonic()
+                    future = executor.submit(self._build, builds[image])
+                    future_to_image[future] = image
+                return False
+
+            is_throttled = submit_ready()
+            while future_to_image:
+                done, _ = wait(
+                    future_to_image,
+                    timeout=RESOURCE_POLL_INTERVAL if is_throttled else None,
+                    return_when=FIRST_COMPLETED,
                 )
-                future_to_image[future] = build["image"]
-
-            # Process completed builds
-            for future in as_completed(future_to_image):
-                image_name = future_to_image[future]
-                try:
-                    image, success, error = future.result()
-                    completed += 1
+                for future in done:
+                    image_name = future_to_image.pop(future)
+                    try:
+                        image, success, error, cached = future.result()
+                    except Exception as e:
+                        image, success, error, cached = image_name, False, str(e), False
+                    report(image, success, error, cached)
+
                     if success:
-                        print(f"  [{completed}/{total}] {image} {Colors.DONE}")
-                    else:
-                        print(f"  [{completed}/{total}] {image} {Colors.FAILED}")
-                        failed_builds.append((image, error))
-                except Exception as e:
-                    completed += 1
-                    print(f"  [{completed}/{total}] {image_name} {Colors.FAILED}")
-                    failed_builds.append((image_name, str(e)))
+                        for parents in waiting.values():
+                            parents.discard(image)
+                        continue
+
+                    # Skip everything depending on the failed image
+                    failed = [image]
+                    while failed:
+                        parent = failed.pop()
+                        for child in [i for i, p in waiting.items() if parent in p]:
+                            del waiting[child]
+                            report(child, False, f"Dependency {parent} failed")
+                            failed.append(child)
+
+                is_throttled = submit_ready()
+
+        self._save_history()
 
         if failed_builds:
             self._report_build_failures(failed_builds)
             return False
 
+        print(
+            f"\n{Colors.DONE} All images built successfully "
+            f"({len(up_to_date)} of {total} up to date)"
+        )
         return True
 
     def _report_build_failures(self, failed_builds: List[Tuple[str, str]]) -> None:
@@ -312,9 +754,33 @@ class ImageBuilder:
             print(f"  {error[:500]}")  # Truncate long errors
         print("\nIf you see permission errors, try: buildah unshare buildah rm --all")
         print(
-            f"If you see storage/layer errors, try reducing BUILD_PARALLEL in .env (current: {self.parallel_jobs})"
+            "If you see storage/layer errors, try raising BUILD_MIN_FREE_DISK_MB "
+            f"or reducing BUILD_PARALLEL in .env (current: {self.parallel_jobs})"
         )
 
+    def _prepare_base_image_builds(self) -> List[Dict[str, any]]:
+        """Prepare base image build configurations.
+
+        :returns: List of build configuration dictionaries
+        """
+        containerfile = self.context / "base-openstack.containerfile"
+        return [
+            {
+                "image": "base-builder",
+                "containerfile": containerfile,
+                "tag": "localhost/hotstack-os-base-builder:latest",
+                "target": "builder",
+                "build_args": {},
+            },
+            {
+                "image": "base-runtime",
+                "containerfile": containerfile,
+                "tag": "localhost/hotstack-os-base:latest",
+                "target": "runtime",
+                "build_args": {},
+            },
+        ]
+
     def _prepare_infra_image_builds(self) -> List[Dict[str, any]]:
         """Prepare infrastructure image build configurations.
 
@@ -353,58 +819,6 @@ class ImageBuilder:
             )
         return builds
 
-    def build_openstack_service_images(self) -> bool:
-        """Build OpenStack service container images (depend on base images).
-
-        :returns: True if successful, False otherwise
-        """
-        print(f"\nBuilding OpenStack service images...")
-
-        # Prepare OpenStack image builds only
-        all_images = self._prepare_openstack_image_builds()
-
-        # Build images using ThreadPoolExecutor (works for both serial and parallel)
-        failed_builds = []
-        completed = 0
-        total = len(all_images)
-
-        with ThreadPoolExecutor(max_workers=self.parallel_jobs) as executor:
-            # Submit all build jobs
-            future_to_image = {}
-            for img in all_images:
-                future = executor.submit(
-                    self.build_image,
-                    img["image"],
-                    img["containerfile"],
-                    img["tag"],
-                    build_args=img.get("build_args"),
-                )
-                future_to_image[future] = img["image"]
-
-            # Process completed builds
-            for future in as_completed(future_to_image):
-                image_name = future_to_image[future]
-                try:
-                    image, success, error = future.result()
-                    completed += 1
-                    if success:
-                        print(f"  [{completed}/{total}] {image} {Colors.DONE}")
-                    else:
-                        print(f"  [{completed}/{total}] {image} {Colors.FAILED}")
-                        failed_builds.append((image, error))
-                except Exception as e:
-                    completed += 1
-                    print(f"  [{completed}/{total}] {image_name} {Colors.FAILED}")
-                    failed_builds.append((image_name, str(e)))
-
-        # Report results
-        if failed_builds:
-            self._report_build_failures(failed_builds)
-            return False
-
-        print(f"\n{Colors.DONE} All OpenStack service images built successfully")
-        return True
-
 
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments.
@@ -421,11 +835,17 @@ def parse_arguments() -> argparse.Namespace:
         "--parallel",
         type=int,
         default=None,
-        help="Number of parallel builds (default: from BUILD_PARALLEL env or 1)",
+        help="Maximum number of parallel builds, 0 for the number of CPUs "
+        "(default: from BUILD_PARALLEL env or 1)",
     )
     parser.add_argument(
         "--verbose", action="store_true", help="Show verbose build output"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rebuild all images, ignoring build hashes and cached layers",
+    )
 
     return parser.parse_args()
 
@@ -470,7 +890,8 @@ def main():
     if args.parallel is not None:
         parallel_jobs = args.parallel
     else:
-        parallel_jobs = int(os.environ.get("BUILD_PARALLEL", "1"))
+        parallel_jobs = os.environ.get("BUILD_PARALLEL", "1")
+        parallel_jobs = 0 if parallel_jobs == "auto" else int(parallel_jobs)
 
     # Get image lists from environment (comma-separated) or use defaults
     infra_images = None
@@ -495,6 +916,14 @@ def main():
         infra_images=infra_images,
         openstack_images=openstack_images,
         verbose=args.verbose,
+        layers=os.environ.get("BUILD_LAYERS", "true").lower() == "true",
+        no_cache=args.no_cache,
+        history_file=Path(
+            os.environ.get("BUILD_HISTORY_FILE", project_dir / ".build-history.json")
+        ),
+        min_free_memory=int(os.environ.get("BUILD_MIN_FREE_MEMORY_MB", "1024"))
+        * 1024**2,
+        min_free_disk=int(os.environ.get("BUILD_MIN_FREE_DISK_MB", "10240")) * 1024**2,
     )
 
     # Print build plan
@@ -505,13 +934,8 @@ def main():
         print(f"\n{Colors.RED}Failed to pull base image!{Colors.NC}")
         return 1
 
-    # Phase 1: Build Fedora-based images (base + infrastructure) in parallel
-    if not builder.build_fedora_based_images():
-        print(f"\n{Colors.RED}Fedora-based image build failed!{Colors.NC}")
-        return 1
-
-    # Phase 2: Build OpenStack service images (depend on base images)
-    if not builder.build_openstack_service_images():
+    # Build all images in dependency order
+    if not builder.build_images():
         return 1
 
     print(f"\n{Colors.GREEN}[DONE]{Colors.NC} Build complete!")
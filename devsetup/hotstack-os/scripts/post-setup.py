@@ -17,9 +17,15 @@
 """Post-setup script to create default resources for HotStack"""
 
 import argparse
+import hashlib
 import os
+import re
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
+import urllib.parse
 import urllib.request
 import urllib.error
 from datetime import datetime
@@ -48,6 +54,12 @@ class Colors:
 # Cache directory for downloaded images
 CACHE_DIR = Path.home() / ".cache" / "hotstack-os" / "images"
 
+# Image download settings
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_RETRIES = 3
+PROGRESS_INTERVAL = 1
+
 
 def load_env_var(var_name, default=None):
     """Load a variable from .env file"""
@@ -102,6 +114,33 @@ QUOTA_VOLUME_PER_VOLUME_GIGABYTES = int(
     load_env_var("HOTSTACK_QUOTA_VOLUME_PER_VOLUME_GIGABYTES", "500")
 )
 
+# Quotas by service, keys are openstacksdk quota attribute names
+QUOTAS = {
+    "compute": {
+        "cores": QUOTA_COMPUTE_CORES,
+        "ram": QUOTA_COMPUTE_RAM,
+        "instances": QUOTA_COMPUTE_INSTANCES,
+        "key_pairs": QUOTA_COMPUTE_KEY_PAIRS,
+        "server_groups": QUOTA_COMPUTE_SERVER_GROUPS,
+        "server_group_members": QUOTA_COMPUTE_SERVER_GROUP_MEMBERS,
+    },
+    "network": {
+        "networks": QUOTA_NETWORK_NETWORKS,
+        "subnets": QUOTA_NETWORK_SUBNETS,
+        "ports": QUOTA_NETWORK_PORTS,
+        "routers": QUOTA_NETWORK_ROUTERS,
+        "floating_ips": QUOTA_NETWORK_FLOATINGIPS,
+        "security_groups": QUOTA_NETWORK_SECURITY_GROUPS,
+        "security_group_rules": QUOTA_NETWORK_SECURITY_GROUP_RULES,
+    },
+    "volume": {
+        "volumes": QUOTA_VOLUME_VOLUMES,
+        "snapshots": QUOTA_VOLUME_SNAPSHOTS,
+        "gigabytes": QUOTA_VOLUME_GIGABYTES,
+        "per_volume_gigabytes": QUOTA_VOLUME_PER_VOLUME_GIGABYTES,
+    },
+}
+
 # Network configuration defaults (can be overridden in .env)
 DEFAULT_PRIVATE_CIDR = load_env_var("HOTSTACK_PRIVATE_CIDR", "192.168.100.0/24")
 DEFAULT_PROVIDER_CIDR = load_env_var("HOTSTACK_PROVIDER_CIDR", "172.31.0.128/25")
@@ -120,6 +159,9 @@ ROUTER_NAME = "router1"
 DEFAULT_CLOUD = load_env_var("HOTSTACK_CLOUD", "hotstack-os")
 DEFAULT_ADMIN_CLOUD = load_env_var("HOTSTACK_ADMIN_CLOUD", "hotstack-os-admin")
 
+# Desired state file, see desired_state (can be overridden in .env)
+DEFAULT_STATE_FILE = load_env_var("HOTSTACK_STATE_FILE")
+
 # Flavor specifications
 FLAVORS = [
     {"name": "hotstack.small", "vcpus": 1, "ram": 2048, "disk": 20},
@@ -185,11 +227,31 @@ DEFAULT_UBUNTU_NOBLE_URL = load_env_var(
     "https://cloud-images.ubuntu.com/noble/current/noble-server-cloudimg-amd64.img",
 )
 
+# Concurrent image downloads and uploads (can be overridden in .env)
+DOWNLOAD_WORKERS = int(load_env_var("HOTSTACK_DOWNLOAD_WORKERS", "4"))
+
+# Concurrent setup tasks, see run_tasks (can be overridden in .env)
+SETUP_WORKERS = int(load_env_var("HOTSTACK_SETUP_WORKERS", "4"))
+
+# Serializes the output of concurrently running setup tasks
+OUTPUT_LOCK = threading.RLock()
+
+# Glance image upload method (can be overridden in .env)
+# upload: upload the image data, streaming it while it downloads
+# glance-direct: stage the image data and use the Glance image import
+# web-download: Glance downloads the image from its URL, nothing is cached
+IMAGE_IMPORT_METHODS = ["upload", "glance-direct", "web-download"]
+DEFAULT_IMAGE_IMPORT_METHOD = load_env_var("HOTSTACK_IMAGE_IMPORT_METHOD", "upload")
+IMAGE_IMPORT_TIMEOUT = 3600
+
 # Image specifications (name, disk format, and Glance properties)
+# checksum_file is the name of the SHA256 checksum file published next to
+# the image, downloads are verified against it.
 IMAGE_SPECS = [
     {
         "name": "cirros",
         "url_param": "cirros_url",
+        "checksum_file": "SHA256SUMS",
         "disk_format": "qcow2",
         "properties": {},
         "is_test_image": True,  # Mark as test image for filtering
@@ -197,6 +259,7 @@ IMAGE_SPECS = [
     {
         "name": "CentOS-Stream-GenericCloud-9",
         "url_param": "centos_stream_9_url",
+        "checksum_file": "CHECKSUM",
         "disk_format": "qcow2",
         "properties": {
             "hw_firmware_type": "uefi",
@@ -271,6 +334,7 @@ IMAGE_SPECS = [
     {
         "name": "ubuntu-noble-server",
         "url_param": "ubuntu_noble_url",
+        "checksum_file": "SHA256SUMS",
         "disk_format": "qcow2",
         "properties": {
             "hw_firmware_type": "uefi",
@@ -280,26 +344,40 @@ IMAGE_SPECS = [
 ]
 
 
+def _print_line(line, file=None):
+    """Print a line of a concurrently running setup task
+
+    Lines are printed whole and above the download progress line, if any.
+    """
+    with OUTPUT_LOCK:
+        progress = DownloadProgress.active
+        if progress:
+            progress.clear()
+        print(line, file=file)
+        if progress:
+            progress.redraw()
+
+
 def print_success(message, indent=True):
     """Print success message in green"""
     prefix = "  " if indent else ""
-    print(f"{prefix}{Colors.OK} {message}")
+    _print_line(f"{prefix}{Colors.OK} {message}")
 
 
 def print_warning(message):
     """Print warning message in yellow"""
-    print(f"{Colors.WARNING} {message}")
+    _print_line(f"{Colors.WARNING} {message}")
 
 
 def print_info(message, indent=True):
     """Print info message in blue"""
     prefix = "  " if indent else ""
-    print(f"{prefix}{Colors.INFO} {message}")
+    _print_line(f"{prefix}{Colors.INFO} {message}")
 
 
 def print_error(message):
     """Print error message in red"""
-    print(f"{Colors.ERROR} {message}", file=sys.stderr)
+    _print_line(f"{Colors.ERROR} {message}", file=sys.stderr)
 
 
 def handle_openstack_error(error, context):
@@ -339,11 +417,18 @@ def backup_file(file_path):
     return backup_path
 
 
+def _first(resources):
+    """Return the first resource of a list call, or None"""
+    return next(iter(resources), None)
+
+
 def create_hotstack_project_and_user(admin_conn):
     """Create hotstack project and user"""
     try:
         # Create hotstack project
-        project = admin_conn.identity.find_project("hotstack")
+        project = _first(
+            admin_conn.identity.projects(name="hotstack", domain_id="default")
+        )
         project_created = False
         if not project:
             project = admin_conn.identity.create_project(
@@ -354,7 +439,7 @@ def create_hotstack_project_and_user(admin_conn):
             project_created = True
 
         # Create hotstack user
-        user = admin_conn.identity.find_user("hotstack")
+        user = _first(admin_conn.identity.users(name="hotstack", domain_id="default"))
         user_created = False
         if not user:
             user = admin_conn.identity.create_user(
@@ -366,10 +451,11 @@ def create_hotstack_project_and_user(admin_conn):
             user_created = True
 
         # Assign member role to hotstack user in hotstack project
-        member_role = admin_conn.identity.find_role("member")
+        roles = {x.name: x for x in admin_conn.identity.roles()}
+        member_role = roles.get("member")
         if not member_role:
             print_warning("Member role not found, trying _member_ role")
-            member_role = admin_conn.identity.find_role("_member_")
+            member_role = roles.get("_member_")
 
         if member_role:
             try:
@@ -389,54 +475,47 @@ def create_hotstack_project_and_user(admin_conn):
         handle_openstack_error(e, "create hotstack project/user")
 
 
-def set_project_quotas(admin_conn, project_id):
-    """Set quotas for the hotstack project"""
+def set_project_quotas(admin_conn, project_id, quotas=QUOTAS):
+    """Set quotas for the hotstack project
+
+    Args:
+        admin_conn: OpenStack connection with admin privileges
+        project_id: ID of the hotstack project
+        quotas: Dictionary mapping compute, network and volume to the quotas
+            of the service
+    """
     try:
         # Set compute quotas
-        admin_conn.compute.update_quota_set(
-            project_id,
-            cores=QUOTA_COMPUTE_CORES,
-            ram=QUOTA_COMPUTE_RAM,
-            instances=QUOTA_COMPUTE_INSTANCES,
-            key_pairs=QUOTA_COMPUTE_KEY_PAIRS,
-            server_groups=QUOTA_COMPUTE_SERVER_GROUPS,
-            server_group_members=QUOTA_COMPUTE_SERVER_GROUP_MEMBERS,
-        )
+        if quotas.get("compute"):
+            admin_conn.compute.update_quota_set(project_id, **quotas["compute"])
 
         # Set network quotas
-        admin_conn.network.update_quota(
-            project_id,
-            network=QUOTA_NETWORK_NETWORKS,
-            subnet=QUOTA_NETWORK_SUBNETS,
-            port=QUOTA_NETWORK_PORTS,
-            router=QUOTA_NETWORK_ROUTERS,
-            floatingip=QUOTA_NETWORK_FLOATINGIPS,
-            security_group=QUOTA_NETWORK_SECURITY_GROUPS,
-            security_group_rule=QUOTA_NETWORK_SECURITY_GROUP_RULES,
-        )
+        if quotas.get("network"):
+            admin_conn.network.update_quota(project_id, **quotas["network"])
 
         # Set volume quotas
-        admin_conn.block_storage.update_quota_set(
-            project_id,
-            volumes=QUOTA_VOLUME_VOLUMES,
-            snapshots=QUOTA_VOLUME_SNAPSHOTS,
-            gigabytes=QUOTA_VOLUME_GIGABYTES,
-            per_volume_gigabytes=QUOTA_VOLUME_PER_VOLUME_GIGABYTES,
-        )
+        if quotas.get("volume"):
+            admin_conn.block_storage.update_quota_set(project_id, **quotas["volume"])
 
         print_success("Quotas set for hotstack project")
     except Exception as e:
         handle_openstack_error(e, "set quotas")
 
 
-def create_flavors(conn):
+def create_flavors(conn, flavors=FLAVORS):
     """Create default flavors"""
     created = 0
     existing = 0
-    for flavor_spec in FLAVORS:
+    try:
+        # List existing flavors once instead of a lookup per flavor
+        existing_flavors = {x.name for x in conn.compute.flavors(details=False)}
+    except Exception as e:
+        handle_openstack_error(e, "list flavors")
+
+    for flavor_spec in flavors:
         try:
             # Check if flavor already exists
-            if conn.compute.find_flavor(flavor_spec["name"]):
+            if flavor_spec["name"] in existing_flavors:
                 existing += 1
                 continue
 
@@ -485,8 +564,9 @@ def create_provider_network(
 
     try:
         # Create external network if it doesn't exist
-        network = conn.network.find_network(EXTERNAL_NETWORK_NAME)
+        network = _first(conn.network.networks(name=EXTERNAL_NETWORK_NAME))
         network_created = False
+        subnet = None
         if not network:
             network = conn.network.create_network(
                 name=EXTERNAL_NETWORK_NAME,
@@ -496,9 +576,12 @@ def create_provider_network(
                 provider_network_type=network_type,
             )
             network_created = True
+        else:
+            subnet = _first(
+                conn.network.subnets(name=EXTERNAL_SUBNET_NAME, network_id=network.id)
+            )
 
         # Create subnet if it doesn't exist
-        subnet = conn.network.find_subnet(EXTERNAL_SUBNET_NAME)
         subnet_created = False
         if not subnet:
             subnet_params = {
@@ -543,16 +626,20 @@ def create_default_network(conn, cidr, dns_nameservers=None, allocation_pools=No
 
     try:
         # Create network if it doesn't exist
-        network = conn.network.find_network(PRIVATE_NETWORK_NAME)
+        network = _first(conn.network.networks(name=PRIVATE_NETWORK_NAME))
         network_created = False
+        subnet = None
         if not network:
             network = conn.network.create_network(
                 name=PRIVATE_NETWORK_NAME, is_shared=True
             )
             network_created = True
+        else:
+            subnet = _first(
+                conn.network.subnets(name=PRIVATE_SUBNET_NAME, network_id=network.id)
+            )
 
         # Create subnet if it doesn't exist
-        subnet = conn.network.find_subnet(PRIVATE_SUBNET_NAME)
         subnet_created = False
         if not subnet:
             subnet_params = {
@@ -588,7 +675,7 @@ def create_router(conn, external_network, private_network):
     """
     try:
         # Create router if it doesn't exist
-        router = conn.network.find_router(ROUTER_NAME)
+        router = _first(conn.network.routers(name=ROUTER_NAME))
         router_created = False
         if not router:
             router = conn.network.create_router(
@@ -598,7 +685,11 @@ def create_router(conn, external_network, private_network):
             router_created = True
 
             # Add interface to private network
-            private_subnet = conn.network.find_subnet(PRIVATE_SUBNET_NAME)
+            private_subnet = _first(
+                conn.network.subnets(
+                    name=PRIVATE_SUBNET_NAME, network_id=private_network.id
+                )
+            )
             if private_subnet:
                 try:
                     conn.network.add_interface_to_router(
@@ -625,34 +716,62 @@ def _add_security_group_rule(conn, sg_id, rule_config):
         return False
 
 
-def configure_security_groups(conn, project_name="admin"):
-    """Configure security groups for a project"""
-    try:
-        # Find project
-        project = conn.identity.find_project(project_name)
-        if not project:
-            print_error(f"{project_name} project not found")
-            sys.exit(1)
+def _rule_key(rule):
+    """Key of a security group rule config or object, for comparison"""
+    return tuple(
+        rule.get(x) if isinstance(rule, dict) else getattr(rule, x)
+        for x in (
+            "direction",
+            "protocol",
+            "port_range_min",
+            "port_range_max",
+            "remote_ip_prefix",
+        )
+    )
 
+
+def configure_security_groups(conn, project_id, project_name):
+    """Configure security groups for a project
+
+    The existing rules are listed once and the missing rules are created
+    with a single bulk request.
+
+    Args:
+        conn: OpenStack connection object
+        project_id: ID of the project
+        project_name: Name of the project, for messages
+    """
+    try:
         # Find default security group for the project
-        security_groups = list(
-            conn.network.security_groups(project_id=project.id, name="default")
-        )
+        sg = _first(conn.network.security_groups(project_id=project_id, name="default"))
 
-        if not security_groups:
+        if not sg:
             print_error("Could not find default security group")
             sys.exit(1)
 
-        sg = security_groups[0]
+        existing_rules = {
+            _rule_key(x)
+            for x in conn.network.security_group_rules(security_group_id=sg.id)
+        }
+        missing_rules = [
+            x for x in SECURITY_GROUP_RULES if _rule_key(x) not in existing_rules
+        ]
 
-        rules_added = 0
-        rules_existing = 0
+        if missing_rules:
+            try:
+                list(
+                    conn.network.create_security_group_rules(
+                        [dict(security_group_id=sg.id, **x) for x in missing_rules]
+                    )
+                )
+            except exceptions.ConflictException:
+                # Bulk creation is all or nothing, a rule was added meanwhile
+                missing_rules = [
+                    x for x in missing_rules if _add_security_group_rule(conn, sg.id, x)
+                ]
 
-        for rule in SECURITY_GROUP_RULES:
-            if _add_security_group_rule(conn, sg.id, rule):
-                rules_added += 1
-            else:
-                rules_existing += 1
+        rules_added = len(missing_rules)
+        rules_existing = len(SECURITY_GROUP_RULES) - rules_added
 
         if rules_added > 0:
             print_success(
@@ -798,88 +917,463 @@ def write_cloud_secret_file(app_cred, auth_url, output_path):
         return None
 
 
-def setup_networking(conn, args):
-    """Set up all networking components (networks, router, security groups)"""
-    # Create default network (shared)
-    private_network = create_default_network(
-        conn,
-        cidr=args.cidr,
-        dns_nameservers=args.dns_nameservers,
-        allocation_pools=args.allocation_pools,
-    )
+def run_tasks(tasks, max_workers=SETUP_WORKERS):
+    """Run setup tasks concurrently, each once its dependencies are done
 
-    # Create provider network (external, shared)
-    external_network = None
-    if not args.no_provider_network:
-        external_network = create_provider_network(
-            conn,
-            cidr=args.provider_cidr,
-            gateway=args.provider_gateway,
-            allocation_pools=args.provider_allocation_pools,
-            physical_network=args.physical_network,
-            network_type=args.network_type,
+    A failing task stops scheduling, the tasks already running are finished
+    and its exception is raised.
+
+    Args:
+        tasks: Dictionary mapping task names to (function, dependencies)
+            tuples, functions are called with a dictionary mapping the names
+            of the tasks done so far to their results
+        max_workers: Maximum number of tasks running concurrently
+
+    Returns:
+        Dictionary mapping task names to the results of their functions
+    """
+    results = {}
+    pending = dict(tasks)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        while pending or running:
+            for name, (func, dependencies) in list(pending.items()):
+                if all(x in results for x in dependencies):
+                    del pending[name]
+                    running[executor.submit(func, dict(results))] = name
+
+            if not running:
+                raise ValueError(f"Unresolvable task dependencies: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    return results
+
+
+class DownloadProgress:
+    """Aggregate progress reporting for concurrent downloads"""
+
+    # Progress line currently shown, kept below the lines of other tasks
+    active = None
+
+    def __init__(self, total_images):
+        self.lock = OUTPUT_LOCK
+        self.total_images = total_images
+        self.done_images = 0
+        self.sizes = {}
+        self.downloaded = {}
+        self.last_print = 0
+        # Disable progress output in CI environments
+        self.enabled = not os.environ.get("HOTSTACK_NO_PROGRESS")
+
+    def start(self, name, size, offset=0):
+        with self.lock:
+            self.sizes[name] = size
+            self.downloaded[name] = offset
+
+    def update(self, name, nbytes):
+        with self.lock:
+            self.downloaded[name] = self.downloaded.get(name, 0) + nbytes
+            self._print()
+
+    def finish(self, name):
+        with self.lock:
+            self.done_images += 1
+            self._print(force=True)
+
+    def _print(self, force=False):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_print < PROGRESS_INTERVAL:
+            return
+        self.last_print = now
+        downloaded_mb = sum(self.downloaded.values()) / (1024 * 1024)
+        total_mb = sum(self.sizes.values()) / (1024 * 1024)
+        print(
+            f"\r  Downloading: {self.done_images}/{self.total_images} images, "
+            f"{downloaded_mb:.1f}/{total_mb:.1f} MB",
+            end="",
+            flush=True,
         )
 
-    # Create router to connect private and external networks
-    if not args.no_router and external_network and private_network:
-        create_router(conn, external_network, private_network)
+    def clear(self):
+        """Clear the progress line before another line is printed"""
+        if self.enabled:
+            print("\r\033[K", end="")
+
+    def redraw(self):
+        self._print(force=True)
+
+    def open(self):
+        with self.lock:
+            DownloadProgress.active = self
+
+    def close(self):
+        with self.lock:
+            DownloadProgress.active = None
+            if self.enabled and self.total_images:
+                print()  # New line after progress
+
+
+def _sha256sum(path):
+    """Compute the SHA256 of a file"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
 
-    # Configure security groups for both projects
-    configure_security_groups(conn, "admin")
-    configure_security_groups(conn, "hotstack")
+def fetch_published_checksum(image_url, checksum_file):
+    """Fetch the published SHA256 of an image
 
-    return external_network
+    Supports the GNU ("<sha256>  <file>") and BSD ("SHA256 (<file>) = <sha256>")
+    checksum file formats.
 
+    Args:
+        image_url: URL of the image
+        checksum_file: Name of the checksum file next to the image
 
-def _progress_callback(image_name):
-    """Create a progress callback for download progress reporting"""
-    # Disable progress bars in CI environments
-    if os.environ.get("HOTSTACK_NO_PROGRESS"):
+    Returns:
+        SHA256 hex digest, or None if not published
+    """
+    checksum_url = urllib.parse.urljoin(image_url, checksum_file)
+    filename = urllib.parse.urlsplit(image_url).path.rsplit("/", 1)[-1]
+    try:
+        with urllib.request.urlopen(checksum_url, timeout=DOWNLOAD_TIMEOUT) as resp:
+            lines = resp.read().decode(errors="replace").splitlines()
+    except (urllib.error.URLError, OSError) as e:
+        print_warning(f"Could not fetch checksums from {checksum_url}: {e}")
         return None
 
-    def show_progress(block_num, block_size, total_size):
-        if total_size > 0:
-            downloaded = block_num * block_size
-            percent = min(100, (downloaded * 100) // total_size)
-            downloaded_mb = downloaded / (1024 * 1024)
-            total_mb = total_size / (1024 * 1024)
-            print(
-                f"\r  {image_name}: {percent}% ({downloaded_mb:.1f}/{total_mb:.1f} MB)",
-                end="",
-                flush=True,
+    for line in lines:
+        bsd = re.match(r"^SHA256 \((.+)\) = ([0-9a-fA-F]{64})$", line.strip())
+        if bsd and bsd.group(1) == filename:
+            return bsd.group(2).lower()
+        fields = line.split()
+        if (
+            len(fields) == 2
+            and re.match(r"^[0-9a-fA-F]{64}$", fields[0])
+            and fields[1].lstrip("*") == filename
+        ):
+            return fields[0].lower()
+
+    print_warning(f"No SHA256 checksum for {filename} in {checksum_url}")
+    return None
+
+
+def _download_file(name, url, part_path, progress):
+    """Download a URL to part_path, resuming a partial download
+
+    Retries with an HTTP Range request from the size of part_path, starts
+    over if the server does not support ranges.
+    """
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as resp:
+                if offset and resp.status != 206:
+                    # Range not supported, start over
+                    offset = 0
+                size = int(resp.headers.get("Content-Length") or 0) + offset
+                progress.start(name, size, offset)
+                with open(part_path, "ab" if offset else "wb") as f:
+                    for chunk in iter(lambda: resp.read(DOWNLOAD_CHUNK_SIZE), b""):
+                        f.write(chunk)
+                        progress.update(name, len(chunk))
+            return
+        except urllib.error.HTTPError as e:
+            if e.code == 416:
+                # Range starts at or past the end, the partial file is complete
+                return
+            raise
+        except (urllib.error.URLError, OSError):
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+
+
+def _cache_paths(cache_path):
+    """Get the partial download and checksum paths of a cached image"""
+    return (
+        cache_path.with_name(cache_path.name + ".part"),
+        cache_path.with_name(cache_path.name + ".sha256"),
+    )
+
+
+def _is_cached(cache_path, checksum):
+    """Check if a cached image is valid, removing it if outdated
+
+    A cached image is valid while its recorded SHA256 matches the published
+    checksum, or if there is no published checksum.
+    """
+    if not cache_path.exists():
+        return False
+    _, sum_path = _cache_paths(cache_path)
+    cached_sum = sum_path.read_text().strip() if sum_path.exists() else None
+    if checksum is None or cached_sum == checksum:
+        return True
+    # A newer image was published
+    cache_path.unlink()
+    return False
+
+
+def _commit_download(cache_path, checksum):
+    """Rename a complete download into the cache and record its checksum"""
+    part_path, sum_path = _cache_paths(cache_path)
+    if checksum:
+        sum_path.write_text(checksum + "\n")
+    elif sum_path.exists():
+        sum_path.unlink()
+    os.replace(part_path, cache_path)
+
+
+def download_image(spec, image_url, cache_path, progress, checksum=None):
+    """Download an image into the cache and verify its checksum
+
+    The image is downloaded to <cache_path>.part and renamed into place once
+    complete and verified. A verified download records its SHA256 in
+    <cache_path>.sha256, a cached image is reused while it matches the
+    published checksum.
+
+    Returns:
+        "cached" or "downloaded" if the image is in the cache, None otherwise
+    """
+    if _is_cached(cache_path, checksum):
+        return "cached"
+
+    part_path, _ = _cache_paths(cache_path)
+    try:
+        for attempt in (1, 2):
+            _download_file(spec["name"], image_url, part_path, progress)
+            if not checksum:
+                break
+            actual = _sha256sum(part_path)
+            if actual == checksum:
+                break
+            # The partial download may be from an older image, start over
+            part_path.unlink()
+            if attempt == 2:
+                raise ValueError(
+                    f"SHA256 mismatch, expected {checksum} but got {actual}"
+                )
+
+        _commit_download(cache_path, checksum)
+        return "downloaded"
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            print_warning(f"Image {spec['name']} not found at {image_url} (404)")
+            print_warning(
+                "The image may not be published yet. Run the GitHub workflow to build and release it.",
+            )
+        else:
+            print_warning(
+                f"Failed to download {spec['name']}: HTTP {e.code} - {e.reason}",
             )
+    except Exception as e:
+        print_warning(f"Failed to download {spec['name']}: {e}")
+    return None
+
+
+def _image_kwargs(spec):
+    """Get the Glance image create arguments of an image spec"""
+    return dict(
+        name=spec["name"],
+        disk_format=spec["disk_format"],
+        container_format="bare",
+        visibility="public",
+        **spec["properties"],
+    )
+
+
+def stream_image(conn, spec, image_url, cache_path, progress, checksum=None):
+    """Upload an image to Glance while downloading it into the cache
 
-    return show_progress
+    The download is written to <cache_path>.part and sent to Glance chunk by
+    chunk, so the upload does not wait for the download to complete. If the
+    download does not match the published checksum the Glance image is
+    deleted.
+
+    Returns:
+        True if the image was uploaded and cached
+    """
+    part_path, _ = _cache_paths(cache_path)
+    sha256 = hashlib.sha256()
+
+    # Open the URL first, so HTTP errors do not create a Glance image
+    resp = urllib.request.urlopen(image_url, timeout=DOWNLOAD_TIMEOUT)
+    progress.start(spec["name"], int(resp.headers.get("Content-Length") or 0))
+
+    def chunks():
+        with resp:
+            with open(part_path, "wb") as f:
+                for chunk in iter(lambda: resp.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    progress.update(spec["name"], len(chunk))
+                    yield chunk
+
+    image = conn.image.create_image(data=chunks(), **_image_kwargs(spec))
+    if checksum and sha256.hexdigest() != checksum:
+        conn.image.delete_image(image, ignore_missing=True)
+        part_path.unlink()
+        raise ValueError(
+            f"SHA256 mismatch, expected {checksum} but got {sha256.hexdigest()}"
+        )
 
+    _commit_download(cache_path, checksum)
+    return True
 
-def download_images(conn, image_urls):
-    """Download images from provided URLs and return list of images ready to upload
+
+def upload_image(conn, spec, cache_path, method):
+    """Upload a cached image to Glance
 
     Args:
         conn: OpenStack connection object
-        image_urls: Dictionary mapping url_param names to URLs
+        spec: Image spec
+        cache_path: Path of the cached image
+        method: "upload" to upload the image data, "glance-direct" to stage
+            it and use the Glance image import
+    """
+    with open(cache_path, "rb") as image_file:
+        conn.image.create_image(
+            data=image_file,
+            use_import=method == "glance-direct",
+            **_image_kwargs(spec),
+        )
+
+
+def import_image_from_url(conn, spec, image_url):
+    """Have Glance download an image with the web-download import method"""
+    image = conn.image.create_image(
+        use_import=True,
+        import_method="web-download",
+        uri=image_url,
+        **_image_kwargs(spec),
+    )
+    try:
+        conn.image.wait_for_status(
+            image,
+            status="active",
+            failures=["killed", "deleted"],
+            interval=5,
+            wait=IMAGE_IMPORT_TIMEOUT,
+        )
+    except Exception:
+        conn.image.delete_image(image, ignore_missing=True)
+        raise
+
+
+def prepare_image(conn, spec, image_url, cache_path, progress, method):
+    """Download an image and upload it to Glance
+
+    With the upload method, an image that is not cached and has no partial
+    download is streamed to Glance while it downloads. If streaming fails,
+    the image is downloaded (resuming the partial download) and uploaded.
 
     Returns:
-        List of images ready to upload
+        How the image was prepared, or None on failure
     """
-    # Ensure cache directory exists
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    name = spec["name"]
+    try:
+        if method == "web-download":
+            import_image_from_url(conn, spec, image_url)
+            return "imported by Glance"
+
+        checksum = None
+        if spec.get("checksum_file"):
+            checksum = fetch_published_checksum(image_url, spec["checksum_file"])
+
+        part_path, _ = _cache_paths(cache_path)
+        if (
+            method == "upload"
+            and not _is_cached(cache_path, checksum)
+            and not part_path.exists()
+        ):
+            try:
+                stream_image(conn, spec, image_url, cache_path, progress, checksum)
+                return "downloaded and uploaded"
+            except urllib.error.HTTPError:
+                # Reported by download_image
+                pass
+            except Exception as e:
+                print_warning(f"Streaming {name} failed, retrying: {e}")
 
-    # Check which images need to be downloaded and download them
-    images_to_upload = []
+        status = download_image(spec, image_url, cache_path, progress, checksum)
+        if not status:
+            return None
+        upload_image(conn, spec, cache_path, method)
+        return (
+            "uploaded from cache" if status == "cached" else "downloaded and uploaded"
+        )
+    except Exception as e:
+        print_warning(f"Failed to upload {name}: {e}")
+        return None
+    finally:
+        progress.finish(name)
 
+
+def image_specs(args):
+    """Get the image specs to upload, with the image URLs from the arguments
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        List of image spec dicts with the image URL as url
+    """
+    if args.skip_images:
+        return []
+
+    specs = []
     for spec in IMAGE_SPECS:
-        # Get URL for this image
-        image_url = image_urls.get(spec["url_param"])
+        # Always include test image, production images unless
+        # only_test_image is set
+        if args.only_test_image and not spec.get("is_test_image"):
+            continue
 
         # Skip if URL not provided
+        image_url = getattr(args, spec["url_param"])
         if not image_url:
             print_warning(f"Skipping {spec['name']} (no URL provided)")
             continue
 
+        specs.append(dict(spec, url=image_url))
+
+    return specs
+
+
+def prepare_images(conn, specs, method="upload"):
+    """Download images from provided URLs and upload them to Glance
+
+    Images are prepared concurrently, each image is uploaded as soon as it
+    is downloaded while other images are still downloading, see
+    prepare_image.
+
+    Args:
+        conn: OpenStack connection object
+        specs: List of image spec dicts with the image URL as url, see
+            image_specs
+        method: Glance upload method, "upload", "glance-direct" or
+            "web-download"
+    """
+    # Ensure cache directory exists
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    # List existing images once instead of a lookup per image
+    existing_images = {x.name for x in conn.image.images()}
+
+    images = []
+    for spec in specs:
+        image_url = spec["url"]
+
         # Check if image already exists in Glance
-        existing_image = conn.image.find_image(spec["name"])
-        if existing_image:
+        if spec["name"] in existing_images:
             print_success(f"Image {spec['name']} already exists in Glance")
             continue
 
@@ -887,84 +1381,29 @@ def download_images(conn, image_urls):
         file_ext = ".img" if spec["disk_format"] == "raw" else ".qcow2"
 
         # Create cache file path based on image name
-        cache_filename = f"{spec['name']}{file_ext}"
-        cache_path = CACHE_DIR / cache_filename
-
-        # Check if already cached
-        if cache_path.exists():
-            file_size_mb = cache_path.stat().st_size / (1024 * 1024)
-            print_success(f"Using cached {spec['name']} ({file_size_mb:.1f} MB)")
-
-            # Add to upload queue
-            images_to_upload.append(
-                {
-                    "spec": spec,
-                    "cache_path": cache_path,
-                }
-            )
-            continue
-
-        try:
-            # Download with progress reporting
-            print(f"  Downloading {spec['name']}...")
-            urllib.request.urlretrieve(
-                image_url, cache_path, reporthook=_progress_callback(spec["name"])
-            )
-            print()  # New line after progress
-
-            # Add to upload queue
-            images_to_upload.append(
-                {
-                    "spec": spec,
-                    "cache_path": cache_path,
-                }
-            )
-
-        except urllib.error.HTTPError as e:
-            if e.code == 404:
-                print_warning(f"Image {spec['name']} not found at {image_url} (404)")
-                print_warning(
-                    f"The image may not be published yet. Run the GitHub workflow to build and release it."
-                )
-            else:
-                print_warning(
-                    f"Failed to download {spec['name']}: HTTP {e.code} - {e.reason}"
-                )
-            # Clean up failed download
-            if cache_path.exists():
-                cache_path.unlink()
-        except Exception as e:
-            print_warning(f"Failed to download {spec['name']}: {e}")
-            # Clean up failed download
-            if cache_path.exists():
-                cache_path.unlink()
-
-    return images_to_upload
+        cache_path = CACHE_DIR / f"{spec['name']}{file_ext}"
+        images.append((spec, image_url, cache_path))
 
-
-def upload_images(conn, images_to_upload):
-    """Upload images to Glance"""
-    if not images_to_upload:
+    if not images:
         print_info("No new images to upload")
         return
 
-    for item in images_to_upload:
-        spec = item["spec"]
-        cache_path = item["cache_path"]
-
-        try:
-            with open(cache_path, "rb") as image_file:
-                image = conn.image.create_image(
-                    name=spec["name"],
-                    disk_format=spec["disk_format"],
-                    container_format="bare",
-                    visibility="public",
-                    data=image_file,
-                    **spec["properties"],
+    progress = DownloadProgress(len(images))
+    progress.open()
+    try:
+        with ThreadPoolExecutor(max_workers=max(DOWNLOAD_WORKERS, 1)) as executor:
+            futures = {
+                spec["name"]: executor.submit(
+                    prepare_image, conn, spec, image_url, cache_path, progress, method
                 )
-            print_success(f"Uploaded {spec['name']} to Glance")
-        except Exception as e:
-            print_warning(f"Failed to upload {spec['name']}: {e}")
+                for spec, image_url, cache_path in images
+            }
+            for name, future in futures.items():
+                status = future.result()
+                if status:
+                    print_success(f"Image {name} {status}")
+    finally:
+        progress.close()
 
 
 def setup_admin_connection(args):
@@ -1210,6 +1649,25 @@ def parse_arguments():
         help="URL to download Ubuntu Noble cloud image (default: Ubuntu cloud images)",
     )
 
+    parser.add_argument(
+        "--image-import-method",
+        choices=IMAGE_IMPORT_METHODS,
+        default=DEFAULT_IMAGE_IMPORT_METHOD,
+        help=f"How images are uploaded to Glance (default: {DEFAULT_IMAGE_IMPORT_METHOD})",
+    )
+
+    # Desired state
+    parser.add_argument(
+        "--state-file",
+        default=DEFAULT_STATE_FILE,
+        help="YAML file with the desired flavors, quotas, networks and images, merged into the defaults",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the change plan and exit without applying it",
+    )
+
     # SSH keypair configuration
     parser.add_argument(
         "--ssh-keypair-name",
@@ -1288,48 +1746,384 @@ def parse_arguments():
     return args
 
 
-def setup_admin_resources(admin_conn, args):
-    """Set up admin-level resources (project, quotas, flavors, networking, images)
+def _merge(defaults, overrides):
+    """Merge overrides into defaults, dicts are merged, other values replaced"""
+    if not isinstance(defaults, dict) or not isinstance(overrides, dict):
+        return overrides
+    merged = dict(defaults)
+    for key, value in overrides.items():
+        merged[key] = _merge(defaults.get(key), value)
+    return merged
+
+
+def desired_state(args):
+    """Get the desired state of the admin-level resources
+
+    The desired state is built from the defaults and command-line arguments,
+    the state file, if any, is merged into it: dicts are merged, lists and
+    other values replace the defaults.
 
     Args:
-        admin_conn: OpenStack connection with admin privileges
         args: Parsed command-line arguments
 
     Returns:
-        External network object (or None if not created)
+        Dictionary with flavors, quotas, networks and images
     """
-    # Create hotstack project and user
-    project, user = create_hotstack_project_and_user(admin_conn)
+    state = {
+        "flavors": FLAVORS,
+        "quotas": QUOTAS,
+        "networks": {
+            "private": {
+                "cidr": args.cidr,
+                "dns_nameservers": args.dns_nameservers,
+                "allocation_pools": args.allocation_pools,
+            },
+            "provider": (
+                None
+                if args.no_provider_network
+                else {
+                    "cidr": args.provider_cidr,
+                    "gateway": args.provider_gateway,
+                    "allocation_pools": args.provider_allocation_pools,
+                    "physical_network": args.physical_network,
+                    "network_type": args.network_type,
+                }
+            ),
+            "router": not args.no_router,
+        },
+        "images": image_specs(args),
+    }
 
-    # Set quotas for hotstack project
-    set_project_quotas(admin_conn, project.id)
+    if not args.state_file:
+        return state
 
-    # Create flavors (public, available to all projects)
-    create_flavors(admin_conn)
+    try:
+        with open(args.state_file, "r") as f:
+            overrides = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        print_error(f"Failed to read state file {args.state_file}: {e}")
+        sys.exit(1)
 
-    # Set up networking (networks, router, security groups)
-    external_network = setup_networking(admin_conn, args)
+    unknown = sorted(set(overrides) - set(state))
+    if unknown:
+        print_error(f"Unknown sections in state file {args.state_file}: {unknown}")
+        sys.exit(1)
+
+    state = _merge(state, overrides)
+    state["images"] = [dict({"properties": {}}, **x) for x in state["images"]]
+    return state
 
-    # Download and upload images
-    if not args.skip_images:
-        # Always include test image
-        image_urls = {"cirros_url": args.cirros_url}
 
-        # Add production images unless only_test_image is set
-        if not args.only_test_image:
-            image_urls["centos_stream_9_url"] = args.centos_stream_9_url
-            image_urls["controller_image_url"] = args.controller_image_url
-            image_urls["blank_image_url"] = args.blank_image_url
-            image_urls["nat64_image_url"] = args.nat64_image_url
-            image_urls["uefi_netboot_url"] = args.uefi_netboot_url
-            image_urls["ipxe_bios_url"] = args.ipxe_bios_url
-            image_urls["ipxe_efi_url"] = args.ipxe_efi_url
-            image_urls["ubuntu_noble_url"] = args.ubuntu_noble_url
+def fetch_actual_state(conn):
+    """Fetch the actual state of the admin-level resources
 
-        images_to_upload = download_images(admin_conn, image_urls)
-        upload_images(admin_conn, images_to_upload)
+    Each resource type is fetched with a single list call, the calls run
+    concurrently, see run_tasks.
+
+    Args:
+        conn: OpenStack connection with admin privileges
 
-    return external_network
+    Returns:
+        Dictionary mapping resource types to the existing resources
+    """
+
+    def quotas(results):
+        project = results["projects"].get("hotstack")
+        if not project:
+            return {}
+        return {
+            "compute": conn.compute.get_quota_set(project.id),
+            "network": conn.network.get_quota(project.id),
+            "volume": conn.block_storage.get_quota_set(project.id),
+        }
+
+    def security_group_rules(results):
+        rules = {}
+        for rule in conn.network.security_group_rules():
+            rules.setdefault(rule.security_group_id, set()).add(_rule_key(rule))
+        return rules
+
+    identity = conn.identity
+    try:
+        actual = run_tasks(
+            {
+                "projects": (
+                    lambda r: {
+                        x.name: x for x in identity.projects(domain_id="default")
+                    },
+                    [],
+                ),
+                "users": (
+                    lambda r: {x.name: x for x in identity.users(domain_id="default")},
+                    [],
+                ),
+                "quotas": (quotas, ["projects"]),
+                "flavors": (lambda r: {x.name: x for x in conn.compute.flavors()}, []),
+                "networks": (
+                    lambda r: {x.name: x for x in conn.network.networks()},
+                    [],
+                ),
+                "subnets": (lambda r: {x.name: x for x in conn.network.subnets()}, []),
+                "routers": (lambda r: {x.name: x for x in conn.network.routers()}, []),
+                "security_groups": (
+                    lambda r: {
+                        x.project_id: x
+                        for x in conn.network.security_groups(name="default")
+                    },
+                    [],
+                ),
+                "security_group_rules": (security_group_rules, []),
+                "images": (lambda r: {x.name for x in conn.image.images()}, []),
+            }
+        )
+        actual["admin_project_id"] = conn.current_project_id
+        return actual
+    except Exception as e:
+        handle_openstack_error(e, "fetch the actual state")
+
+
+def _describe_rule(rule):
+    """Describe a security group rule config"""
+    ports = ""
+    if rule.get("port_range_min") is not None:
+        ports = f" {rule['port_range_min']}"
+        if rule.get("port_range_max") != rule["port_range_min"]:
+            ports += f"-{rule['port_range_max']}"
+    return (
+        f"{rule['direction']} {rule['protocol']}{ports} "
+        f"from {rule.get('remote_ip_prefix') or 'any'}"
+    )
+
+
+def compute_plan(state, actual):
+    """Compute the changes bringing the actual state to the desired state
+
+    Args:
+        state: Desired state, see desired_state
+        actual: Actual state, see fetch_actual_state
+
+    Returns:
+        List of (symbol, description, task) tuples, symbol is "+" for
+        creations, "~" for updates and "!" for differences that are not
+        changed, task is the admin_resource_tasks task applying the change,
+        None if the change is not applied
+    """
+    plan = []
+
+    project = actual["projects"].get("hotstack")
+    if not project:
+        plan.append(("+", "project hotstack", "project"))
+    if "hotstack" not in actual["users"]:
+        plan.append(("+", "user hotstack", "project"))
+
+    for service, quotas in state["quotas"].items():
+        current = actual["quotas"].get(service)
+        for key, value in quotas.items():
+            if current is None:
+                plan.append(("+", f"quota {service} {key} = {value}", "quotas"))
+            elif getattr(current, key, None) != value:
+                old = getattr(current, key, None)
+                plan.append(("~", f"quota {service} {key}: {old} -> {value}", "quotas"))
+
+    for flavor in state["flavors"]:
+        current = actual["flavors"].get(flavor["name"])
+        if not current:
+            plan.append(
+                (
+                    "+",
+                    f"flavor {flavor['name']} (vcpus {flavor['vcpus']}, "
+                    f"ram {flavor['ram']} MB, disk {flavor['disk']} GB)",
+                    "flavors",
+                )
+            )
+            continue
+        diffs = [
+            f"{x} {getattr(current, x)} != {flavor[x]}"
+            for x in ("vcpus", "ram", "disk")
+            if getattr(current, x) != flavor[x]
+        ]
+        if diffs:
+            plan.append(
+                (
+                    "!",
+                    f"flavor {flavor['name']} differs ({', '.join(diffs)}), "
+                    "flavors are immutable and it is not changed",
+                    None,
+                )
+            )
+
+    networks = [
+        (
+            PRIVATE_NETWORK_NAME,
+            PRIVATE_SUBNET_NAME,
+            state["networks"]["private"],
+            "private_network",
+        )
+    ]
+    provider = state["networks"].get("provider")
+    if provider:
+        networks.append(
+            (EXTERNAL_NETWORK_NAME, EXTERNAL_SUBNET_NAME, provider, "provider_network")
+        )
+    for network_name, subnet_name, spec, task in networks:
+        if network_name not in actual["networks"]:
+            plan.append(("+", f"network {network_name}", task))
+        subnet = actual["subnets"].get(subnet_name)
+        if not subnet:
+            plan.append(("+", f"subnet {subnet_name} ({spec['cidr']})", task))
+        elif subnet.cidr != spec["cidr"]:
+            plan.append(
+                (
+                    "!",
+                    f"subnet {subnet_name} differs (cidr {subnet.cidr} != "
+                    f"{spec['cidr']}), it is not changed",
+                    None,
+                )
+            )
+
+    if provider and state["networks"].get("router"):
+        if ROUTER_NAME not in actual["routers"]:
+            plan.append(("+", f"router {ROUTER_NAME}", "router"))
+
+    for project_name, project_id, task in (
+        ("admin", actual["admin_project_id"], "admin_security_groups"),
+        ("hotstack", project.id if project else None, "hotstack_security_groups"),
+    ):
+        sg = actual["security_groups"].get(project_id)
+        existing_rules = (
+            actual["security_group_rules"].get(sg.id, set()) if sg else set()
+        )
+        for rule in SECURITY_GROUP_RULES:
+            if _rule_key(rule) not in existing_rules:
+                plan.append(
+                    (
+                        "+",
+                        f"security group rule {project_name} {_describe_rule(rule)}",
+                        task,
+                    )
+                )
+
+    for spec in state["images"]:
+        if spec["name"] not in actual["images"]:
+            plan.append(("+", f"image {spec['name']} ({spec['url']})", "images"))
+
+    return plan
+
+
+def print_plan(plan):
+    """Print the change plan, see compute_plan"""
+    if not plan:
+        print_success("No changes, resources are up to date")
+        return
+
+    print("Change plan:")
+    for symbol, description, _ in plan:
+        print(f"  {symbol} {description}")
+
+
+def plan_tasks(tasks, plan, actual):
+    """Keep only the tasks applying changes of the plan
+
+    The other tasks are replaced by tasks returning their result from the
+    actual state, for the tasks depending on them.
+
+    Args:
+        tasks: Tasks, see admin_resource_tasks
+        plan: Change plan, see compute_plan
+        actual: Actual state, see fetch_actual_state
+
+    Returns:
+        Dictionary of tasks
+    """
+    changed = {task for _, _, task in plan if task}
+    known = {
+        "project": (
+            actual["projects"].get("hotstack"),
+            actual["users"].get("hotstack"),
+        ),
+        "private_network": actual["networks"].get(PRIVATE_NETWORK_NAME),
+        "provider_network": actual["networks"].get(EXTERNAL_NETWORK_NAME),
+    }
+    return {
+        name: task if name in changed else (lambda r, v=known.get(name): v, [])
+        for name, task in tasks.items()
+    }
+
+
+def admin_resource_tasks(admin_conn, args, state):
+    """Tasks setting up admin-level resources, see run_tasks
+
+    Only the quotas, the hotstack security groups and the router depend on
+    other resources, flavors, networks and images are set up concurrently.
+
+    Args:
+        admin_conn: OpenStack connection with admin privileges
+        args: Parsed command-line arguments
+        state: Desired state, see desired_state
+
+    Returns:
+        Dictionary of tasks, the provider_network task returns the external
+        network object when the provider network is enabled
+    """
+    networks = state["networks"]
+    tasks = {
+        # Create hotstack project and user
+        "project": (lambda r: create_hotstack_project_and_user(admin_conn), []),
+        # Set quotas for hotstack project
+        "quotas": (
+            lambda r: set_project_quotas(
+                admin_conn, r["project"][0].id, state["quotas"]
+            ),
+            ["project"],
+        ),
+        # Create flavors (public, available to all projects)
+        "flavors": (lambda r: create_flavors(admin_conn, state["flavors"]), []),
+        # Create default network (shared)
+        "private_network": (
+            lambda r: create_default_network(admin_conn, **networks["private"]),
+            [],
+        ),
+        # Configure security groups for both projects
+        "admin_security_groups": (
+            lambda r: configure_security_groups(
+                admin_conn, admin_conn.current_project_id, "admin"
+            ),
+            [],
+        ),
+        "hotstack_security_groups": (
+            lambda r: configure_security_groups(
+                admin_conn, r["project"][0].id, "hotstack"
+            ),
+            ["project"],
+        ),
+    }
+
+    # Create provider network (external, shared)
+    if networks.get("provider"):
+        tasks["provider_network"] = (
+            lambda r: create_provider_network(admin_conn, **networks["provider"]),
+            [],
+        )
+
+        # Create router to connect private and external networks
+        if networks.get("router"):
+            tasks["router"] = (
+                lambda r: create_router(
+                    admin_conn, r["provider_network"], r["private_network"]
+                ),
+                ["provider_network", "private_network"],
+            )
+
+    # Download and upload images
+    if state["images"]:
+        tasks["images"] = (
+            lambda r: prepare_images(
+                admin_conn, state["images"], method=args.image_import_method
+            ),
+            [],
+        )
+
+    return tasks
 
 
 def setup_project_resources(args):
@@ -1382,17 +2176,33 @@ def main():
         print_error("Run without sudo: make post-setup")
         sys.exit(1)
 
+    # Desired state of the admin resources
+    state = desired_state(args)
+
     # Set up admin connection
     admin_conn = setup_admin_connection(args)
 
-    # Set up admin resources (project, quotas, flavors, networking, images)
-    external_network = setup_admin_resources(admin_conn, args)
+    # Compare the desired and actual state of the admin resources
+    actual = fetch_actual_state(admin_conn)
+    plan = compute_plan(state, actual)
+    print_plan(plan)
+    if args.plan:
+        return
 
-    # Set up project resources (application credential, SSH keypair)
-    cloud_secret_path = setup_project_resources(args)
+    # Apply the changes to admin resources (project, quotas, flavors,
+    # networking, images) and, once the project exists, set up project
+    # resources (application credential, SSH keypair) concurrently
+    tasks = plan_tasks(admin_resource_tasks(admin_conn, args, state), plan, actual)
+    tasks["project_resources"] = (
+        lambda r: setup_project_resources(args),
+        ["project"],
+    )
+    results = run_tasks(tasks)
 
     # Print completion message
-    print_completion_message(args, cloud_secret_path, external_network)
+    print_completion_message(
+        args, results["project_resources"], results.get("provider_network")
+    )
 
 
 if __name__ == "__main__":
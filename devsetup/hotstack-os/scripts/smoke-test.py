@@ -24,18 +24,58 @@ Creates a Heat stack with test resources and validates the deployment:
 - Floating IPs
 - Cloud-init configuration
 - Connectivity tests
+
+With --stacks N, N stacks are created and tested concurrently as a load test
+of the cloud. Stack creation and deletion wait on stack events, connectivity
+tests start once the instance console shows the login prompt, and the p50
+and p95 of the stack create, boot to login, ping and SSH and stack delete
+times are reported.
 """
 
 import argparse
+import math
 import os
+import re
 import sys
+import threading
 import time
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
 import openstack
+import requests
 from openstack import exceptions
 
+# Timeouts in seconds
+STACK_CREATE_TIMEOUT = 600
+STACK_DELETE_TIMEOUT = 300
+BOOT_TIMEOUT = 300
+
+# Seconds between polls of stack events and instance consoles
+EVENT_POLL_INTERVAL = 1
+CONSOLE_POLL_INTERVAL = 2
+# Seconds between ping and SSH attempts
+RETRY_INTERVAL = 1
+
+# Console output showing that an instance finished booting
+LOGIN_MARKER = "login:"
+# Console lines fetched per poll
+CONSOLE_LINES = 50
+
+# Reported timings
+TIMINGS = {
+    "stack_create": "Stack create",
+    "boot_to_login": "Boot to login",
+    "boot_to_ping": "Boot to ping",
+    "boot_to_ssh": "Boot to SSH",
+    "stack_delete": "Stack delete",
+}
+
+# Serializes the output of concurrently tested stacks
+OUTPUT_LOCK = threading.Lock()
+
 
 # ANSI color codes and status indicators
 class Colors:
@@ -53,28 +93,34 @@ class Colors:
     DONE = f"{GREEN}[DONE]{NC}"
 
 
+def _print_line(line, file=None):
+    """Print a whole line, lines of concurrently tested stacks do not mix"""
+    with OUTPUT_LOCK:
+        print(line, file=file, flush=True)
+
+
 def print_success(message, indent=True):
     """Print success message in green"""
     prefix = "  " if indent else ""
-    print(f"{prefix}{Colors.OK} {message}")
+    _print_line(f"{prefix}{Colors.OK} {message}")
 
 
 def print_warning(message, indent=True):
     """Print warning message in yellow"""
     prefix = "  " if indent else ""
-    print(f"{prefix}{Colors.WARNING} {message}")
+    _print_line(f"{prefix}{Colors.WARNING} {message}")
 
 
 def print_error(message, indent=True):
     """Print error message in red"""
     prefix = "  " if indent else ""
-    print(f"{prefix}{Colors.ERROR} {message}", file=sys.stderr)
+    _print_line(f"{prefix}{Colors.ERROR} {message}", file=sys.stderr)
 
 
 def print_info(message, indent=True):
     """Print info message in blue"""
     prefix = "  " if indent else ""
-    print(f"{prefix}{Colors.INFO} {message}")
+    _print_line(f"{prefix}{Colors.INFO} {message}")
 
 
 def load_env_var(var_name, default=None):
@@ -121,89 +167,134 @@ def ensure_keypair(conn, keypair_name, public_key_path):
         sys.exit(1)
 
 
-def create_stack(conn, stack_name, template_path, parameters):
-    """Create or update Heat stack"""
+def wait_for_stack_event(conn, stack, action, timeout, marker=None):
+    """Wait for the stack event completing a stack action
+
+    Each poll only lists the events following the last seen event, rather
+    than fetching the whole stack.
+
+    Args:
+        conn: OpenStack connection object
+        stack: Stack object
+        action: Stack action, CREATE or DELETE
+        timeout: Seconds to wait
+        marker: ID of the last event seen before the action
+
+    Returns:
+        Tuple of the stack status and status reason, the status is None on
+        timeout
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            events = list(
+                conn.orchestration.stack_events(stack, marker=marker, sort_dir="asc")
+            )
+        except exceptions.NotFoundException:
+            # Deleted stacks are not found
+            if action == "DELETE":
+                return "DELETE_COMPLETE", None
+            raise
+
+        for event in events:
+            marker = event.id
+            if event.physical_resource_id != stack.id:
+                continue
+            if event.resource_status in (f"{action}_COMPLETE", f"{action}_FAILED"):
+                return event.resource_status, event.resource_status_reason
+
+        time.sleep(EVENT_POLL_INTERVAL)
+
+    return None, f"timed out after {timeout} seconds"
+
+
+def _print_stack_status(conn, stack_name):
+    """Print the status of a stack, for failures"""
+    try:
+        stack = conn.orchestration.find_stack(stack_name)
+        if stack:
+            print_error(f"Stack status: {stack.status}")
+            print_error(f"Stack status reason: {stack.status_reason}")
+    except exceptions.SDKException:
+        pass
+
+
+def create_stack(conn, stack_name, template, parameters):
+    """Create Heat stack
+
+    Returns:
+        Stack object, or None if the creation failed
+    """
     try:
         # Check if stack already exists
         existing_stack = conn.orchestration.find_stack(stack_name)
         if existing_stack:
             print_info(f"Stack '{stack_name}' already exists, deleting first...")
-            delete_stack(conn, stack_name)
-            time.sleep(5)
-
-        # Read template
-        with open(template_path, "r") as f:
-            template = f.read()
+            if not delete_stack(conn, stack_name):
+                return None
 
         print_info(f"Creating stack '{stack_name}'...")
         stack = conn.orchestration.create_stack(
             name=stack_name, template=template, parameters=parameters
         )
 
-        print_info("Waiting for stack creation to complete...")
-        stack = conn.orchestration.wait_for_status(
-            stack, status="CREATE_COMPLETE", failures=["CREATE_FAILED"], wait=600
+        status, reason = wait_for_stack_event(
+            conn, stack, "CREATE", STACK_CREATE_TIMEOUT
         )
+        if status == "CREATE_COMPLETE":
+            print_success(f"Stack '{stack_name}' created successfully")
+            return stack
 
-        print_success(f"Stack '{stack_name}' created successfully")
-        return stack
-    except exceptions.ResourceTimeout:
-        print_error(f"Stack creation timed out after 600 seconds")
-        # Try to get stack status
-        stack = conn.orchestration.find_stack(stack_name)
-        if stack:
-            print_error(f"Stack status: {stack.status}")
-            print_error(f"Stack status reason: {stack.status_reason}")
-        sys.exit(1)
+        print_error(f"Stack '{stack_name}' creation failed: {reason}")
     except Exception as e:
-        print_error(f"Failed to create stack: {e}")
-        # Try to get more details
-        stack = conn.orchestration.find_stack(stack_name)
-        if stack:
-            print_error(f"Stack status: {stack.status}")
-            print_error(f"Stack status reason: {stack.status_reason}")
-        sys.exit(1)
+        print_error(f"Failed to create stack '{stack_name}': {e}")
+
+    _print_stack_status(conn, stack_name)
+    return None
 
 
 def delete_stack(conn, stack_name):
-    """Delete Heat stack"""
+    """Delete Heat stack
+
+    Returns:
+        True if the stack was deleted or not found, False otherwise
+    """
     try:
         stack = conn.orchestration.find_stack(stack_name)
         if not stack:
             print_warning(f"Stack '{stack_name}' not found")
-            return
+            return True
+
+        # Only events following the latest one are relevant
+        last_event = next(
+            iter(conn.orchestration.stack_events(stack, sort_dir="desc", limit=1)),
+            None,
+        )
 
         print_info(f"Deleting stack '{stack_name}'...")
         conn.orchestration.delete_stack(stack)
 
-        # Wait for deletion
-        timeout = 300
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            stack = conn.orchestration.find_stack(stack_name)
-            if not stack:
-                print_success(f"Stack '{stack_name}' deleted successfully")
-                return
-            if stack.status == "DELETE_FAILED":
-                print_error(f"Stack deletion failed: {stack.status_reason}")
-                sys.exit(1)
-            time.sleep(5)
-
-        print_error(f"Stack deletion timed out after {timeout} seconds")
-        sys.exit(1)
+        status, reason = wait_for_stack_event(
+            conn,
+            stack,
+            "DELETE",
+            STACK_DELETE_TIMEOUT,
+            marker=last_event.id if last_event else None,
+        )
+        if status == "DELETE_COMPLETE":
+            print_success(f"Stack '{stack_name}' deleted successfully")
+            return True
+
+        print_error(f"Stack '{stack_name}' deletion failed: {reason}")
+        return False
     except Exception as e:
-        print_error(f"Failed to delete stack: {e}")
-        sys.exit(1)
+        print_error(f"Failed to delete stack '{stack_name}': {e}")
+        return False
 
 
-def get_stack_outputs(conn, stack_name):
+def get_stack_outputs(conn, stack):
     """Get stack outputs"""
     try:
-        stack = conn.orchestration.find_stack(stack_name)
-        if not stack:
-            print_error(f"Stack '{stack_name}' not found")
-            sys.exit(1)
-
         # Get full stack details with outputs
         stack = conn.orchestration.get_stack(stack.id)
         outputs = {}
@@ -213,7 +304,52 @@ def get_stack_outputs(conn, stack_name):
         return outputs
     except Exception as e:
         print_error(f"Failed to get stack outputs: {e}")
-        sys.exit(1)
+        return None
+
+
+def get_stack_servers(conn, stack):
+    """Get the servers of a stack
+
+    Returns:
+        Dictionary mapping server resource names to server IDs
+    """
+    return {
+        x.resource_name: x.physical_resource_id
+        for x in conn.orchestration.resources(stack)
+        if x.resource_type == "OS::Nova::Server"
+    }
+
+
+def wait_for_login_prompt(conn, server_id, timeout=BOOT_TIMEOUT):
+    """Wait for the login prompt on the serial console of an instance
+
+    Returns:
+        True when the login prompt showed up, False on timeout, None if the
+        console output is not available
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            output = conn.compute.get_server_console_output(
+                server_id, length=CONSOLE_LINES
+            )
+        except exceptions.SDKException as e:
+            print_warning(f"Console output of {server_id} not available: {e}")
+            return None
+        if LOGIN_MARKER in (output.get("output") or ""):
+            return True
+        time.sleep(CONSOLE_POLL_INTERVAL)
+
+    return False
+
+
+def _launched_at(server):
+    """Time an instance was launched, as a Unix timestamp, or None"""
+    try:
+        launched_at = datetime.fromisoformat(server.launched_at)
+    except (TypeError, ValueError):
+        return None
+    return launched_at.replace(tzinfo=timezone.utc).timestamp()
 
 
 def test_connectivity(floating_ip, timeout=30):
@@ -233,7 +369,7 @@ def test_connectivity(floating_ip, timeout=30):
                 return True
         except subprocess.TimeoutExpired:
             pass
-        time.sleep(2)
+        time.sleep(RETRY_INTERVAL)
 
     print_warning(f"Failed to ping {floating_ip} after {timeout} seconds")
     return False
@@ -272,26 +408,18 @@ def test_ssh_access(floating_ip, private_key_path, username="cirros", timeout=12
                 return True
         except (subprocess.TimeoutExpired, Exception):
             pass
-        time.sleep(5)
+        time.sleep(RETRY_INTERVAL)
 
     print_warning(f"Failed to SSH to {floating_ip} after {timeout} seconds")
     print_warning("This may indicate metadata service issues")
     return False
 
 
-def verify_resources(conn, stack_name):
+def verify_resources(conn, stack):
     """Verify that stack resources are in good state"""
-    print_info("Verifying stack resources...")
+    print_info(f"Verifying stack '{stack.name}' resources...")
 
     try:
-        stack = conn.orchestration.find_stack(stack_name)
-        if not stack:
-            print_error(f"Stack '{stack_name}' not found")
-            return False
-
-        # Get full stack with details
-        stack = conn.orchestration.get_stack(stack.id)
-
         # List resources
         resources = list(conn.orchestration.resources(stack))
 
@@ -309,13 +437,184 @@ def verify_resources(conn, stack_name):
                 print_error(f"  - {res}")
             return False
 
-        print_success(f"All {len(resources)} stack resources created successfully")
+        print_success(
+            f"All {len(resources)} stack '{stack.name}' resources created successfully"
+        )
         return True
     except Exception as e:
         print_error(f"Failed to verify resources: {e}")
         return False
 
 
+def test_instance(conn, args, name, server_id, floating_ip, private_key_path):
+    """Test an instance of a smoke test stack
+
+    Waits for the login prompt on the instance console, then tests ICMP
+    connectivity and SSH access. Times are measured from the instance launch.
+
+    Returns:
+        Tuple of a dictionary of timings and a list of failed tests
+    """
+    timings = {}
+    failures = []
+
+    server = conn.compute.get_server(server_id)
+    boot_start = _launched_at(server) or time.time()
+
+    login = wait_for_login_prompt(conn, server_id)
+    if login:
+        timings["boot_to_login"] = time.time() - boot_start
+        print_success(f"Instance {name} booted to the login prompt")
+    elif login is False:
+        print_warning(f"No login prompt on {name} console after {BOOT_TIMEOUT} seconds")
+        failures.append(f"Login prompt on {name} console")
+
+    if not floating_ip:
+        return timings, failures
+
+    if args.test_connectivity:
+        if test_connectivity(floating_ip, timeout=60):
+            timings["boot_to_ping"] = time.time() - boot_start
+        else:
+            failures.append(f"ICMP connectivity to {name} ({floating_ip})")
+
+    if private_key_path:
+        if test_ssh_access(
+            floating_ip, private_key_path, username=args.ssh_username, timeout=120
+        ):
+            timings["boot_to_ssh"] = time.time() - boot_start
+        else:
+            failures.append(f"SSH access to {name} ({floating_ip})")
+
+    return timings, failures
+
+
+def test_stack(conn, args, stack_name, stack, private_key_path, timings, failures):
+    """Verify the resources of a smoke test stack and test its instances
+
+    The instances of the stack are tested concurrently. Timings and failed
+    tests are added to timings and failures.
+    """
+    if not verify_resources(conn, stack):
+        print_error("Resource verification failed")
+        failures.append(f"Resource verification of stack {stack_name}")
+        return
+
+    outputs = get_stack_outputs(conn, stack) or {}
+    if args.stacks == 1:
+        print()
+        print_info("Stack outputs:")
+        for key, value in outputs.items():
+            if isinstance(value, dict):
+                print(f"  {key}:")
+                for k, v in value.items():
+                    print(f"    {k}: {v}")
+            else:
+                print(f"  {key}: {value}")
+        print()
+
+    servers = sorted(get_stack_servers(conn, stack).items())
+    with ThreadPoolExecutor(max_workers=max(len(servers), 1)) as executor:
+        futures = [
+            executor.submit(
+                test_instance,
+                conn,
+                args,
+                f"{stack_name}/{name}",
+                server_id,
+                outputs.get(f"{name}_floating_ip"),
+                private_key_path,
+            )
+            for name, server_id in servers
+        ]
+        for (name, _), future in zip(servers, futures):
+            try:
+                instance_timings, instance_failures = future.result()
+            except Exception as e:
+                print_error(f"Failed to test instance {stack_name}/{name}: {e}")
+                failures.append(f"Test of instance {stack_name}/{name}")
+                continue
+            for key, value in instance_timings.items():
+                timings[key].append(value)
+            failures.extend(instance_failures)
+
+
+def run_stack(conn, args, stack_name, template, parameters, private_key_path):
+    """Create, test and delete a smoke test stack
+
+    The stack is deleted even if its tests failed.
+
+    Returns:
+        Tuple of a dictionary mapping timings to lists of values and a list
+        of failed tests
+    """
+    timings = {x: [] for x in TIMINGS}
+    failures = []
+
+    start = time.monotonic()
+    stack = create_stack(conn, stack_name, template, parameters)
+    if not stack:
+        failures.append(f"Create stack {stack_name}")
+    else:
+        timings["stack_create"].append(time.monotonic() - start)
+
+    # Failures are recorded, the stack is deleted in any case
+    try:
+        if stack:
+            test_stack(
+                conn, args, stack_name, stack, private_key_path, timings, failures
+            )
+    except Exception as e:
+        print_error(f"Failed to test stack '{stack_name}': {e}")
+        failures.append(f"Test of stack {stack_name}")
+
+    # Cleanup
+    if not args.keep_stack:
+        start = time.monotonic()
+        if delete_stack(conn, stack_name):
+            timings["stack_delete"].append(time.monotonic() - start)
+        else:
+            failures.append(f"Delete stack {stack_name}")
+    else:
+        print_info(f"Stack '{stack_name}' kept (use --no-keep-stack to auto-delete)")
+
+    return timings, failures
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of values"""
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def print_timings(timings):
+    """Print count, p50, p95 and max of the timings"""
+    print_info("Timings:", indent=False)
+    print(f"  {'':14} {'count':>5} {'p50':>8} {'p95':>8} {'max':>8}")
+    for key, label in TIMINGS.items():
+        values = timings[key]
+        if not values:
+            continue
+        print(
+            f"  {label:14} {len(values):>5} {percentile(values, 50):>7.1f}s "
+            f"{percentile(values, 95):>7.1f}s {max(values):>7.1f}s"
+        )
+
+
+def size_connection_pool(conn, size):
+    """Size the HTTP connection pool of a connection shared by threads"""
+    adapter = requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    conn.session.session.mount("http://", adapter)
+    conn.session.session.mount("https://", adapter)
+
+
+def stack_names(args):
+    """Get the names of the smoke test stacks"""
+    if args.stacks == 1:
+        return [args.stack_name]
+    return [f"{args.stack_name}-{i}" for i in range(1, args.stacks + 1)]
+
+
 def run_smoke_test(args):
     """Main smoke test execution"""
     print("HotsTac(k)os smoke test...")
@@ -335,6 +634,9 @@ def run_smoke_test(args):
         print_error(f"Failed to connect to OpenStack: {e}")
         sys.exit(1)
 
+    # Each stack and each of its instances is tested in its own thread
+    size_connection_pool(conn, max(10, 3 * args.stacks))
+
     # Ensure keypair exists
     # Auto-detect SSH key if default is used
     if args.ssh_public_key == "~/.ssh/id_rsa.pub":
@@ -358,6 +660,9 @@ def run_smoke_test(args):
         print_error(f"Template not found: {template_path}")
         sys.exit(1)
 
+    with open(template_path, "r") as f:
+        template = f.read()
+
     # Stack parameters
     parameters = {
         "keypair_name": args.keypair_name,
@@ -366,58 +671,9 @@ def run_smoke_test(args):
         "external_network": args.external_network,
     }
 
-    # Create stack
-    stack = create_stack(conn, args.stack_name, template_path, parameters)
-
-    # Verify resources
-    if not verify_resources(conn, args.stack_name):
-        print_error("Resource verification failed")
-        if not args.keep_stack:
-            delete_stack(conn, args.stack_name)
-        sys.exit(1)
-
-    # Get outputs
-    outputs = get_stack_outputs(conn, args.stack_name)
-    print()
-    print_info("Stack outputs:")
-    for key, value in outputs.items():
-        if isinstance(value, dict):
-            print(f"  {key}:")
-            for k, v in value.items():
-                print(f"    {k}: {v}")
-        else:
-            print(f"  {key}: {value}")
-
-    test_failures = []
-
-    # Test connectivity
-    if args.test_connectivity:
-        print()
-        print_info("Testing connectivity...")
-
-        # Wait a bit for instances to boot
-        print_info("Waiting 30 seconds for instances to boot...")
-        time.sleep(30)
-
-        # Test both floating IPs
-        if "instance1_floating_ip" in outputs:
-            if not test_connectivity(outputs["instance1_floating_ip"], timeout=60):
-                test_failures.append(
-                    f"ICMP connectivity to instance1 ({outputs['instance1_floating_ip']})"
-                )
-
-        if "instance2_floating_ip" in outputs:
-            if not test_connectivity(outputs["instance2_floating_ip"], timeout=60):
-                test_failures.append(
-                    f"ICMP connectivity to instance2 ({outputs['instance2_floating_ip']})"
-                )
-
-    # Test SSH access (verifies metadata service)
+    # Determine private key path for the SSH tests (verify metadata service)
+    private_key_path = None
     if args.test_ssh:
-        print()
-        print_info("Testing SSH access (verifies metadata service)...")
-
-        # Determine private key path
         if args.ssh_private_key:
             private_key_path = Path(args.ssh_private_key).expanduser()
         else:
@@ -430,41 +686,32 @@ def run_smoke_test(args):
         if not private_key_path.exists():
             print_warning(f"Private key not found: {private_key_path}")
             print_warning("Skipping SSH test")
-        else:
-            if "instance1_floating_ip" in outputs:
-                if not test_ssh_access(
-                    outputs["instance1_floating_ip"],
-                    private_key_path,
-                    username=args.ssh_username,
-                    timeout=120,
-                ):
-                    test_failures.append(
-                        f"SSH access to instance1 ({outputs['instance1_floating_ip']})"
-                    )
-
-            if "instance2_floating_ip" in outputs:
-                if not test_ssh_access(
-                    outputs["instance2_floating_ip"],
-                    private_key_path,
-                    username=args.ssh_username,
-                    timeout=120,
-                ):
-                    test_failures.append(
-                        f"SSH access to instance2 ({outputs['instance2_floating_ip']})"
-                    )
+            private_key_path = None
 
-    # Cleanup
-    if not args.keep_stack:
-        print()
-        delete_stack(conn, args.stack_name)
-    else:
-        print()
-        print_info(
-            f"Stack '{args.stack_name}' kept (use --no-keep-stack to auto-delete)"
-        )
+    # Create, test and delete the stacks concurrently
+    names = stack_names(args)
+    if len(names) > 1:
+        print_info(f"Testing {len(names)} stacks concurrently...", indent=False)
+
+    timings = {x: [] for x in TIMINGS}
+    test_failures = []
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        futures = [
+            executor.submit(
+                run_stack, conn, args, name, template, parameters, private_key_path
+            )
+            for name in names
+        ]
+        for future in futures:
+            stack_timings, stack_failures = future.result()
+            for key, values in stack_timings.items():
+                timings[key].extend(values)
+            test_failures.extend(stack_failures)
 
     # Final result
     print()
+    print_timings(timings)
+    print()
     if test_failures:
         print_error(
             "Smoke test FAILED! The following tests did not pass:", indent=False
@@ -556,6 +803,14 @@ def main():
         help="Skip connectivity tests (ping)",
     )
 
+    parser.add_argument(
+        "--stacks",
+        type=int,
+        default=int(load_env_var("HOTSTACK_SMOKE_TEST_STACKS", "1")),
+        help="Number of stacks created and tested concurrently, named "
+        "<stack-name>-<n> when more than one (default: 1)",
+    )
+
     parser.add_argument(
         "--cleanup-only",
         action="store_true",
@@ -563,6 +818,8 @@ def main():
     )
 
     args = parser.parse_args()
+    if args.stacks < 1:
+        parser.error("--stacks must be at least 1")
 
     # Cleanup only mode
     if args.cleanup_only:
@@ -575,8 +832,17 @@ def main():
             print_error(f"Failed to connect to OpenStack: {e}")
             sys.exit(1)
 
-        delete_stack(conn, args.stack_name)
+        # Delete the stack and the stacks of concurrent runs
+        pattern = re.compile(rf"{re.escape(args.stack_name)}(-\d+)?")
+        names = [
+            x.name for x in conn.orchestration.stacks() if pattern.fullmatch(x.name)
+        ] or [args.stack_name]
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            deleted = all(executor.map(lambda x: delete_stack(conn, x), names))
         print()
+        if not deleted:
+            print_error("Cleanup failed", indent=False)
+            sys.exit(1)
         print_success("Cleanup complete")
         sys.exit(0)
 
@@ -46,174 +46,3 @@ function delete_secret {
 
     oc -n "${namespace}" delete secrets "${secret}" && return 0 || return 1
 }
-
-function get_ocp_nodes {
-    local nodes
-
-    if ! nodes=$(oc get nodes -o jsonpath='{.items[*].metadata.name}')
-    then
-        return 1
-    fi
-
-    echo "${nodes}"
-    return 0
-}
-
-function shutdown_ocp_node {
-    local node="$1"
-    if [ -z "$node" ]
-    then
-        echo "ERROR: shutdown_ocp_node functions missing node argument"
-        return 1
-    fi
-
-    if ! timeout --foreground 75s oc debug node/"${node}" -- chroot /host shutdown -h +1
-    then
-        echo "ERROR: Failed shutting down node: ${node}, output: ${out}"
-        return 1
-    fi
-
-    return 0
-}
-
-function shutdown_ocp_nodes {
-    local nodes="$1"
-    if [ -z "$nodes" ]
-    then
-        echo "ERROR: shutdown_ocp_nodes functions missing nodes argument"
-        return 1
-    fi
-
-    for node in ${nodes}
-    do
-        if ! shutdown_ocp_node "${node}"
-        then
-            echo "ERROR: Failed shutting down nodes: ${nodes}"
-            return 1
-        fi
-    done
-
-    return 0
-}
-
-function cordon_ocp_node {
-    local out
-    local node=$1
-    if [ -z "$node" ]
-    then
-        echo "ERROR: cordon_node functions missing node argument"
-        return 1
-    fi
-
-    echo "Marking node ${node} unschedulable - SchedulingDisabled"
-    if ! out=$(oc adm cordon "${node}")
-    then
-        echo "ERROR: Failed marking node: ${node} unschedulable, output: ${out}"
-        return 1
-    fi
-
-    return 0
-}
-
-function uncordon_ocp_node {
-    local out
-    local node=$1
-    if [ -z "$node" ]
-    then
-        echo "ERROR: uncordon_node functions missing node argument"
-        return 1
-    fi
-
-    echo "Marking node ${node} schedulable"
-    if ! out=$(oc adm uncordon "${node}")
-    then
-        echo "ERROR: Failed marking node: ${node} schedulable, output: ${out}"
-        return 1
-    fi
-
-    return 0
-}
-
-function cordon_ocp_nodes {
-    local nodes=$1
-    if [ -z "$nodes" ]
-    then
-        echo "ERROR: cordon_ocp_nodes functions missing nodes argument"
-        return 1
-    fi
-
-    for node in ${nodes}
-    do
-        if ! cordon_ocp_node "${node}"
-        then
-            echo "ERROR: Failed marking nodes: ${nodes} unschedulable"
-            return 1
-        fi
-    done
-
-    return 0
-}
-
-function uncordon_ocp_nodes {
-    local nodes=$1
-    if [ -z "$nodes" ]
-    then
-        echo "ERROR: uncordon_ocp_nodes functions missing nodes argument"
-        return 1
-    fi
-
-    for node in ${nodes}
-    do
-        if ! uncordon_ocp_node "${node}"
-        then
-            echo "ERROR: Failed marking nodes: ${nodes} schedulable"
-            return 1
-        fi
-    done
-
-    return 0
-}
-
-function wait_for_stable_cluster {
-    local min_time=$1
-    if [ -z "$min_time" ]
-    then
-        min_time="2m"
-    fi
-
-    if ! oc adm wait-for-stable-cluster --minimum-stable-period="${min_time}" --timeout=20m
-    then
-        echo "ERROR: Cluster not stable for the minimal time: ${min_time}"
-        return 1
-    fi
-
-    return 0
-}
-
-function wait_for_api_versions_route {
-    local delay=16
-    local min_delay=1
-    local iterations=0
-
-    until (( delay < min_delay )) || oc api-versions | grep route.openshift.io
-    do
-        sleep "${delay}"
-
-        # Reverse exponential backoff after 32 iterations
-        if (( iterations > 32 ))
-        then
-            delay="$(( delay/2 ))"
-        else
-            (( iterations += 1 ))
-        fi
-    done
-
-    if (( delay < min_delay ))
-    then
-        echo "Wait for api-versions route.openshift.io timed out!"
-        return 1
-    else
-        echo "Fond api-versions route.openshift.io"
-        return 0
-    fi
-}
@@ -19,6 +19,11 @@ import yaml
 from datetime import datetime
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_COUNT
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_DIGEST
+from ansible.module_utils.hotstack_snapset_manifest import image_checksum
+from ansible.module_utils.hotstack_snapset_manifest import image_property
+from ansible.module_utils.hotstack_snapset_manifest import snapset_digest
 
 try:
     import openstack
@@ -49,6 +54,28 @@ options:
   cloud:
     description:
       - Openstack cloud name
+  verify_manifest:
+    description:
+      - Verify snapsets against the manifest published as image properties,
+        snapsets failing verification are skipped in favour of older ones.
+    type: bool
+    default: true
+  require_manifest:
+    description:
+      - Reject snapsets without a manifest. The manifest is published once
+        all images are created, a snapset from a failed or interrupted run
+        has none. Disable to revive snapsets created before manifests were
+        published, they must have an active image for every required role.
+    type: bool
+    default: true
+  required_roles:
+    description:
+      - Roles that must be present in a snapset without a manifest
+    type: list
+    elements: str
+    default:
+      - controller
+      - ocp_master
 author:
     - Harald Jensås <hjensas@redhat.com>
 """
@@ -69,8 +96,16 @@ output:
     description:
       - Master parameters
     type: dict
+snap_id:
+  description: snap_id of the selected snapset
+  type: str
+rejected:
+  description: Newer snapsets that were skipped, with the reason
+  type: dict
 """
 
+IMAGE_ACTIVE = "active"
+
 
 def _parse_iso_timestamp(timestamp_str):
     """Parse ISO 8601 timestamp string into datetime object.
@@ -109,13 +144,88 @@ def _tags_to_dict(tags):
     return tag_dict
 
 
+def _verify_images(images, required_roles):
+    """Verify the images of a snapset without a manifest
+
+    :param images: list of images with the snapset's snap_id tag
+    :param required_roles: roles that must have an image
+    :return: error message, or None if the images are usable
+    """
+    for image in images:
+        if image.status != IMAGE_ACTIVE:
+            return "image {image} is in {status} state".format(
+                image=image.id, status=image.status
+            )
+
+    roles = {_tags_to_dict(image.tags).get("role") for image in images}
+    missing = sorted(set(required_roles) - roles)
+    if missing:
+        return "snapset has no manifest and no image for roles: {}".format(
+            ", ".join(missing)
+        )
+
+    return None
+
+
+def verify_snapset(images, require_manifest=True, required_roles=()):
+    """Verify the images of a snapset against its manifest
+
+    The manifest is published as image properties once all images of a
+    snapset are created. Verification only uses the image listing, the
+    image data is not downloaded.
+
+    :param images: list of images with the snapset's snap_id tag
+    :param require_manifest: reject snapsets without a manifest
+    :param required_roles: roles that must have an image in a snapset
+                           without a manifest
+    :return: error message, or None if the snapset is valid
+    """
+    digests = {image_property(image, MANIFEST_PROPERTY_DIGEST) for image in images}
+    if digests == {None}:
+        if require_manifest:
+            return "snapset has no manifest"
+        return _verify_images(images, required_roles)
+
+    if len(digests) != 1 or None in digests:
+        return "images have inconsistent manifests"
+
+    counts = {image_property(image, MANIFEST_PROPERTY_COUNT) for image in images}
+    if counts != {str(len(images))}:
+        return "expected {count} images, found {found}".format(
+            count=",".join(sorted(str(x) for x in counts)), found=len(images)
+        )
+
+    members = dict()
+    for image in images:
+        if image.status != IMAGE_ACTIVE:
+            return "image {image} is in {status} state".format(
+                image=image.id, status=image.status
+            )
+        name = _tags_to_dict(image.tags).get("name")
+        members[name] = dict(
+            image_id=image.id, checksum=image_checksum(image), size=image.size or 0
+        )
+
+    if snapset_digest(members) != digests.pop():
+        return "snapset digest does not match the manifest"
+
+    return None
+
+
 def get_latest_snapset(conn, module):
     """Get the latest snapset images from OpenStack.
 
+    Snapsets are considered newest first, when manifest verification is
+    enabled snapsets failing verification are skipped.
+
     :param conn: OpenStack connection object
     :param module: Ansible module object for error reporting
-    :return: tuple: (controller_img_id, master_img_id)
+    :return: tuple: (controller_img_id, master_img_id, snap_id, rejected)
     """
+    verify = module.params["verify_manifest"]
+    require_manifest = module.params["require_manifest"]
+    required_roles = module.params["required_roles"]
+
     controller_images = conn.image.images(tag=["hotstack", "role=controller"])
     controller_images = list(controller_images)
 
@@ -124,49 +234,69 @@ def get_latest_snapset(conn, module):
             msg="No controller images found with tags: hotstack, role=controller"
         )
 
-    # initialize variables
-    controller_img = None
-    master_img = None
-    controller_img_created_at = None
-    snap_id = None
-
-    # find the latest controller image
+    # collect controller images with valid timestamp and snap_id
+    candidates = list()
     for image in controller_images:
         img_tags = _tags_to_dict(image.tags)
-        if img_tags.get("role") == "controller":
-            image_created_at = _parse_iso_timestamp(image.created_at)
-            if image_created_at is None:
-                continue  # Skip images with invalid timestamps
-
-            if (
-                controller_img_created_at is None
-                or controller_img_created_at < image_created_at
-            ):
-                controller_img_created_at = image_created_at
-                controller_img = image.id
-                snap_id = img_tags.get("snap_id")
-
-    # find the master image with the same snap_id
-    if snap_id is None:
+        if img_tags.get("role") != "controller":
+            continue
+
+        image_created_at = _parse_iso_timestamp(image.created_at)
+        if image_created_at is None:
+            continue  # Skip images with invalid timestamps
+
+        if img_tags.get("snap_id") is None:
+            continue
+
+        candidates.append((image_created_at, image.id, img_tags["snap_id"]))
+
+    if not candidates:
         module.fail_json(
             msg="No valid snap_id found in controller images. "
             "Controller images must have a snap_id tag."
         )
 
-    master_images = conn.image.images(
-        tag=["hotstack", "role=ocp_master", "snap_id=" + snap_id]
-    )
-    master_images = list(master_images)
-    if len(master_images) == 0:
-        module.fail_json(
-            msg="No master images found with tags: hotstack, role=ocp_master, snap_id={}".format(
-                snap_id
+    # newest first, without verification only the newest is considered
+    candidates.sort(key=lambda x: x[0], reverse=True)
+    if not verify:
+        candidates = candidates[:1]
+
+    rejected = dict()
+    for _, controller_img, snap_id in candidates:
+        images = list(conn.image.images(tag=["hotstack", "snap_id=" + snap_id]))
+
+        if verify:
+            error = verify_snapset(
+                images,
+                require_manifest=require_manifest,
+                required_roles=required_roles,
             )
-        )
+            if error:
+                rejected[snap_id] = error
+                continue
+
+        master_images = [
+            image
+            for image in images
+            if _tags_to_dict(image.tags).get("role") == "ocp_master"
+        ]
+        if len(master_images) == 0:
+            rejected[snap_id] = (
+                "No master images found with tags: "
+                "hotstack, role=ocp_master, snap_id={}".format(snap_id)
+            )
+            continue
 
-    master_img = master_images[0].id
+        return controller_img, master_images[0].id, snap_id, rejected
 
-    return controller_img, master_img
+    module.fail_json(
+        msg="No usable snapset found: {}".format(
+            "; ".join(
+                "{}: {}".format(snap_id, error) for snap_id, error in rejected.items()
+            )
+        ),
+        rejected=rejected,
+    )
 
 
 def run_module():
@@ -187,14 +317,18 @@ def run_module():
             python_system_path=sys.path,
         )
 
-    result = dict(success=False, changed=False, error="", output=dict())
+    result = dict(
+        success=False, changed=False, error="", output=dict(), snap_id="", rejected={}
+    )
     output = dict()
 
     cloud = module.params["cloud"]
 
     try:
         conn = openstack.connect(cloud)
-        controller_img, master_img = get_latest_snapset(conn, module)
+        controller_img, master_img, snap_id, rejected = get_latest_snapset(conn, module)
+        result["snap_id"] = snap_id
+        result["rejected"] = rejected
 
         output.update(
             {
@@ -15,16 +15,26 @@
 
 import base64
 from concurrent import futures
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
 import yaml
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils import errors as ansible_exc
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_CONFIG_HASH
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_COUNT
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_DIGEST
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_DURATION
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_FLAVOR
+from ansible.module_utils.hotstack_snapset_manifest import image_checksum
+from ansible.module_utils.hotstack_snapset_manifest import snapset_digest
 
 try:
     import openstack
-    from openstack import exceptions as os_exc
 
     HAS_OPENSTACK = True
 except ImportError:
@@ -46,6 +56,8 @@ version_added: "2.8"
 
 description:
     - Create snapshot resource set from instances
+    - Optionally waits for the instances to shut off, and starts creating
+      the image of each instance as soon as it is SHUTOFF
 
 options:
   cloud:
@@ -55,6 +67,26 @@ options:
     description:
       - Instances to snapshot and metadata about them
     type: dict
+  max_workers:
+    description:
+      - Maximum number of images to create concurrently. Each worker uses
+        its own openstack connection. When set to 0, one worker per
+        instance is used.
+    type: int
+    default: 0
+  shutoff_timeout:
+    description:
+      - Seconds to wait for the instances to reach the SHUTOFF state. Image
+        creation for each instance starts as soon as it is SHUTOFF. When set
+        to 0, all instances must already be SHUTOFF.
+    type: int
+    default: 0
+  poll_interval:
+    description:
+      - Seconds between polls of the instance states, all instances are
+        polled with a single API call.
+    type: int
+    default: 5
 
 author:
     - Harald Jensås <hjensas@redhat.com>
@@ -63,6 +95,8 @@ author:
 EXAMPLES = r"""
 - name: Create snapshot of instances and volumes
   hotstack_snapset:
+    max_workers: 8
+    shutoff_timeout: 300
     snapset_data:
       instances:
         controller:
@@ -99,6 +133,40 @@ snapset:
     mac_address:
       description: MAC address of the server
       type: str
+    checksum:
+      description: Checksum of the created image
+      type: str
+    size:
+      description: Size of the created image in bytes
+      type: int
+    flavor:
+      description: Flavor of the server
+      type: str
+    duration:
+      description: Seconds it took to create the image
+      type: float
+manifest:
+  description:
+    - Manifest of the snapset, published as image properties on every
+      image once all images are created.
+  type: dict
+  contains:
+    snap_id:
+      description: Uniq ID of the snapset
+    count:
+      description: Number of images in the snapset
+    digest:
+      description: sha256 over name, image id, checksum and size of all images
+    config_hash:
+      description: sha256 of the snapset instance configuration
+    images:
+      description: Snapset images, same as in snapset
+progress:
+  description:
+    - Images in the order they completed, with the time in seconds from
+      the start of the snapset creation.
+  type: list
+  elements: dict
 """
 
 INSTANCE_REQUIRED_KEYS = {
@@ -110,89 +178,315 @@ INSTANCE_REQUIRED_KEYS = {
 INSTANCE_ALLOWED_KEYS = INSTANCE_REQUIRED_KEYS
 
 SERVER_SHUTOFF = "SHUTOFF"
+SERVER_ERROR = "ERROR"
 IMAGE_CREATE_TIMEOUT = 1200
 
+SNAPSET_TAGS = ["hotstack", "hotstack-snapset"]
+
+_thread_local = threading.local()
+
+
+def _get_thread_connection(cloud):
+    """Get an openstack connection for the current thread
 
-def _create_image_from_server(conn, name, uuid, role, mac_address, uniq):
+    openstacksdk connections are not thread safe, each worker thread
+    creates its own connection on first use and re-uses it for
+    subsequent images.
+
+    :param cloud: openstack cloud name
+    :return: openstack connection
+    """
+    conn = getattr(_thread_local, "conn", None)
+    if conn is None:
+        conn = openstack.connect(cloud)
+        _thread_local.conn = conn
+
+    return conn
+
+
+def _snapset_tags(name, role, mac_address, uniq):
+    """Get the list of tags for a snapset image
+
+    :param name: name of server
+    :param role: role of server
+    :param mac_address: mac address of server
+    :param uniq: unique id
+    :return: list of tags
+    """
+    return SNAPSET_TAGS + [
+        "name=" + name,
+        "role=" + role,
+        "snap_id=" + uniq,
+        "mac_address=" + mac_address,
+    ]
+
+
+def _create_image_from_server(cloud, name, uuid, role, mac_address, uniq, flavor):
     """Create image from server
 
     This function creates an image from an existing server using the
     OpenStack Nova API. It tags the newly created image with 'name',
-    'role', 'uniq_id', and 'mac_address' for easy identification.
+    'role', 'uniq_id', and 'mac_address' for easy identification. All
+    tags are set in a single image update.
 
-    :param conn: openstack connection
+    :param cloud: openstack cloud name
     :param name: name of server
     :param uuid: uuid of server
     :param role: role of server
     :param mac_address: mac address of server
     :param uniq: unique id
+    :param flavor: name of the flavor of the server
     :return: image id
     """
+    start = time.monotonic()
+    conn = _get_thread_connection(cloud)
     image_name = "hotstack-" + name + "-snapshot-" + uniq
     image = conn.compute.create_server_image(
         uuid, image_name, wait=True, timeout=IMAGE_CREATE_TIMEOUT
     )
-    conn.image.add_tag(image, "hotstack")
-    conn.image.add_tag(image, "hotstack-snapset")
-    conn.image.add_tag(image, "name=" + name)
-    conn.image.add_tag(image, "role=" + role)
-    conn.image.add_tag(image, "snap_id=" + uniq)
-    conn.image.add_tag(image, "mac_address=" + mac_address)
+    tags = list(image.tags or []) + _snapset_tags(name, role, mac_address, uniq)
+    conn.image.update_image(image, tags=tags)
 
     result = dict()
     result[name] = dict()
     result[name]["image_id"] = image.id
     result[name]["role"] = role
     result[name]["mac_address"] = mac_address
+    result[name]["checksum"] = image_checksum(image)
+    result[name]["size"] = image.size or 0
+    result[name]["flavor"] = flavor
+    result[name]["duration"] = round(time.monotonic() - start, 1)
 
     return result
 
 
-def create_snapset(conn, instances):
+def _flavor_name(server):
+    """Get the name of the flavor a server was booted with
+
+    :param server: openstack server
+    :return: flavor name, or id if the name is not available
+    """
+    flavor = server.flavor or dict()
+    if isinstance(flavor, dict):
+        return flavor.get("original_name") or flavor.get("name") or flavor.get("id")
+
+    return flavor.name or flavor.id
+
+
+def config_hash(instances):
+    """Compute a hash of the snapset instance configuration
+
+    :param instances: instances in the snapset
+    :return: sha256 hex digest
+    """
+    return hashlib.sha256(
+        json.dumps(instances, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def build_manifest(snapset, instances):
+    """Build the manifest of a snapset
+
+    :param snapset: snapshot resource set, as returned by create_snapset
+    :param instances: instances in the snapset
+    :return: manifest dict
+    """
+    members = {k: v for k, v in snapset.items() if k != "snap_id"}
+
+    return dict(
+        snap_id=snapset["snap_id"],
+        count=len(members),
+        digest=snapset_digest(members),
+        config_hash=config_hash(instances),
+        images=members,
+    )
+
+
+def _manifest_properties(manifest, name):
+    """Get the image properties recording the manifest for an image
+
+    :param manifest: manifest dict, as returned by build_manifest
+    :param name: name of the image's instance in the snapset
+    :return: dict of image properties
+    """
+    member = manifest["images"][name]
+    return {
+        MANIFEST_PROPERTY_DIGEST: manifest["digest"],
+        MANIFEST_PROPERTY_COUNT: str(manifest["count"]),
+        MANIFEST_PROPERTY_CONFIG_HASH: manifest["config_hash"],
+        MANIFEST_PROPERTY_FLAVOR: str(member["flavor"] or ""),
+        MANIFEST_PROPERTY_DURATION: str(member["duration"]),
+    }
+
+
+def _publish_manifest_properties(cloud, image_id, properties):
+    """Set the manifest properties on a snapset image
+
+    :param cloud: openstack cloud name
+    :param image_id: id of the image
+    :param properties: dict of image properties
+    :return: image id
+    """
+    conn = _get_thread_connection(cloud)
+    conn.image.update_image(image_id, **properties)
+
+    return image_id
+
+
+def publish_manifest(cloud, manifest, max_workers=0):
+    """Publish the manifest as properties on all images of a snapset
+
+    The manifest is written only once all images are created, an image
+    with manifest properties therefore belongs to a snapset that was
+    completed.
+
+    :param cloud: openstack cloud name
+    :param manifest: manifest dict, as returned by build_manifest
+    :param max_workers: maximum concurrent image updates, 0 for one
+                        worker per image
+    """
+    images = manifest["images"]
+    workers = max_workers if max_workers > 0 else max(len(images), 1)
+    with futures.ThreadPoolExecutor(max_workers=workers) as p:
+        jobs = [
+            p.submit(
+                _publish_manifest_properties,
+                cloud,
+                data["image_id"],
+                _manifest_properties(manifest, name),
+            )
+            for name, data in images.items()
+        ]
+        for job in futures.as_completed(jobs):
+            e = job.exception()
+            if e:
+                raise e
+
+
+def create_snapset(
+    conn,
+    cloud,
+    instances,
+    max_workers=0,
+    progress_cb=None,
+    shutoff_timeout=0,
+    poll_interval=5,
+):
     """Create snapshot resource set from instances
 
-    :param conn: openstack connection
+    The servers are polled with a single list call per interval, and image
+    creation for each server starts as soon as it reaches the SHUTOFF
+    state. Images are created concurrently, and results are collected as
+    each image completes. On the first failure pending jobs are cancelled.
+
+    :param conn: openstack connection, used to poll server state
+    :param cloud: openstack cloud name
     :param instances: instances to snapshot
+    :param max_workers: maximum concurrent image creations, 0 for one
+                        worker per instance
+    :param progress_cb: optional callable, called with (name, result,
+                        elapsed) each time an image completes
+    :param shutoff_timeout: seconds to wait for servers to reach the
+                            SHUTOFF state, 0 requires all servers to
+                            already be SHUTOFF
+    :param poll_interval: seconds between server state polls
     :return: snapshot resource set
+    :raises: AnsibleValidationError - if a server is not found, goes to
+             ERROR state or does not reach SHUTOFF state in time
     """
     uniq = base64.urlsafe_b64encode(os.urandom(6)).decode("utf-8")
     snapset = dict()
     snapset["snap_id"] = uniq
 
-    jobs = []
-    with futures.ThreadPoolExecutor(max_workers=4) as p:
+    workers = max_workers if max_workers > 0 else max(len(instances), 1)
+    start = time.monotonic()
+    deadline = start + shutoff_timeout
+    waiting = dict(instances)
+
+    if shutoff_timeout <= 0:
+        validate_servers_state(get_servers(conn, instances).values())
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as p:
+        jobs = dict()
+
+        def _collect(done):
+            for job in done:
+                e = job.exception()
+                if e:
+                    for pending in jobs:
+                        pending.cancel()
+                    raise e
+
+                name = jobs.pop(job)
+                snapset.update(job.result())
+                if progress_cb is not None:
+                    progress_cb(name, job.result(), time.monotonic() - start)
+
+        while waiting:
+            servers = get_servers(conn, waiting)
+            for name, server in servers.items():
+                if server.status == SERVER_ERROR:
+                    raise ansible_exc.AnsibleValidationError(
+                        "instance {server} is in the {state} state".format(
+                            server=server.id, state=SERVER_ERROR
+                        )
+                    )
+                if server.status != SERVER_SHUTOFF:
+                    continue
+
+                data = waiting.pop(name)
+                job = p.submit(
+                    _create_image_from_server,
+                    cloud,
+                    name,
+                    data["uuid"],
+                    data["role"],
+                    data["mac_address"],
+                    uniq,
+                    _flavor_name(server),
+                )
+                jobs[job] = name
+
+            if not waiting:
+                break
 
-        for name, data in instances.items():
-            uuid = data["uuid"]
-            role = data["role"]
-            mac_address = data["mac_address"]
-            jobs.append(
-                p.submit(
-                    _create_image_from_server, conn, name, uuid, role, mac_address, uniq
+            if time.monotonic() >= deadline:
+                validate_servers_state(
+                    [servers[name] for name in waiting], timeout=shutoff_timeout
                 )
+
+            # Collect images completed while waiting for the other servers
+            timeout = max(min(poll_interval, deadline - time.monotonic()), 0)
+            if not jobs:
+                time.sleep(timeout)
+                continue
+
+            done, _ = futures.wait(
+                list(jobs), timeout=timeout, return_when=futures.FIRST_EXCEPTION
             )
+            _collect(done)
 
-    for job in futures.as_completed(jobs):
-        e = job.exception()
-        if e:
-            raise e
-        else:
-            snapset.update(job.result())
+        _collect(futures.as_completed(list(jobs)))
 
     return snapset
 
 
-def validate_servers_state(servers):
+def validate_servers_state(servers, timeout=0):
     """Validate that all server are in the required SHUTOFF state.
 
     :param servers: list of servers to validate
+    :param timeout: seconds waited for the state, used in the error message
     :raises: AnsibleValidationError - if any of the servers are not in the required state
     """
     for server in servers:
         if server.status != SERVER_SHUTOFF:
             raise ansible_exc.AnsibleValidationError(
-                "instance {server} is not in the {required_state} state".format(
-                    server=server.id, required_state=SERVER_SHUTOFF
+                "instance {server} is not in the {required_state} state{waited}".format(
+                    server=server.id,
+                    required_state=SERVER_SHUTOFF,
+                    waited=(
+                        " after {timeout}s".format(timeout=timeout) if timeout else ""
+                    ),
                 )
             )
 
@@ -200,21 +494,24 @@ def validate_servers_state(servers):
 def get_servers(conn, instances):
     """Get instances from openstack
 
+    All servers are fetched with a single list call.
+
     :param conn: openstack connection
     :param instances: instances to get
-    :return: list of servers
+    :return: dict of servers keyed by instance name
     :raises: AnsibleValidationError - if any of the instances are not found in the openstack cloud
     """
-    servers = list()
-    for _, v in instances.items():
-        try:
-            servers.append(conn.compute.get_server(v["uuid"]))
-        except os_exc.ResourceNotFound:
+    by_uuid = {server.id: server for server in conn.compute.servers(details=True)}
+
+    servers = dict()
+    for name, v in instances.items():
+        if v["uuid"] not in by_uuid:
             raise ansible_exc.AnsibleValidationError(
                 "instance {instance} is not found in the openstack cloud".format(
                     instance=v["uuid"]
                 )
             )
+        servers[name] = by_uuid[v["uuid"]]
 
     return servers
 
@@ -287,21 +584,46 @@ def run_module():
         success=False,
         changed=False,
         snapset=dict(),
+        manifest=dict(),
+        progress=list(),
         error="",
     )
 
     cloud = module.params["cloud"]
     data = module.params["snapset_data"]
+    max_workers = module.params["max_workers"]
+
+    if module.params["poll_interval"] < 1:
+        module.fail_json(msg="poll_interval must be at least 1 second")
+
+    def _progress(name, image, elapsed):
+        result["progress"].append(
+            dict(name=name, image_id=image[name]["image_id"], elapsed=elapsed)
+        )
+        module.log(
+            "hotstack_snapset: image for {name} created after {elapsed:.1f}s".format(
+                name=name, elapsed=elapsed
+            )
+        )
 
     try:
         validate_snapset_data(data)
 
         conn = openstack.connect(cloud)
-        servers = get_servers(conn, data["instances"])
-        validate_servers_state(servers)
-        snapset = create_snapset(conn, data["instances"])
+        snapset = create_snapset(
+            conn,
+            cloud,
+            data["instances"],
+            max_workers=max_workers,
+            progress_cb=_progress,
+            shutoff_timeout=module.params["shutoff_timeout"],
+            poll_interval=module.params["poll_interval"],
+        )
+        manifest = build_manifest(snapset, data["instances"])
+        publish_manifest(cloud, manifest, max_workers=max_workers)
 
         result["snapset"] = snapset
+        result["manifest"] = manifest
         result["success"] = True
         result["changed"] = True
 
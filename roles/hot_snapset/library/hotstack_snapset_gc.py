@@ -0,0 +1,422 @@
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from concurrent import futures
+import re
+import sys
+import threading
+import yaml
+from datetime import datetime
+from datetime import timedelta
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.hotstack_snapset_manifest import MANIFEST_PROPERTY_COUNT
+from ansible.module_utils.hotstack_snapset_manifest import image_property
+
+try:
+    import openstack
+    from openstack import exceptions as os_exc
+
+    HAS_OPENSTACK = True
+except ImportError:
+    HAS_OPENSTACK = False
+
+
+ANSIBLE_METADATA = {
+    "metadata_version": "1.1",
+    "status": ["preview"],
+    "supported_by": "community",
+}
+
+DOCUMENTATION = r"""
+---
+module: hotstack_snapset_gc
+
+short_description: Garbage collect Hotstack snapset images
+version_added: "2.8"
+
+description:
+    - Group Hotstack snapset images by snap_id, keep the newest complete
+      snapsets for each set of roles and delete incomplete or expired
+      snapsets.
+    - The newest complete snapset of each role set is never deleted, even
+      when it is expired.
+
+options:
+  cloud:
+    description:
+      - Openstack cloud name
+    type: str
+  keep:
+    description:
+      - Number of complete snapsets to keep per role set
+    type: int
+    default: 2
+  max_age_days:
+    description:
+      - Snapsets older than this number of days are expired and deleted.
+        Set to 0 to disable expiry.
+    type: int
+    default: 30
+  incomplete_grace_minutes:
+    description:
+      - Incomplete snapsets younger than this are assumed to still be in
+        progress and are not deleted.
+    type: int
+    default: 120
+  required_roles:
+    description:
+      - Roles that must be present for a snapset to be complete
+    type: list
+    elements: str
+    default:
+      - controller
+      - ocp_master
+  max_workers:
+    description:
+      - Maximum number of images deleted concurrently
+    type: int
+    default: 8
+  dry_run:
+    description:
+      - Only report what would be deleted
+    type: bool
+    default: true
+
+author:
+    - Harald Jensås <hjensas@redhat.com>
+"""
+
+EXAMPLES = r"""
+- name: Report snapsets that would be garbage collected
+  hotstack_snapset_gc:
+    cloud: default
+    keep: 2
+
+- name: Delete incomplete snapsets and snapsets older than 14 days
+  hotstack_snapset_gc:
+    cloud: default
+    keep: 1
+    max_age_days: 14
+    dry_run: false
+"""
+
+RETURN = r"""
+kept:
+  description: Snapsets kept
+  type: list
+  elements: dict
+deleted:
+  description: Snapsets deleted, or that would be deleted in dry-run mode
+  type: list
+  elements: dict
+reclaimed_bytes:
+  description: Total size of the images deleted, or that would be deleted
+  type: int
+"""
+
+SNAPSET_TAGS = ["hotstack", "hotstack-snapset"]
+IMAGE_ACTIVE = "active"
+
+REASON_INCOMPLETE = "incomplete"
+REASON_EXPIRED = "expired"
+REASON_SUPERSEDED = "superseded"
+
+_thread_local = threading.local()
+
+
+def _parse_iso_timestamp(timestamp_str):
+    """Parse ISO 8601 timestamp string into datetime object.
+
+    :param timestamp_str: ISO 8601 timestamp string (e.g., "2025-07-11T21:26:43Z")
+    :return: datetime object or None if parsing fails
+    """
+    try:
+        # Handle both with and without microseconds
+        if "." in timestamp_str:
+            return datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+        else:
+            return datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%SZ")
+    except (TypeError, ValueError):
+        return None
+
+
+def _tags_to_dict(tags):
+    """Convert a list of tags to a dictionary format.
+
+    :param tags: List of tags in "key=value" format
+    :return: Dictionary with tag keys and values
+    """
+    tag_dict = dict()
+    for tag in tags:
+        if not re.match(r".*=.*", tag):
+            continue
+
+        try:
+            key, value = tag.rsplit("=", 1)
+        except ValueError:
+            continue
+
+        tag_dict.update({key: value})
+
+    return tag_dict
+
+
+def _get_thread_connection(cloud):
+    """Get an openstack connection for the current thread
+
+    :param cloud: openstack cloud name
+    :return: openstack connection
+    """
+    conn = getattr(_thread_local, "conn", None)
+    if conn is None:
+        conn = openstack.connect(cloud)
+        _thread_local.conn = conn
+
+    return conn
+
+
+def group_snapsets(images, required_roles):
+    """Group snapset images by snap_id
+
+    :param images: iterable of glance images tagged as snapset images
+    :param required_roles: roles required for a snapset to be complete
+    :return: dict of snapsets keyed by snap_id
+    """
+    snapsets = dict()
+    for image in images:
+        tags = _tags_to_dict(image.tags or [])
+        snap_id = tags.get("snap_id")
+        if snap_id is None:
+            continue
+
+        snapset = snapsets.setdefault(
+            snap_id,
+            dict(
+                snap_id=snap_id,
+                images=list(),
+                roles=set(),
+                size=0,
+                created_at=None,
+                all_active=True,
+                manifest_count=None,
+            ),
+        )
+        snapset["images"].append(
+            dict(id=image.id, name=image.name, role=tags.get("role"))
+        )
+        if tags.get("role"):
+            snapset["roles"].add(tags["role"])
+        snapset["size"] += image.size or 0
+        if image.status != IMAGE_ACTIVE:
+            snapset["all_active"] = False
+        if image_property(image, MANIFEST_PROPERTY_COUNT) is not None:
+            snapset["manifest_count"] = image_property(image, MANIFEST_PROPERTY_COUNT)
+
+        created_at = _parse_iso_timestamp(image.created_at)
+        if created_at is not None and (
+            snapset["created_at"] is None or created_at > snapset["created_at"]
+        ):
+            snapset["created_at"] = created_at
+
+    for snapset in snapsets.values():
+        # Snapsets with a manifest must have all the images listed in it
+        manifest_count = snapset["manifest_count"]
+        manifest_ok = manifest_count is None or manifest_count == str(
+            len(snapset["images"])
+        )
+        snapset["complete"] = (
+            snapset["all_active"]
+            and manifest_ok
+            and set(required_roles).issubset(snapset["roles"])
+        )
+
+    return snapsets
+
+
+def plan_gc(snapsets, keep, max_age_days, incomplete_grace_minutes, now=None):
+    """Decide which snapsets to keep and which to delete
+
+    :param snapsets: dict of snapsets as returned by group_snapsets
+    :param keep: number of complete snapsets to keep per role set
+    :param max_age_days: expiry age in days, 0 disables expiry
+    :param incomplete_grace_minutes: grace period for incomplete snapsets
+    :param now: current time, defaults to datetime.utcnow()
+    :return: tuple (keep_list, delete_list), delete_list items have a reason
+    """
+    now = now or datetime.utcnow()
+    grace = timedelta(minutes=incomplete_grace_minutes)
+    expiry = timedelta(days=max_age_days) if max_age_days > 0 else None
+
+    kept = list()
+    deleted = list()
+
+    by_role_set = dict()
+    for snapset in snapsets.values():
+        if not snapset["complete"]:
+            if (
+                snapset["created_at"] is not None
+                and now - snapset["created_at"] < grace
+            ):
+                kept.append(snapset)
+            else:
+                deleted.append(dict(snapset, reason=REASON_INCOMPLETE))
+            continue
+
+        role_set = tuple(sorted(snapset["roles"]))
+        by_role_set.setdefault(role_set, list()).append(snapset)
+
+    for role_set, complete in by_role_set.items():
+        complete.sort(key=lambda x: x["created_at"] or datetime.min, reverse=True)
+        for idx, snapset in enumerate(complete):
+            if idx == 0:
+                kept.append(snapset)
+            elif idx >= keep:
+                deleted.append(dict(snapset, reason=REASON_SUPERSEDED))
+            elif (
+                expiry is not None
+                and snapset["created_at"] is not None
+                and now - snapset["created_at"] > expiry
+            ):
+                deleted.append(dict(snapset, reason=REASON_EXPIRED))
+            else:
+                kept.append(snapset)
+
+    return kept, deleted
+
+
+def _delete_image(cloud, image_id):
+    """Delete an image, ignoring images that are already gone
+
+    :param cloud: openstack cloud name
+    :param image_id: id of the image to delete
+    :return: image id
+    """
+    conn = _get_thread_connection(cloud)
+    try:
+        conn.image.delete_image(image_id, ignore_missing=True)
+    except os_exc.ResourceNotFound:
+        pass
+
+    return image_id
+
+
+def delete_snapsets(cloud, snapsets, max_workers):
+    """Delete the images of snapsets in parallel
+
+    :param cloud: openstack cloud name
+    :param snapsets: list of snapsets to delete
+    :param max_workers: maximum number of concurrent deletes
+    :return: list of error messages
+    """
+    errors = list()
+    with futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as p:
+        jobs = dict()
+        for snapset in snapsets:
+            for image in snapset["images"]:
+                jobs[p.submit(_delete_image, cloud, image["id"])] = image["id"]
+
+        for job in futures.as_completed(jobs):
+            e = job.exception()
+            if e:
+                errors.append(
+                    "Failed to delete image {image}: {err}".format(
+                        image=jobs[job], err=e
+                    )
+                )
+
+    return errors
+
+
+def _summary(snapset):
+    """Serializable summary of a snapset"""
+    summary = dict(
+        snap_id=snapset["snap_id"],
+        roles=sorted(snapset["roles"]),
+        created_at=(
+            snapset["created_at"].strftime("%Y-%m-%dT%H:%M:%SZ")
+            if snapset["created_at"]
+            else None
+        ),
+        size=snapset["size"],
+        complete=snapset["complete"],
+        images=[image["id"] for image in snapset["images"]],
+    )
+    if "reason" in snapset:
+        summary["reason"] = snapset["reason"]
+
+    return summary
+
+
+def run_module():
+    argument_spec = yaml.safe_load(DOCUMENTATION)["options"]
+    module = AnsibleModule(argument_spec, supports_check_mode=True)
+
+    if not HAS_OPENSTACK:
+        module.fail_json(
+            msg='Could not import "openstack" library. \
+              openstack is required on PYTHONPATH to run this module',
+            python=sys.executable,
+            python_version=sys.version,
+            python_system_path=sys.path,
+        )
+
+    result = dict(
+        success=False,
+        changed=False,
+        kept=list(),
+        deleted=list(),
+        reclaimed_bytes=0,
+        error="",
+    )
+
+    cloud = module.params["cloud"]
+    dry_run = module.params["dry_run"] or module.check_mode
+
+    try:
+        conn = openstack.connect(cloud)
+        images = conn.image.images(tag=SNAPSET_TAGS)
+        snapsets = group_snapsets(images, module.params["required_roles"])
+        kept, deleted = plan_gc(
+            snapsets,
+            module.params["keep"],
+            module.params["max_age_days"],
+            module.params["incomplete_grace_minutes"],
+        )
+
+        result["kept"] = [_summary(x) for x in kept]
+        result["deleted"] = [_summary(x) for x in deleted]
+        result["reclaimed_bytes"] = sum(x["size"] for x in deleted)
+
+        if not dry_run and deleted:
+            errors = delete_snapsets(cloud, deleted, module.params["max_workers"])
+            result["changed"] = True
+            if errors:
+                raise Exception("; ".join(errors))
+
+        result["success"] = True
+        module.exit_json(**result)
+    except Exception as err:
+        result["error"] = str(err)
+        result["msg"] = "Failed to garbage collect snapsets, {err}".format(err=err)
+        module.fail_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Snapset manifest shared by the snapset create, revive and gc modules"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+
+# Manifest image properties, published on every image of a snapset
+MANIFEST_PROPERTY_DIGEST = "hotstack_snapset_digest"
+MANIFEST_PROPERTY_COUNT = "hotstack_snapset_count"
+MANIFEST_PROPERTY_CONFIG_HASH = "hotstack_snapset_config_hash"
+MANIFEST_PROPERTY_FLAVOR = "hotstack_source_flavor"
+MANIFEST_PROPERTY_DURATION = "hotstack_create_duration"
+
+
+def image_checksum(image):
+    """Get the checksum of an image, preferring the multihash value
+
+    :param image: glance image
+    :return: checksum string
+    """
+    return (
+        getattr(image, "os_hash_value", None) or getattr(image, "checksum", None) or ""
+    )
+
+
+def image_property(image, key):
+    """Get a custom property of an image
+
+    :param image: glance image
+    :param key: property name
+    :return: property value or None
+    """
+    properties = getattr(image, "properties", None) or dict()
+    return properties.get(key, getattr(image, key, None))
+
+
+def snapset_digest(members):
+    """Compute the digest of a snapset
+
+    The digest covers the name, image id, checksum and size of every image
+    in the snapset. It is stored on each image and recomputed from the
+    image listing to verify the snapset.
+
+    :param members: dict of name: {image_id, checksum, size}
+    :return: sha256 hex digest
+    """
+    lines = [
+        "{name}|{image_id}|{checksum}|{size}".format(
+            name=name,
+            image_id=data["image_id"],
+            checksum=data["checksum"],
+            size=data["size"],
+        )
+        for name, data in sorted(members.items())
+    ]
+
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
@@ -0,0 +1,186 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import yaml
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.hotlogs_collectors import run_collectors
+from ansible.module_utils.hotlogs_collectors import validate_collector
+
+DOCUMENTATION = """
+---
+module: hotlogs_collect
+short_description: Run hotlogs log collectors concurrently
+description:
+    - Runs log collectors concurrently with a bounded pool
+    - Each collector has its own timeout, a failing or timed out collector
+      does not stop the others
+    - Collectors write directly into their place in dest_dir
+    - Reports duration and collected bytes per collector
+version_added: "1.0.0"
+options:
+    dest_dir:
+        description: Directory to collect into, typically the base_dir of the controller
+        required: true
+        type: str
+    collectors:
+        description:
+            - List of collectors. Each collector is a dict with C(name),
+              C(type) and optionally C(timeout) in seconds and C(optional),
+              optional collectors report their result but never fail.
+            - C(must_gather) runs must-gather into dest_dir/must-gather and
+              compresses it, C(params) takes the hotlogs_must_gather options.
+            - C(tempest) streams tempest logs from the test-operator PVCs of
+              the namespaces in C(namespaces), concurrently, into
+              dest_dir/logs/tempest. C(patterns) optionally lists the file
+              name patterns to collect, patterns with a / match the path.
+            - C(console_recordings) incrementally copies nova console
+              recordings from C(src) into dest_dir/nova-console-recordings,
+              indexed by instance and time range in index.json. Only new
+              segments and the new tail of growing segments are transferred.
+              Text console logs are gzip compressed unless C(compress_text)
+              is false.
+            - C(command) runs C(cmd), a list, and reports the size of
+              dest_dir/C(dest).
+        required: true
+        type: list
+        elements: dict
+    max_workers:
+        description: Maximum number of collectors running concurrently
+        required: false
+        default: 4
+        type: int
+    default_timeout:
+        description: Timeout in seconds for collectors without a timeout
+        required: false
+        default: 900
+        type: int
+author:
+    - "Red Hat OpenStack Services"
+"""
+
+EXAMPLES = """
+- name: Collect logs
+  hotlogs_collect:
+    dest_dir: /home/zuul
+    collectors:
+      - name: must-gather
+        type: must_gather
+        timeout: 1200
+        params:
+          additional_namespaces: "sushy-emulator"
+          openstack_databases: "ALL"
+      - name: tempest
+        type: tempest
+        namespaces:
+          - openstack
+        patterns:
+          - "*.html"
+          - "*.subunit*"
+      - name: nova-console-recordings
+        type: console_recordings
+        src: /export/nova-console-recordings
+"""
+
+RETURN = """
+changed:
+    description: Whether any changes were made
+    returned: always
+    type: bool
+collectors:
+    description: Result of each collector, in the order they finished
+    returned: always
+    type: list
+    elements: dict
+    contains:
+        name:
+            description: Name of the collector
+            type: str
+        rc:
+            description: Return code, 124 if the collector timed out
+            type: int
+        failed:
+            description: Whether the collector failed
+            type: bool
+        timed_out:
+            description: Whether the collector timed out
+            type: bool
+        duration:
+            description: Seconds the collector ran
+            type: float
+        bytes:
+            description: Bytes collected
+            type: int
+        path:
+            description: Path the collector wrote to
+            type: str
+failed_collectors:
+    description: Names of the collectors that failed
+    returned: always
+    type: list
+    elements: str
+msg:
+    description: Status message
+    returned: always
+    type: str
+"""
+
+
+def main():
+    argument_spec = yaml.safe_load(DOCUMENTATION)["options"]
+
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=False)
+
+    try:
+        for collector in module.params["collectors"]:
+            validate_collector(collector)
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+
+    try:
+        dest_dir = module.params["dest_dir"]
+        os.makedirs(dest_dir, exist_ok=True)
+
+        results = run_collectors(
+            module.params["collectors"],
+            dest_dir,
+            max_workers=module.params["max_workers"],
+            default_timeout=module.params["default_timeout"],
+        )
+        failed = [x["name"] for x in results if x["failed"]]
+
+        module.exit_json(
+            changed=True,
+            collectors=results,
+            failed_collectors=failed,
+            msg="Collected {} bytes with {} collectors, {} failed".format(
+                sum(x["bytes"] for x in results), len(results), len(failed)
+            ),
+        )
+
+    except Exception as e:
+        module.fail_json(msg="Unexpected error occurred: {}".format(str(e)))
+
+
+if __name__ == "__main__":
+    main()
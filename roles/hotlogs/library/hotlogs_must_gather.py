@@ -21,12 +21,12 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 import os
-import subprocess
-import tempfile
-import shutil
 import yaml
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.hotlogs_collectors import compress_output
+from ansible.module_utils.hotlogs_collectors import path_size
+from ansible.module_utils.hotlogs_collectors import run_must_gather
 
 DOCUMENTATION = """
 ---
@@ -34,7 +34,11 @@ module: hotlogs_must_gather
 short_description: Run OpenShift must-gather with OpenStack operators
 description:
     - Runs oc adm must-gather with specified parameters
-    - Compresses the output into a tar.gz file
+    - Streams the must-gather output to <dest_dir>.log, next to dest_dir, as
+      it runs, and appends progress samples to <dest_dir>.log.progress
+    - On failure or timeout the partial output is kept and compressed
+    - Compresses the output into a tar archive, with gzip or with
+      multithreaded pigz or zstd
     - Provides structured output for Ansible
 version_added: "1.0.0"
 options:
@@ -77,6 +81,24 @@ options:
         required: false
         default: ""
         type: str
+    parallel_namespaces:
+        description:
+            - Gather the additional namespaces with one targeted
+              C(oc adm inspect) per namespace, concurrently with the main
+              must-gather, into dest_dir/namespaces
+        required: false
+        default: false
+        type: bool
+    command_timeout:
+        description: Timeout in seconds for the must-gather commands, the processes are killed when it expires
+        required: false
+        default: 600
+        type: int
+    progress_interval:
+        description: Seconds between progress samples
+        required: false
+        default: 10
+        type: int
     host_network:
         description: Whether to use host network for must-gather
         required: false
@@ -87,6 +109,32 @@ options:
         required: false
         default: true
         type: bool
+    compression:
+        description:
+            - Compressor for the output archive. C(zstd) creates a .tar.zst
+              archive and falls back to C(pigz) when zstd is not installed,
+              C(pigz) creates a .tar.gz archive and falls back to C(gzip).
+              A .tar.zst archive can only be extracted where zstd is
+              installed.
+        required: false
+        default: gzip
+        choices: [gzip, pigz, zstd]
+        type: str
+    compression_level:
+        description: Compression level, 0 for the compressor default
+        required: false
+        default: 0
+        type: int
+    compression_threads:
+        description: Threads used by zstd and pigz, 0 for all cores
+        required: false
+        default: 0
+        type: int
+    compress_timeout:
+        description: Timeout in seconds for compression
+        required: false
+        default: 300
+        type: int
 author:
     - "Red Hat OpenStack Services"
 """
@@ -106,6 +154,20 @@ EXAMPLES = """
     host_network: true
     timeout: "20m"
 
+- name: Run must-gather and compress with multithreaded zstd
+  hotlogs_must_gather:
+    dest_dir: "/tmp/must-gather"
+    compression: zstd
+    compression_level: 3
+    compress_timeout: 600
+
+- name: Run must-gather with one concurrent gather per additional namespace
+  hotlogs_must_gather:
+    dest_dir: "/tmp/must-gather"
+    additional_namespaces: "sushy-emulator,custom-namespace"
+    parallel_namespaces: true
+    command_timeout: 900
+
 - name: Run must-gather with all OpenStack databases
   hotlogs_must_gather:
     dest_dir: "/tmp/must-gather"
@@ -124,9 +186,26 @@ must_gather_path:
     returned: success
     type: str
 archive_path:
-    description: Path to the compressed archive (if compression enabled)
-    returned: success and compress=true
+    description: Path to the compressed archive (if compression enabled), also returned with the partial output on failure
+    returned: compress=true
     type: str
+log_path:
+    description: Path to the log file with the must-gather output
+    returned: always
+    type: str
+partial:
+    description: Whether the must-gather output is partial, due to a failure or timeout
+    returned: always
+    type: bool
+gathers:
+    description: Result, log file and last progress sample of each gather
+    returned: always
+    type: list
+    elements: dict
+compression:
+    description: Compression method, level, duration, sizes and ratio
+    returned: success and compress=true
+    type: dict
 msg:
     description: Status message
     returned: always
@@ -134,94 +213,6 @@ msg:
 """
 
 
-def run_must_gather(module):
-    """Run the must-gather command"""
-
-    # Build the must-gather command
-    cmd = [
-        "oc",
-        "adm",
-        "must-gather",
-        "--image-stream={}".format(module.params["image_stream"]),
-        "--image={}".format(module.params["image"]),
-        "--dest-dir={}".format(module.params["dest_dir"]),
-        "--timeout={}".format(module.params["timeout"]),
-        "--host-network={}".format(str(module.params["host_network"]).lower()),
-        "--",
-    ]
-
-    # Add environment variables
-    cmd.append(
-        "ADDITIONAL_NAMESPACES={}".format(module.params["additional_namespaces"])
-    )
-    if module.params["openstack_databases"]:
-        cmd.append(
-            "OPENSTACK_DATABASES={}".format(module.params["openstack_databases"])
-        )
-    cmd.append("SOS_EDPM={}".format(module.params["sos_edpm"]))
-    cmd.append("SOS_DECOMPRESS={}".format(module.params["sos_decompress"]))
-    cmd.append("gather")
-
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=600,  # 10 minute fallback timeout
-        )
-
-        return {
-            "rc": result.returncode,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "cmd": " ".join(cmd),
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "rc": 124,
-            "stdout": "",
-            "stderr": "Must-gather command timed out",
-            "cmd": " ".join(cmd),
-        }
-    except Exception as e:
-        return {"rc": 1, "stdout": "", "stderr": str(e), "cmd": " ".join(cmd)}
-
-
-def compress_output(module, must_gather_dir):
-    """Compress the must-gather output"""
-
-    base_dir = os.path.dirname(must_gather_dir)
-    dir_name = os.path.basename(must_gather_dir)
-    archive_path = "{}.tar.gz".format(must_gather_dir)
-
-    cmd = [
-        "tar",
-        "-czf",
-        archive_path,
-        "--ignore-failed-read",
-        "-C",
-        base_dir,
-        dir_name,
-    ]
-
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minute timeout for compression
-        )
-
-        return {
-            "rc": result.returncode,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "archive_path": archive_path if result.returncode == 0 else None,
-        }
-    except Exception as e:
-        return {"rc": 1, "stdout": "", "stderr": str(e), "archive_path": None}
-
-
 def main():
     argument_spec = yaml.safe_load(DOCUMENTATION)["options"]
 
@@ -235,25 +226,49 @@ def main():
         os.makedirs(dest_dir, exist_ok=True)
 
         # Run must-gather
-        must_gather_result = run_must_gather(module)
+        must_gather_result = run_must_gather(
+            module.params, timeout=module.params["command_timeout"]
+        )
 
         if must_gather_result["rc"] != 0:
+            # Keep and compress whatever was gathered
+            if module.params["compress"] and path_size(dest_dir):
+                compress_result = compress_output(
+                    dest_dir,
+                    timeout=module.params["compress_timeout"],
+                    compression=module.params["compression"],
+                    level=module.params["compression_level"],
+                    threads=module.params["compression_threads"],
+                )
+                must_gather_result["archive_path"] = compress_result["archive_path"]
+
             module.fail_json(
                 msg="Must-gather failed: {} (Command: {})".format(
                     must_gather_result["stderr"], must_gather_result["cmd"]
                 ),
+                must_gather_path=dest_dir,
                 **must_gather_result
             )
 
         result["must_gather_path"] = dest_dir
+        result["log_path"] = must_gather_result["log_path"]
+        result["partial"] = False
+        result["gathers"] = must_gather_result["gathers"]
         result["msg"] = "Must-gather completed successfully"
 
         # Compress if requested
         if module.params["compress"]:
-            compress_result = compress_output(module, dest_dir)
+            compress_result = compress_output(
+                dest_dir,
+                timeout=module.params["compress_timeout"],
+                compression=module.params["compression"],
+                level=module.params["compression_level"],
+                threads=module.params["compression_threads"],
+            )
 
             if compress_result["rc"] == 0:
                 result["archive_path"] = compress_result["archive_path"]
+                result["compression"] = compress_result["compression"]
                 result["msg"] += " and compressed"
             else:
                 # Fail on compression error
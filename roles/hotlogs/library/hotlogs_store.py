@@ -0,0 +1,368 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from concurrent import futures
+import hashlib
+import json
+import os
+import tempfile
+import time
+import yaml
+import zlib
+
+from ansible.module_utils.basic import AnsibleModule
+
+DOCUMENTATION = """
+---
+module: hotlogs_store
+short_description: Content-addressed, deduplicated log store
+description:
+    - Stores files in a content-addressed store. Files are split in
+      chunks, each unique chunk is stored once, compressed, under its
+      sha256.
+    - Each run writes an index mapping file paths to their chunks.
+      Files unchanged since a previous run only add an index entry.
+    - Restores the files of a run from its index.
+    - Copying the store with rsync only transfers chunks not already on
+      the other side.
+version_added: "1.0.0"
+options:
+    store_dir:
+        description: Directory of the store
+        required: true
+        type: str
+    state:
+        description:
+            - C(store) adds the files in I(paths) to the store and writes
+              the index of the run.
+            - C(restore) writes the files of the run I(run_id) to
+              I(dest_dir).
+        required: false
+        default: store
+        choices: [store, restore]
+        type: str
+    paths:
+        description:
+            - Files and directories to store, each a dict with C(src) and
+              C(dest), the path in the index. Missing sources are skipped.
+        required: false
+        default: []
+        type: list
+        elements: dict
+    run_id:
+        description: ID of the run, used as the index name
+        required: false
+        type: str
+    dest_dir:
+        description: Directory to restore to, for state=restore
+        required: false
+        type: str
+    chunk_size:
+        description: Chunk size in bytes
+        required: false
+        default: 4194304
+        type: int
+    max_workers:
+        description: Maximum number of files hashed and stored concurrently
+        required: false
+        default: 4
+        type: int
+author:
+    - "Red Hat OpenStack Services"
+"""
+
+EXAMPLES = """
+- name: Store logs of this run
+  hotlogs_store:
+    store_dir: /home/zuul/hotlogs-store
+    run_id: "{{ zuul.build | default(ansible_date_time.epoch) }}"
+    paths:
+      - src: /home/zuul/data
+        dest: data
+      - src: /home/zuul/logs/tempest
+        dest: tempest
+
+- name: Restore logs of a run
+  hotlogs_store:
+    store_dir: /var/lib/hotlogs-store
+    state: restore
+    run_id: "1234"
+    dest_dir: /tmp/logs
+"""
+
+RETURN = """
+changed:
+    description: Whether any changes were made
+    returned: always
+    type: bool
+index_path:
+    description: Path of the index of the run
+    returned: always
+    type: str
+files:
+    description: Number of files stored or restored
+    returned: always
+    type: int
+bytes_total:
+    description: Total size of the files
+    returned: always
+    type: int
+bytes_new:
+    description: Size of the chunks added to the store by this run
+    returned: state=store
+    type: int
+chunks_total:
+    description: Number of chunks referenced by the run
+    returned: state=store
+    type: int
+chunks_new:
+    description: Number of chunks added to the store by this run
+    returned: state=store
+    type: int
+msg:
+    description: Status message
+    returned: always
+    type: str
+"""
+
+OBJECTS_DIR = "objects"
+INDEX_DIR = "index"
+
+
+def _object_path(store_dir, digest):
+    """Path of a chunk in the store"""
+    return os.path.join(store_dir, OBJECTS_DIR, digest[:2], digest)
+
+
+def _index_path(store_dir, run_id):
+    """Path of the index of a run"""
+    return os.path.join(store_dir, INDEX_DIR, "{}.json".format(run_id))
+
+
+def _write_atomic(path, data):
+    """Write data to path, atomically replacing it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def store_file(store_dir, path, chunk_size):
+    """Add a file to the store
+
+    :param store_dir: directory of the store
+    :param path: file to store
+    :param chunk_size: chunk size in bytes
+    :return: dict with chunks, size, mode, new_bytes and new_chunks
+    """
+    chunks = list()
+    size = 0
+    new_bytes = 0
+    new_chunks = 0
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+
+            digest = hashlib.sha256(data).hexdigest()
+            chunks.append(digest)
+            size += len(data)
+
+            object_path = _object_path(store_dir, digest)
+            if not os.path.exists(object_path):
+                _write_atomic(object_path, zlib.compress(data))
+                new_bytes += len(data)
+                new_chunks += 1
+
+    return dict(
+        chunks=chunks,
+        size=size,
+        mode=os.stat(path).st_mode & 0o777,
+        new_bytes=new_bytes,
+        new_chunks=new_chunks,
+    )
+
+
+def _walk(src, dest):
+    """Yield (source file, index path) for a file or directory"""
+    if os.path.isfile(src):
+        yield src, os.path.normpath(dest)
+        return
+
+    for root, _, files in os.walk(src):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if os.path.islink(path) and not os.path.exists(path):
+                continue
+            yield path, os.path.normpath(os.path.join(dest, os.path.relpath(path, src)))
+
+
+def store(store_dir, paths, run_id, chunk_size, max_workers):
+    """Store files and write the index of the run
+
+    :param store_dir: directory of the store
+    :param paths: list of dicts with src and dest
+    :param run_id: ID of the run
+    :param chunk_size: chunk size in bytes
+    :param max_workers: maximum number of files stored concurrently
+    :return: result dict
+    """
+    files = dict()
+    for entry in paths:
+        if not os.path.exists(entry["src"]):
+            continue
+        for src, dest in _walk(entry["src"], entry["dest"]):
+            files[dest] = src
+
+    index = dict(run_id=run_id, created_at=int(time.time()), files=dict())
+    result = dict(files=0, bytes_total=0, bytes_new=0, chunks_total=0, chunks_new=0)
+
+    with futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as p:
+        jobs = {
+            p.submit(store_file, store_dir, src, chunk_size): dest
+            for dest, src in files.items()
+        }
+        for job in futures.as_completed(jobs):
+            stored = job.result()
+            index["files"][jobs[job]] = dict(
+                chunks=stored["chunks"], size=stored["size"], mode=stored["mode"]
+            )
+            result["files"] += 1
+            result["bytes_total"] += stored["size"]
+            result["bytes_new"] += stored["new_bytes"]
+            result["chunks_total"] += len(stored["chunks"])
+            result["chunks_new"] += stored["new_chunks"]
+
+    result["index_path"] = _index_path(store_dir, run_id)
+    _write_atomic(
+        result["index_path"], json.dumps(index, indent=1, sort_keys=True).encode()
+    )
+
+    return result
+
+
+def restore_file(store_dir, dest, entry):
+    """Write a file from its chunks in the store"""
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    with open(dest, "wb") as f:
+        for digest in entry["chunks"]:
+            with open(_object_path(store_dir, digest), "rb") as chunk:
+                f.write(zlib.decompress(chunk.read()))
+    os.chmod(dest, entry["mode"])
+
+    return entry["size"]
+
+
+def restore(store_dir, run_id, dest_dir, max_workers):
+    """Restore the files of a run
+
+    :param store_dir: directory of the store
+    :param run_id: ID of the run
+    :param dest_dir: directory to restore to
+    :param max_workers: maximum number of files restored concurrently
+    :return: result dict
+    """
+    index_path = _index_path(store_dir, run_id)
+    with open(index_path) as f:
+        index = json.load(f)
+
+    dest_root = os.path.abspath(dest_dir)
+    result = dict(index_path=index_path, files=0, bytes_total=0)
+    with futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as p:
+        jobs = list()
+        for path, entry in index["files"].items():
+            dest = os.path.abspath(os.path.join(dest_root, path))
+            if not dest.startswith(dest_root + os.sep):
+                raise ValueError("Invalid path in index: {}".format(path))
+            jobs.append(p.submit(restore_file, store_dir, dest, entry))
+
+        for job in futures.as_completed(jobs):
+            result["files"] += 1
+            result["bytes_total"] += job.result()
+
+    return result
+
+
+def main():
+    argument_spec = yaml.safe_load(DOCUMENTATION)["options"]
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        required_if=[
+            ("state", "store", ["run_id"]),
+            ("state", "restore", ["run_id", "dest_dir"]),
+        ],
+        supports_check_mode=False,
+    )
+
+    store_dir = module.params["store_dir"]
+    run_id = module.params["run_id"]
+    if os.sep in run_id or run_id.startswith("."):
+        module.fail_json(msg="Invalid run_id: {}".format(run_id))
+
+    try:
+        if module.params["state"] == "store":
+            for entry in module.params["paths"]:
+                if "src" not in entry or "dest" not in entry:
+                    module.fail_json(
+                        msg="paths entries must have src and dest: {}".format(entry)
+                    )
+
+            result = store(
+                store_dir,
+                module.params["paths"],
+                run_id,
+                module.params["chunk_size"],
+                module.params["max_workers"],
+            )
+            module.exit_json(
+                changed=True,
+                msg="Stored {} files, {} of {} bytes new".format(
+                    result["files"], result["bytes_new"], result["bytes_total"]
+                ),
+                **result
+            )
+
+        result = restore(
+            store_dir, run_id, module.params["dest_dir"], module.params["max_workers"]
+        )
+        module.exit_json(
+            changed=True,
+            msg="Restored {} files, {} bytes".format(
+                result["files"], result["bytes_total"]
+            ),
+            **result
+        )
+
+    except Exception as e:
+        module.fail_json(msg="Unexpected error occurred: {}".format(str(e)))
+
+
+if __name__ == "__main__":
+    main()
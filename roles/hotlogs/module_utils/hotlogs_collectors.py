@@ -0,0 +1,984 @@
+# -*- coding: utf-8 -*-
+
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Log collectors shared by the hotlogs modules"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from collections import deque
+from concurrent import futures
+import gzip
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+MUST_GATHER_TIMEOUT = 600  # 10 minute fallback timeout
+PROGRESS_INTERVAL = 10
+LOG_TAIL_LINES = 50
+COMPRESS_TIMEOUT = 300  # 5 minute timeout for compression
+
+MUST_GATHER_DEFAULTS = {
+    "image_stream": "openshift/must-gather",
+    "image": "quay.io/openstack-k8s-operators/openstack-must-gather",
+    "timeout": "10m",
+    "additional_namespaces": "sushy-emulator",
+    "sos_edpm": "all",
+    "sos_decompress": "0",
+    "openstack_databases": "",
+    "host_network": False,
+    "parallel_namespaces": False,
+    "progress_interval": PROGRESS_INTERVAL,
+    "compression": "gzip",
+    "compression_level": 0,
+    "compression_threads": 0,
+    "compress_timeout": COMPRESS_TIMEOUT,
+}
+
+STREAM_CHUNK_SIZE = 65536
+TEMPEST_HELPER_IMAGE = "quay.io/quay/busybox:latest"
+# Tempest artefacts collected from the test-operator PVCs, patterns with a /
+# match the path, the others the file name
+TEMPEST_PATTERNS = ["*.html", "*.subunit*", "*stestr*", "*/.stestr/*"]
+
+CONSOLE_INDEX = "index.json"
+CONSOLE_CHUNK_SIZE = 4 * 1024 * 1024
+CONSOLE_TEXT_SUFFIXES = (".log", ".txt")
+CONSOLE_SEGMENT_RE = re.compile(
+    r"^(?P<instance>.+)-(?P<date>\d{8})-(?P<time>\d{6})\.[^.]+(\.gz)?$"
+)
+
+# Archive extension and compress program for tar --use-compress-program
+COMPRESSORS = {
+    "zstd": (".tar.zst", ["zstd"]),
+    "pigz": (".tar.gz", ["pigz"]),
+    "gzip": (".tar.gz", ["gzip"]),
+}
+
+
+def path_size(path):
+    """Total size in bytes of a file, or of all files below a directory"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+
+    return total
+
+
+def run_command(cmd, timeout=None, input=None):
+    """Run a command, returning rc, stdout and stderr
+
+    A command that times out returns rc 124, like timeout(1).
+    """
+    try:
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, timeout=timeout, input=input
+        )
+
+        return {
+            "rc": result.returncode,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "cmd": " ".join(cmd),
+        }
+    except subprocess.TimeoutExpired:
+        return {
+            "rc": 124,
+            "stdout": "",
+            "stderr": "Command timed out after {}s".format(timeout),
+            "cmd": " ".join(cmd),
+        }
+    except Exception as e:
+        return {"rc": 1, "stdout": "", "stderr": str(e), "cmd": " ".join(cmd)}
+
+
+def _tail(path, lines=LOG_TAIL_LINES):
+    """Last lines of a text file"""
+    try:
+        with open(path, errors="replace") as f:
+            return _tail_file(f, lines)
+    except OSError:
+        return ""
+
+
+def _tail_file(f, lines=LOG_TAIL_LINES):
+    """Last lines of an open text file"""
+    f.seek(0)
+    return "".join(deque(f, maxlen=lines))
+
+
+def run_streaming(
+    cmd, log_path, timeout=None, watch_dir=None, interval=PROGRESS_INTERVAL
+):
+    """Run a command, streaming its output to a log file
+
+    stdout and stderr go to log_path as the command runs. Every interval
+    seconds a progress sample with the bytes and files in watch_dir is
+    appended to log_path.progress as a JSON line. A command running
+    longer than timeout is killed along with its children, and returns
+    rc 124 like timeout(1). Whatever it wrote is kept.
+
+    :param cmd: command as a list
+    :param log_path: file to stream stdout and stderr to
+    :param timeout: timeout in seconds, None for no timeout
+    :param watch_dir: directory to report progress for
+    :param interval: seconds between progress samples
+    :return: dict with rc, stdout (tail of the log), stderr, cmd,
+             log_path and the last progress sample
+    """
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    progress_path = log_path + ".progress"
+    progress = dict(elapsed=0, bytes=0, files=0)
+    start = time.monotonic()
+
+    with open(log_path, "ab") as log, open(progress_path, "a") as progress_file:
+        try:
+            proc = subprocess.Popen(
+                cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+            )
+        except Exception as e:
+            return {
+                "rc": 1,
+                "stdout": "",
+                "stderr": str(e),
+                "cmd": " ".join(cmd),
+                "log_path": log_path,
+                "progress": progress,
+            }
+
+        rc = None
+        while rc is None:
+            try:
+                rc = proc.wait(timeout=interval)
+            except subprocess.TimeoutExpired:
+                pass
+
+            elapsed = time.monotonic() - start
+            progress = dict(elapsed=round(elapsed, 1), bytes=0, files=0)
+            if watch_dir and os.path.isdir(watch_dir):
+                progress["bytes"] = path_size(watch_dir)
+                progress["files"] = sum(len(x[2]) for x in os.walk(watch_dir))
+            progress_file.write(json.dumps(progress) + "\n")
+            progress_file.flush()
+
+            if rc is None and timeout and elapsed > timeout:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                proc.wait()
+                rc = 124
+
+    tail = _tail(log_path)
+    return {
+        "rc": rc,
+        "stdout": tail,
+        "stderr": (
+            "Command timed out after {}s".format(timeout)
+            if rc == 124
+            else tail if rc != 0 else ""
+        ),
+        "cmd": " ".join(cmd),
+        "log_path": log_path,
+        "progress": progress,
+    }
+
+
+def _split_namespaces(namespaces):
+    """Split a comma separated list of namespaces"""
+    return [x.strip() for x in (namespaces or "").split(",") if x.strip()]
+
+
+def must_gather_cmd(params):
+    """Build the must-gather command
+
+    With parallel_namespaces the additional namespaces are gathered by
+    separate targeted gathers, see must_gather_jobs.
+
+    :param params: dict with the hotlogs_must_gather module options
+    :return: command as a list
+    """
+    additional_namespaces = params["additional_namespaces"]
+    if params.get("parallel_namespaces"):
+        additional_namespaces = ""
+
+    cmd = [
+        "oc",
+        "adm",
+        "must-gather",
+        "--image-stream={}".format(params["image_stream"]),
+        "--image={}".format(params["image"]),
+        "--dest-dir={}".format(params["dest_dir"]),
+        "--timeout={}".format(params["timeout"]),
+        "--host-network={}".format(str(params["host_network"]).lower()),
+        "--",
+    ]
+
+    # Add environment variables
+    cmd.append("ADDITIONAL_NAMESPACES={}".format(additional_namespaces))
+    if params["openstack_databases"]:
+        cmd.append("OPENSTACK_DATABASES={}".format(params["openstack_databases"]))
+    cmd.append("SOS_EDPM={}".format(params["sos_edpm"]))
+    cmd.append("SOS_DECOMPRESS={}".format(params["sos_decompress"]))
+    cmd.append("gather")
+
+    return cmd
+
+
+def must_gather_jobs(params):
+    """List the gathers to run for a must-gather
+
+    The logs are written next to dest_dir, so they are neither counted in
+    the progress samples nor archived with the gathered output.
+
+    :param params: dict with the hotlogs_must_gather module options
+    :return: list of (name, command, log path, watch dir)
+    """
+    dest_dir = params["dest_dir"].rstrip("/")
+    jobs = [("must-gather", must_gather_cmd(params), dest_dir + ".log", dest_dir)]
+
+    if params.get("parallel_namespaces"):
+        for namespace in _split_namespaces(params["additional_namespaces"]):
+            ns_dir = os.path.join(dest_dir, "namespaces", namespace)
+            jobs.append(
+                (
+                    "inspect-" + namespace,
+                    [
+                        "oc",
+                        "adm",
+                        "inspect",
+                        "namespace/{}".format(namespace),
+                        "--dest-dir={}".format(ns_dir),
+                    ],
+                    "{}-inspect-{}.log".format(dest_dir, namespace),
+                    ns_dir,
+                )
+            )
+
+    return jobs
+
+
+def run_must_gather(params, timeout=MUST_GATHER_TIMEOUT):
+    """Run must-gather, streaming output to log files next to dest_dir
+
+    The main gather and, with parallel_namespaces, one targeted gather
+    per additional namespace run concurrently. On failure or timeout the
+    partial output is left in dest_dir.
+
+    :param params: dict with the hotlogs_must_gather module options
+    :param timeout: timeout in seconds
+    :return: dict with rc, stdout, stderr, cmd, log_path, progress,
+             partial and per gather results in gathers
+    """
+    os.makedirs(params["dest_dir"], exist_ok=True)
+    interval = params.get("progress_interval") or PROGRESS_INTERVAL
+    jobs = must_gather_jobs(params)
+
+    results = dict()
+    with futures.ThreadPoolExecutor(max_workers=len(jobs)) as p:
+        submitted = {
+            p.submit(run_streaming, cmd, log_path, timeout, watch_dir, interval): name
+            for name, cmd, log_path, watch_dir in jobs
+        }
+        for job in futures.as_completed(submitted):
+            results[submitted[job]] = job.result()
+
+    result = dict(results["must-gather"])
+    if result["rc"] == 124:
+        result["stderr"] = "Must-gather command timed out"
+
+    failed = [x for x in results.values() if x["rc"] != 0]
+    if failed and result["rc"] == 0:
+        result["rc"] = failed[0]["rc"]
+        result["stderr"] = "Targeted gather failed: {}".format(failed[0]["stderr"])
+
+    result["partial"] = result["rc"] != 0
+    result["gathers"] = [
+        dict(
+            name=name,
+            rc=results[name]["rc"],
+            log_path=results[name]["log_path"],
+            progress=results[name]["progress"],
+        )
+        for name, _, _, _ in jobs
+    ]
+
+    return result
+
+
+def _compressor(compression):
+    """Pick the compressor to use for a compression mode
+
+    zstd falls back to pigz, and pigz falls back to gzip, when the
+    compressor is not installed.
+
+    :param compression: one of gzip, pigz or zstd
+    :return: name of the compressor, a key in COMPRESSORS
+    """
+    if compression == "gzip":
+        return "gzip"
+
+    candidates = ["pigz", "gzip"]
+    if compression == "zstd":
+        candidates.insert(0, "zstd")
+
+    for candidate in candidates:
+        if shutil.which(candidate):
+            return candidate
+
+    return "gzip"
+
+
+def compress_output(
+    must_gather_dir, timeout=COMPRESS_TIMEOUT, compression="gzip", level=0, threads=0
+):
+    """Compress the must-gather output
+
+    The directory is streamed through tar into the compressor, zstd and
+    pigz compress using multiple threads.
+
+    :param must_gather_dir: directory to compress
+    :param timeout: timeout in seconds
+    :param compression: one of gzip, pigz or zstd
+    :param level: compression level, 0 for the compressor default
+    :param threads: compression threads for zstd and pigz, 0 for all cores
+    :return: dict with rc, stdout, stderr, archive_path and compression stats
+    """
+    base_dir = os.path.dirname(must_gather_dir)
+    dir_name = os.path.basename(must_gather_dir)
+
+    compressor = _compressor(compression)
+    extension, program = COMPRESSORS[compressor]
+    archive_path = "{}{}".format(must_gather_dir, extension)
+
+    program = list(program)
+    if compressor == "zstd":
+        program.append("-T{}".format(threads))
+    elif compressor == "pigz" and threads:
+        program.append("-p{}".format(threads))
+    if level:
+        program.append("-{}".format(level))
+
+    cmd = [
+        "tar",
+        "--use-compress-program={}".format(" ".join(program)),
+        "-cf",
+        archive_path,
+        "--ignore-failed-read",
+        "-C",
+        base_dir,
+        dir_name,
+    ]
+
+    start = time.monotonic()
+    result = run_command(cmd, timeout=timeout)
+    duration = time.monotonic() - start
+    result["archive_path"] = archive_path if result["rc"] == 0 else None
+
+    source_bytes = path_size(must_gather_dir)
+    archive_bytes = path_size(archive_path) if result["archive_path"] else 0
+    result["compression"] = {
+        "method": compressor,
+        "level": level or None,
+        "duration": round(duration, 1),
+        "source_bytes": source_bytes,
+        "archive_bytes": archive_bytes,
+        "ratio": round(source_bytes / archive_bytes, 2) if archive_bytes else None,
+    }
+
+    return result
+
+
+def collect_must_gather(collector, dest_dir, timeout):
+    """Run must-gather and compress the output, partial or not, into dest_dir
+
+    The collector timeout applies to the gather, compression has its own
+    timeout.
+    """
+    params = dict(MUST_GATHER_DEFAULTS)
+    params.update(collector.get("params") or {})
+    params["dest_dir"] = os.path.join(dest_dir, "must-gather")
+    os.makedirs(params["dest_dir"], exist_ok=True)
+
+    result = run_must_gather(params, timeout=timeout)
+    result["path"] = params["dest_dir"]
+    if not path_size(params["dest_dir"]):
+        return result
+
+    # Compress partial output too, it is what is needed when a gather hangs
+    compress_result = compress_output(
+        params["dest_dir"],
+        timeout=params["compress_timeout"],
+        compression=params["compression"],
+        level=params["compression_level"],
+        threads=params["compression_threads"],
+    )
+    result["compression"] = compress_result["compression"]
+    if compress_result["archive_path"]:
+        result["path"] = compress_result["archive_path"]
+    if result["rc"] == 0 and compress_result["rc"] != 0:
+        result["rc"] = compress_result["rc"]
+        result["stderr"] = compress_result["stderr"]
+
+    return result
+
+
+def _tempest_helper_pod(namespace, name, pvcs):
+    """Manifest of a helper pod mounting the tempest PVCs"""
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": name, "namespace": namespace},
+        "spec": {
+            "securityContext": {
+                "runAsNonRoot": True,
+                "runAsUser": 1000,
+                "seccompProfile": {"type": "RuntimeDefault"},
+            },
+            "containers": [
+                {
+                    "name": "log-collector",
+                    "image": TEMPEST_HELPER_IMAGE,
+                    "command": ["sleep", "infinity"],
+                    "securityContext": {
+                        "allowPrivilegeEscalation": False,
+                        "capabilities": {"drop": ["ALL"]},
+                        "runAsNonRoot": True,
+                        "runAsUser": 1000,
+                    },
+                    "volumeMounts": [
+                        {
+                            "name": "vol-{}".format(i),
+                            "mountPath": "/mnt/logs-{}".format(i),
+                        }
+                        for i in range(len(pvcs))
+                    ],
+                }
+            ],
+            "volumes": [
+                {
+                    "name": "vol-{}".format(i),
+                    "persistentVolumeClaim": {"claimName": pvc},
+                }
+                for i, pvc in enumerate(pvcs)
+            ],
+            "restartPolicy": "Never",
+        },
+    }
+
+
+def _kill_all(procs):
+    """Kill processes that are still running"""
+    for proc in procs:
+        if proc.poll() is None:
+            proc.kill()
+
+
+def _stream_pvc(namespace, pod, index, dest, patterns, timeout):
+    """Stream the matching files of a mounted PVC into dest
+
+    The files are tarred and gzipped in the helper pod and extracted
+    locally as they arrive, workflow directories are prefixed with the
+    zero-padded PVC index, files at the top of the PVC are not. Patterns
+    with a / match the path of the files, the others their name.
+    """
+    os.makedirs(dest, exist_ok=True)
+    match = " -o ".join(
+        "{} '{}'".format("-path" if "/" in x else "-name", x) for x in patterns
+    )
+    remote = (
+        "cd /mnt/logs-{index} && "
+        "files=$(find . -type f \\( {match} \\) | sed 's,^\\./,,') && "
+        '{{ [ -z "$files" ] || echo "$files" | tar -czf - -T -; }}'.format(
+            index=index, match=match
+        )
+    )
+    oc_cmd = ["oc", "exec", "-n", namespace, pod, "--", "sh", "-c", remote]
+    tar_cmd = [
+        "tar",
+        "-xzf",
+        "-",
+        "-C",
+        dest,
+        "--transform",
+        r"s,^\([^/]*\)/,{:02d}-\1/,".format(index),
+    ]
+
+    # stderr goes to a file, a full stderr pipe would block the commands
+    with tempfile.TemporaryFile("w+", errors="replace") as stderr:
+        oc = subprocess.Popen(oc_cmd, stdout=subprocess.PIPE, stderr=stderr)
+        procs = [oc]
+        timer = threading.Timer(timeout, _kill_all, [procs]) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            # An empty stream means no matching files, tar would fail on it
+            data = oc.stdout.read(STREAM_CHUNK_SIZE)
+            if data:
+                tar = subprocess.Popen(
+                    tar_cmd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr,
+                )
+                procs.append(tar)
+                try:
+                    while data:
+                        tar.stdin.write(data)
+                        data = oc.stdout.read(STREAM_CHUNK_SIZE)
+                except BrokenPipeError:
+                    pass
+                tar.stdin.close()
+                tar.wait()
+            oc.stdout.close()
+            oc.wait()
+        finally:
+            if timer:
+                timer.cancel()
+
+        if any(x.returncode == -signal.SIGKILL for x in procs):
+            return 124, "Streaming PVC {} timed out".format(index)
+
+        if oc.returncode != 0:
+            return oc.returncode, _tail_file(stderr)
+
+        if len(procs) > 1:
+            return tar.returncode, _tail_file(stderr)
+
+    return 0, ""
+
+
+def collect_tempest_namespace(namespace, dest, patterns, timeout):
+    """Collect tempest logs from the test-operator PVCs of a namespace
+
+    All PVCs are mounted in one helper pod and streamed concurrently.
+
+    :return: dict with rc, stdout and stderr
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def _remaining():
+        return max(deadline - time.monotonic(), 1) if deadline else None
+
+    result = run_command(
+        [
+            "oc",
+            "get",
+            "pvc",
+            "-n",
+            namespace,
+            "-l",
+            "service=tempest",
+            "-o",
+            "jsonpath={.items[*].metadata.name}",
+        ],
+        timeout=_remaining(),
+    )
+    if result["rc"] != 0:
+        return result
+
+    pvcs = result["stdout"].split()
+    if not pvcs:
+        result["stdout"] = "No tempest PVCs found in namespace {}\n".format(namespace)
+        return result
+
+    pod = "tempest-logs-collector-{}".format(os.getpid())
+    result = run_command(
+        ["oc", "apply", "-f", "-"],
+        timeout=_remaining(),
+        input=json.dumps(_tempest_helper_pod(namespace, pod, pvcs)),
+    )
+    if result["rc"] != 0:
+        return result
+
+    try:
+        result = run_command(
+            [
+                "oc",
+                "wait",
+                "-n",
+                namespace,
+                "pod/{}".format(pod),
+                "--for=condition=Ready",
+                "--timeout=120s",
+            ],
+            timeout=_remaining(),
+        )
+        if result["rc"] != 0:
+            return result
+
+        with futures.ThreadPoolExecutor(max_workers=len(pvcs)) as p:
+            jobs = {
+                p.submit(
+                    _stream_pvc, namespace, pod, index, dest, patterns, _remaining()
+                ): pvc
+                for index, pvc in enumerate(pvcs)
+            }
+            for job in futures.as_completed(jobs):
+                rc, err = job.result()
+                if rc == 0:
+                    result["stdout"] += "Collected logs from PVC {}\n".format(jobs[job])
+                else:
+                    result["rc"] = rc
+                    result[
+                        "stderr"
+                    ] += "Failed to collect logs from PVC {}: {}\n".format(
+                        jobs[job], err
+                    )
+    finally:
+        run_command(
+            [
+                "oc",
+                "delete",
+                "pod",
+                "-n",
+                namespace,
+                pod,
+                "--ignore-not-found=true",
+                "--wait=false",
+            ],
+            timeout=60,
+        )
+
+    return result
+
+
+def collect_tempest(collector, dest_dir, timeout):
+    """Collect tempest logs from test-operator PVCs of all namespaces
+
+    Namespaces are collected concurrently. With a single namespace the logs
+    go to dest_dir/logs/tempest, with several namespaces each namespace gets
+    its own directory below it.
+    """
+    tempest_dir = os.path.join(dest_dir, "logs", "tempest")
+    namespaces = collector["namespaces"]
+    patterns = collector.get("patterns") or TEMPEST_PATTERNS
+    result = {"rc": 0, "stdout": "", "stderr": "", "cmd": "", "path": tempest_dir}
+    if not namespaces:
+        return result
+
+    with futures.ThreadPoolExecutor(max_workers=len(namespaces)) as p:
+        jobs = {
+            p.submit(
+                collect_tempest_namespace,
+                namespace,
+                (
+                    os.path.join(tempest_dir, namespace)
+                    if len(namespaces) > 1
+                    else tempest_dir
+                ),
+                patterns,
+                timeout,
+            ): namespace
+            for namespace in namespaces
+        }
+        for job in futures.as_completed(jobs):
+            ns_result = job.result()
+            result["stdout"] += ns_result["stdout"]
+            result["stderr"] += ns_result["stderr"]
+            if ns_result["rc"] != 0:
+                result["rc"] = ns_result["rc"]
+
+    return result
+
+
+def console_segment(name):
+    """Instance and start time of a console recording segment
+
+    Recorder segments are named <instance>-<YYYYmmdd>-<HHMMSS>.<ext>, other
+    files are indexed by their name without extension and no start time.
+
+    :param name: file name of the segment
+    :return: tuple (instance, start), start is an ISO 8601 string or None
+    """
+    match = CONSOLE_SEGMENT_RE.match(name)
+    if not match:
+        return os.path.splitext(name)[0], None
+
+    start = time.strftime(
+        "%Y-%m-%dT%H:%M:%SZ",
+        time.strptime(match.group("date") + match.group("time"), "%Y%m%d%H%M%S"),
+    )
+    return match.group("instance"), start
+
+
+def _load_console_index(path):
+    """Load the console recordings index, empty if missing or invalid"""
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {"segments": {}}
+
+    index.setdefault("segments", {})
+    return index
+
+
+def _save_console_index(path, index):
+    """Write the console recordings index atomically"""
+    instances = {}
+    for rel, entry in index["segments"].items():
+        instance = instances.setdefault(
+            entry["instance"], {"segments": [], "start": None, "end": None}
+        )
+        instance["segments"].append(entry["dest"])
+        if entry["start"] and (
+            instance["start"] is None or entry["start"] < instance["start"]
+        ):
+            instance["start"] = entry["start"]
+        if instance["end"] is None or entry["end"] > instance["end"]:
+            instance["end"] = entry["end"]
+    for instance in instances.values():
+        instance["segments"].sort()
+    index["instances"] = instances
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _copy_segment(src, dest, offset, compress, deadline):
+    """Copy a segment from offset in chunks, appending to dest
+
+    Compressed segments get a new gzip member per transfer, concatenated
+    gzip members decompress as a single stream.
+
+    :return: tuple (bytes read from src, complete)
+    """
+    copied = 0
+    mode = "ab" if offset else "wb"
+    with open(src, "rb") as fin:
+        fin.seek(offset)
+        if compress:
+            fout = gzip.open(dest, mode)
+        else:
+            fout = open(dest, mode)
+        with fout:
+            while True:
+                if deadline and time.monotonic() > deadline:
+                    return copied, False
+                data = fin.read(CONSOLE_CHUNK_SIZE)
+                if not data:
+                    break
+                fout.write(data)
+                copied += len(data)
+
+    return copied, True
+
+
+def collect_console_recordings(collector, dest_dir, timeout):
+    """Incrementally collect nova console recordings from the NFS export
+
+    Segments are indexed by instance and time range in index.json. Only
+    new segments, and the new tail of segments still being written, are
+    transferred. Text console logs are gzip compressed on the fly unless
+    C(compress_text) is false. A collection cut short by the timeout keeps
+    what was copied and resumes from there on the next run.
+    """
+    dest = os.path.join(dest_dir, "nova-console-recordings")
+    os.makedirs(dest, exist_ok=True)
+    src_dir = collector["src"].rstrip("/")
+    compress_text = collector.get("compress_text", True)
+    deadline = time.monotonic() + timeout if timeout else None
+
+    result = {"rc": 0, "stdout": "", "stderr": "", "cmd": "", "path": dest}
+    if not os.path.isdir(src_dir):
+        result["rc"] = 1
+        result["stderr"] = "Console recordings directory {} not found".format(src_dir)
+        return result
+
+    index_path = os.path.join(dest, CONSOLE_INDEX)
+    index = _load_console_index(index_path)
+    segments = index["segments"]
+    stats = {"new": 0, "appended": 0, "unchanged": 0, "bytes": 0}
+
+    try:
+        for root, _, files in os.walk(src_dir):
+            for name in sorted(files):
+                src = os.path.join(root, name)
+                rel = os.path.relpath(src, src_dir)
+                try:
+                    st = os.stat(src)
+                except OSError:
+                    continue
+
+                entry = segments.get(rel)
+                if entry and entry["size"] == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+
+                compress = compress_text and name.endswith(CONSOLE_TEXT_SUFFIXES)
+                dest_rel = rel + ".gz" if compress else rel
+                dest_path = os.path.join(dest, dest_rel)
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+                # Segments that shrank or changed format are copied again
+                offset = 0
+                if (
+                    entry
+                    and entry["size"] < st.st_size
+                    and entry["dest"] == dest_rel
+                    and os.path.exists(dest_path)
+                ):
+                    offset = entry["size"]
+
+                copied, complete = _copy_segment(
+                    src, dest_path, offset, compress, deadline
+                )
+                instance, start = console_segment(name)
+                segments[rel] = {
+                    "instance": instance,
+                    "start": start,
+                    "end": time.strftime(
+                        "%Y-%m-%dT%H:%M:%SZ", time.gmtime(st.st_mtime)
+                    ),
+                    "size": offset + copied,
+                    "dest": dest_rel,
+                }
+                stats["bytes"] += copied
+                stats["appended" if offset else "new"] += 1
+                if not complete:
+                    result["rc"] = 124
+                    result["stderr"] = (
+                        "Timed out, collection resumes from {} on the next "
+                        "run".format(rel)
+                    )
+                    return result
+    finally:
+        _save_console_index(index_path, index)
+        result["stdout"] = (
+            "{new} new, {appended} appended and {unchanged} unchanged "
+            "segments, {bytes} bytes transferred".format(**stats)
+        )
+        result["segments"] = stats
+
+    return result
+
+
+def collect_command(collector, dest_dir, timeout):
+    """Run an arbitrary collector command"""
+    result = run_command(collector["cmd"], timeout=timeout)
+    result["path"] = os.path.join(dest_dir, collector.get("dest", ""))
+
+    return result
+
+
+COLLECTORS = {
+    "must_gather": collect_must_gather,
+    "tempest": collect_tempest,
+    "console_recordings": collect_console_recordings,
+    "command": collect_command,
+}
+
+COLLECTOR_REQUIRED_KEYS = {
+    "must_gather": set(),
+    "tempest": {"namespaces"},
+    "console_recordings": {"src"},
+    "command": {"cmd"},
+}
+
+
+def validate_collector(collector):
+    """Validate a collector definition
+
+    :param collector: dict with at least name and type
+    :raises: ValueError - if the collector is invalid
+    """
+    if not isinstance(collector, dict):
+        raise ValueError("Collector must be a dict, got: {}".format(collector))
+
+    for key in ("name", "type"):
+        if key not in collector:
+            raise ValueError("Collector is missing required key {}".format(key))
+
+    if collector["type"] not in COLLECTORS:
+        raise ValueError(
+            "Collector {} has invalid type {}, must be one of: {}".format(
+                collector["name"], collector["type"], ", ".join(sorted(COLLECTORS))
+            )
+        )
+
+    missing = COLLECTOR_REQUIRED_KEYS[collector["type"]] - collector.keys()
+    if missing:
+        raise ValueError(
+            "Collector {} is missing required keys {}".format(
+                collector["name"], ", ".join(sorted(missing))
+            )
+        )
+
+
+def _run_collector(collector, dest_dir, default_timeout):
+    """Run a single collector, measuring duration and collected bytes"""
+    timeout = collector.get("timeout") or default_timeout
+    start = time.monotonic()
+    try:
+        result = COLLECTORS[collector["type"]](collector, dest_dir, timeout)
+    except Exception as e:
+        result = {"rc": 1, "stdout": "", "stderr": str(e), "cmd": ""}
+
+    result["name"] = collector["name"]
+    result["type"] = collector["type"]
+    result["duration"] = round(time.monotonic() - start, 1)
+    result["timed_out"] = result["rc"] == 124
+    # Optional collectors report their rc, but never fail
+    result["failed"] = result["rc"] != 0 and not collector.get("optional", False)
+    path = result.get("path")
+    result["bytes"] = path_size(path) if path and os.path.exists(path) else 0
+
+    return result
+
+
+def run_collectors(collectors, dest_dir, max_workers=4, default_timeout=900):
+    """Run collectors concurrently
+
+    Collectors write directly to their place in dest_dir. A failing
+    collector does not stop the others.
+
+    :param collectors: list of collector definitions
+    :param dest_dir: directory to collect into
+    :param max_workers: maximum number of collectors running at once
+    :param default_timeout: timeout in seconds for collectors without one
+    :return: list of collector results, in the order the collectors finished
+    """
+    results = list()
+    if not collectors:
+        return results
+
+    with futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as p:
+        jobs = [
+            p.submit(_run_collector, collector, dest_dir, default_timeout)
+            for collector in collectors
+        ]
+        for job in futures.as_completed(jobs):
+            results.append(job.result())
+
+    return results
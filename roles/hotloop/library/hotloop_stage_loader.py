@@ -95,6 +95,7 @@ ALLOWED_STAGE_KEYS = {
     "name",
     "command",
     "documentation",
+    "git_commit",
     "j2_manifest",
     "kustomize",
     "manifest",
@@ -115,6 +116,14 @@ ALLOWED_KUSTOMIZE_KEYS = {
     "remote_src",
 }
 
+ALLOWED_GIT_COMMIT_KEYS = {
+    "path",
+    "files",
+    "message",
+    "branch",
+    "prune",
+}
+
 FALSE_STRINGS = {"false", "False", "FALSE"}
 
 
@@ -328,6 +337,49 @@ def _validate_sync_files(sync_files_config):
         )
 
 
+def _validate_git_commit(git_commit_config):
+    """Validates the 'git_commit' parameter.
+
+    This function checks if the 'git_commit' parameter is a dict with
+    the required fields and a list of files with src and dest.
+
+    :param git_commit_config: The 'git_commit' parameter to validate.
+    """
+    if not isinstance(git_commit_config, dict):
+        raise TypeError(
+            "'git_commit' must be a dict, got {git_commit_type}".format(
+                git_commit_type=type(git_commit_config)
+            )
+        )
+
+    if git_commit_config.keys() - ALLOWED_GIT_COMMIT_KEYS:
+        raise ValueError(
+            "git_commit contains invalid keys: {invalid_keys}, "
+            "allowed keys are: {allowed_keys}".format(
+                invalid_keys=git_commit_config.keys() - ALLOWED_GIT_COMMIT_KEYS,
+                allowed_keys=ALLOWED_GIT_COMMIT_KEYS,
+            )
+        )
+
+    for key in ("path", "files", "message"):
+        if key not in git_commit_config:
+            raise ValueError("git_commit must have a '{key}' field".format(key=key))
+
+    if not isinstance(git_commit_config["files"], list):
+        raise TypeError(
+            "git_commit 'files' must be a list, got {files_type}".format(
+                files_type=type(git_commit_config["files"])
+            )
+        )
+
+    for item in git_commit_config["files"]:
+        if not isinstance(item, dict) or "src" not in item or "dest" not in item:
+            raise ValueError(
+                "git_commit 'files' items must be dicts with 'src' and 'dest', "
+                "got {item}".format(item=item)
+            )
+
+
 def _validate_stage(stage, nested=False):
     """Validate a stage
 
@@ -374,6 +426,9 @@ def _validate_stage(stage, nested=False):
     if "sync_files" in stage:
         _validate_sync_files(stage["sync_files"])
 
+    if "git_commit" in stage:
+        _validate_git_commit(stage["git_commit"])
+
     if "wait_pod_completion" in stage:
         _validate_wait_pod_completion(stage["wait_pod_completion"])
 
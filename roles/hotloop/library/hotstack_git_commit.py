@@ -0,0 +1,372 @@
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import subprocess
+import tempfile
+
+from ansible.module_utils.basic import AnsibleModule
+
+ANSIBLE_METADATA = {
+    "metadata_version": "1.1",
+    "status": ["preview"],
+    "supported_by": "community",
+}
+
+DOCUMENTATION = r"""
+---
+module: hotstack_git_commit
+
+short_description: Commit a tree of files to a git repository in one commit
+
+version_added: "2.8"
+
+description:
+    - Stage files and directories into a git repository and write a single
+      commit with git plumbing (hash-object, update-index, write-tree,
+      commit-tree) using a temporary index.
+    - Only the paths changed by the commit are updated in the working tree
+      and index of the repository.
+    - The post-commit hook runs once per commit, so a batch of manifests
+      triggers a single ArgoCD refresh.
+    - No commit is made when the tree is unchanged.
+
+options:
+  path:
+    description:
+      - Path to the git repository, C(~) is expanded
+    type: str
+    required: true
+  files:
+    description:
+      - Files and directories to commit. Each item is a dict with C(src), a
+        file or directory on the host, C(~) is expanded and relative paths
+        are relative to the module working directory, and C(dest), the path
+        in the repository.
+    type: list
+    elements: dict
+    required: true
+  message:
+    description:
+      - Commit message
+    type: str
+    required: true
+  branch:
+    description:
+      - Branch to commit to
+    type: str
+    default: main
+  prune:
+    description:
+      - Remove files below the C(dest) of directory items that are not in
+        C(src)
+    type: bool
+    default: false
+  run_hooks:
+    description:
+      - Run the post-commit hook of the repository after the commit
+    type: bool
+    default: true
+
+author:
+    - Harald Jensås <hjensas@redhat.com>
+"""
+
+EXAMPLES = r"""
+- name: Commit the OpenStack operators manifests
+  hotstack_git_commit:
+    path: /home/zuul/git/openstack-deployment
+    files:
+      - src: /home/zuul/gitops-manifests/operators
+        dest: manifests/operators
+    message: Add OpenStack operators
+    prune: true
+"""
+
+RETURN = r"""
+changed:
+  description: Whether a commit was made
+  type: bool
+  returned: always
+commit:
+  description: Commit the branch points to after the module ran
+  type: str
+  returned: always
+added:
+  description: Paths added by the commit
+  type: list
+  elements: str
+  returned: always
+modified:
+  description: Paths modified by the commit
+  type: list
+  elements: str
+  returned: always
+deleted:
+  description: Paths deleted by the commit
+  type: list
+  elements: str
+  returned: always
+message:
+  description: Status message
+  type: str
+  returned: always
+"""
+
+EMPTY_SHA = "0" * 40
+
+
+class GitError(Exception):
+    pass
+
+
+def git(path, args, env=None, input=None):
+    """Run a git command, returning stdout
+
+    :param path: Path to the git repository
+    :param args: List of git command arguments
+    :param env: Extra environment variables
+    :param input: Data passed on stdin
+    :returns: stdout of the command
+    :raises: GitError if the command fails
+    """
+    cmd_env = dict(os.environ)
+    cmd_env.update(env or {})
+    result = subprocess.run(
+        ["git"] + args,
+        cwd=path,
+        env=cmd_env,
+        input=input,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {result.stderr.strip()}")
+
+    return result.stdout
+
+
+def collect_files(files):
+    """Map repository paths to source files.
+
+    :param files: List of dicts with src and dest
+    :returns: Tuple of (dict repository path -> source path, list of
+        directory dest paths)
+    """
+    sources = dict()
+    dirs = list()
+    for item in files:
+        src = os.path.abspath(os.path.expanduser(item["src"]))
+        dest = item["dest"].strip("/")
+        if os.path.isfile(src):
+            sources[dest] = src
+            continue
+
+        if not os.path.isdir(src):
+            raise GitError(f"Source {src} does not exist")
+
+        dirs.append(dest)
+        for root, _, names in os.walk(src):
+            for name in names:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, src)
+                sources["/".join(filter(None, [dest] + rel.split(os.sep)))] = full
+
+    return sources, dirs
+
+
+def build_tree(path, head, sources, dirs, prune, index_file):
+    """Write a tree from HEAD with the source files staged.
+
+    :param path: Path to the git repository
+    :param head: Commit to start from, None for an empty tree
+    :param sources: Dict of repository path -> source file
+    :param dirs: Directory dest paths, pruned if prune is set
+    :param prune: Remove files below dirs not in sources
+    :param index_file: Temporary index file
+    :returns: Tree id
+    """
+    env = {"GIT_INDEX_FILE": index_file}
+    if head:
+        git(path, ["read-tree", head], env=env)
+    else:
+        git(path, ["read-tree", "--empty"], env=env)
+
+    repo_paths = sorted(sources)
+    # A single hash-object process writes all blobs
+    shas = git(
+        path,
+        ["hash-object", "-w", "--no-filters", "--stdin-paths"],
+        input="".join(sources[x] + "\n" for x in repo_paths),
+    ).split()
+
+    lines = list()
+    for repo_path, sha in zip(repo_paths, shas):
+        mode = "100755" if os.access(sources[repo_path], os.X_OK) else "100644"
+        lines.append(f"{mode} {sha}\t{repo_path}")
+
+    if prune and dirs:
+        existing = git(path, ["ls-files", "-z", "--"] + dirs, env=env).split("\0")
+        for repo_path in filter(None, existing):
+            if repo_path not in sources:
+                lines.append(f"0 {EMPTY_SHA}\t{repo_path}")
+
+    if lines:
+        git(
+            path,
+            ["update-index", "--index-info"],
+            env=env,
+            input="\n".join(lines) + "\n",
+        )
+
+    return git(path, ["write-tree"], env=env).strip()
+
+
+def empty_tree(path):
+    """Id of the empty tree"""
+    return git(path, ["hash-object", "-t", "tree", "/dev/null"]).strip()
+
+
+def changed_paths(path, old, new):
+    """Paths added, modified and deleted between two commits"""
+    changes = dict(added=list(), modified=list(), deleted=list())
+    if old is None:
+        args = ["ls-tree", "-r", "--name-only", new]
+        changes["added"] = git(path, args).splitlines()
+        return changes
+
+    status = {"A": "added", "M": "modified", "D": "deleted", "T": "modified"}
+    for line in git(path, ["diff-tree", "-r", "--name-status", old, new]).splitlines():
+        code, _, repo_path = line.partition("\t")
+        changes[status.get(code[0], "modified")].append(repo_path)
+
+    return changes
+
+
+def commit(path, files, message, branch, prune):
+    """Commit files to a branch in a single commit.
+
+    :param path: Path to the git repository
+    :param files: List of dicts with src and dest
+    :param message: Commit message
+    :param branch: Branch to commit to
+    :param prune: Remove files below directory dests not in src
+    :returns: Tuple of (old commit, new commit), new is None if unchanged
+    """
+    ref = f"refs/heads/{branch}"
+    try:
+        head = git(path, ["rev-parse", "--verify", "-q", ref]).strip()
+    except GitError:
+        head = None
+
+    sources, dirs = collect_files(files)
+    git_dir = git(path, ["rev-parse", "--absolute-git-dir"]).strip()
+    fd, index_file = tempfile.mkstemp(dir=git_dir, prefix="hotstack-index-")
+    os.close(fd)
+    os.unlink(index_file)
+    try:
+        tree = build_tree(path, head, sources, dirs, prune, index_file)
+    finally:
+        if os.path.exists(index_file):
+            os.unlink(index_file)
+
+    if head and tree == git(path, ["rev-parse", f"{head}^{{tree}}"]).strip():
+        return head, None
+
+    args = ["commit-tree", tree, "-m", message]
+    if head:
+        args += ["-p", head]
+    new = git(path, args).strip()
+
+    # Update the index and working tree of the checked out branch, only the
+    # paths changed by the commit are touched.
+    try:
+        checked_out = git(path, ["symbolic-ref", "-q", "HEAD"]).strip() == ref
+    except GitError:
+        checked_out = False
+    if checked_out:
+        git(path, ["read-tree", "-m", "-u", head or empty_tree(path), new])
+
+    try:
+        git(path, ["update-ref", "-m", message, ref, new, head or EMPTY_SHA])
+    except GitError:
+        if checked_out:
+            git(path, ["read-tree", "-m", "-u", new, head or empty_tree(path)])
+        raise
+
+    return head, new
+
+
+def run_post_commit_hook(path):
+    """Run the post-commit hook of the repository, if any"""
+    hooks_path = git(path, ["rev-parse", "--git-path", "hooks"]).strip()
+    hook = os.path.join(path, hooks_path, "post-commit")
+    if os.access(hook, os.X_OK):
+        subprocess.run([hook], cwd=path, capture_output=True)
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            path=dict(type="str", required=True),
+            files=dict(type="list", elements="dict", required=True),
+            message=dict(type="str", required=True),
+            branch=dict(type="str", default="main"),
+            prune=dict(type="bool", default=False),
+            run_hooks=dict(type="bool", default=True),
+        ),
+    )
+
+    path = os.path.expanduser(module.params["path"])
+    for item in module.params["files"]:
+        if "src" not in item or "dest" not in item:
+            module.fail_json(msg=f"files items must have src and dest: {item}")
+
+    try:
+        old, new = commit(
+            path,
+            module.params["files"],
+            module.params["message"],
+            module.params["branch"],
+            module.params["prune"],
+        )
+        if new is None:
+            module.exit_json(
+                changed=False,
+                commit=old,
+                added=[],
+                modified=[],
+                deleted=[],
+                message="No changes to commit",
+            )
+
+        changes = changed_paths(path, old, new)
+        if module.params["run_hooks"]:
+            run_post_commit_hook(path)
+    except GitError as e:
+        module.fail_json(msg=str(e))
+
+    module.exit_json(
+        changed=True,
+        commit=new,
+        message="Committed {} added, {} modified and {} deleted files".format(
+            len(changes["added"]), len(changes["modified"]), len(changes["deleted"])
+        ),
+        **changes,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,24 @@ $OC get applications -n openshift-gitops -o json 2>/dev/null | \
   done
 """
 
+NOTIFY_HOOK_CONTENT = r"""#!/bin/bash
+# Notify the hotstack git server of the change. The server repacks the
+# repository and triggers one ArgoCD refresh per batch of changes.
+
+curl -fsS -m 5 -X POST "http://127.0.0.1:{port}/notify/{repo}" >/dev/null 2>&1 || true
+"""
+
+NOTIFY_HOOKS = ["post-commit", "post-receive"]
+
+# Keep packs bitmap-indexed for cheap clones, repacks are done by the
+# managed git server after each batch of commits.
+MANAGED_GIT_CONFIG = {
+    "repack.writeBitmaps": "true",
+    "pack.writeBitmapHashCache": "true",
+    "uploadpack.allowFilter": "true",
+    "gc.auto": "0",
+}
+
 
 DOCUMENTATION = r"""
 ---
@@ -62,6 +80,9 @@ description:
     - Initialize a git repository
     - Configure git user name and email
     - Start git-daemon to serve repositories
+    - In managed mode, install hooks notifying the hotstack git server instead
+      of refreshing ArgoCD on every commit, and configure bitmap-indexed packs.
+      The git server and git-daemon are run by systemd units of the role.
 
 options:
   path:
@@ -79,6 +100,20 @@ options:
       - Git user email for commits
     type: str
     default: "hotstack@openstack.lab"
+  mode:
+    description:
+      - C(daemon) starts a detached git-daemon and refreshes ArgoCD from a
+        post-commit hook.
+      - C(managed) installs hooks notifying the hotstack git server listening
+        on I(http_port), which repacks and refreshes ArgoCD debounced.
+    type: str
+    choices: [daemon, managed]
+    default: daemon
+  http_port:
+    description:
+      - Port of the hotstack git server, used by the managed mode hooks
+    type: int
+    default: 8080
 
 author:
     - Harald Jensås <hjensas@redhat.com>
@@ -90,6 +125,12 @@ EXAMPLES = r"""
     path: /home/zuul/git/openstack-deployment
     user_name: "Hotstack Automation"
     user_email: "hotstack@openstack.lab"
+
+- name: Initialize git repository for the managed git server
+  hotstack_git_server_init:
+    path: /home/zuul/git/openstack-deployment
+    mode: managed
+    http_port: 8080
 """
 
 RETURN = r"""
@@ -140,13 +181,64 @@ def create_post_commit_hook(module, git_dir):
         module.fail_json(msg=f"Failed to create post-commit hook: {str(e)}")
 
 
-def initialize_git_repo(module, path):
+def install_notify_hooks(module, git_dir, repo, port):
+    """Install hooks notifying the managed git server.
+
+    Replaces the ArgoCD refresh post-commit hook of daemon mode.
+
+    :param module: AnsibleModule instance
+    :param git_dir: Path to the .git directory
+    :param repo: Repository name, relative to the git server base path
+    :param port: Port of the git server
+    :returns: True if any hook was changed
+    :raises: Fails module if hook creation fails
+    """
+    content = NOTIFY_HOOK_CONTENT.format(port=port, repo=repo)
+    changed = False
+    for hook in NOTIFY_HOOKS:
+        hook_path = os.path.join(git_dir, "hooks", hook)
+        try:
+            if os.path.exists(hook_path):
+                with open(hook_path) as f:
+                    if f.read() == content:
+                        continue
+            with open(hook_path, "w") as f:
+                f.write(content)
+            os.chmod(hook_path, 0o755)
+            changed = True
+        except (IOError, OSError) as e:
+            module.fail_json(msg=f"Failed to create {hook} hook: {str(e)}")
+
+    return changed
+
+
+def configure_managed_repo(module, path):
+    """Configure bitmap-indexed packs and repack the repository.
+
+    :param module: AnsibleModule instance
+    :param path: Path to the git repository
+    :raises: Fails module if git config or repack fails
+    """
+    for key, value in MANAGED_GIT_CONFIG.items():
+        success, stdout, stderr = run_git_command(module, ["config", key, value], path)
+        if not success:
+            module.fail_json(msg=f"Failed to configure {key}: {stderr}")
+
+    success, stdout, stderr = run_git_command(
+        module, ["repack", "-a", "-d", "-q", "--write-bitmap-index"], path
+    )
+    if not success:
+        module.fail_json(msg=f"Failed to repack repository: {stderr}")
+
+
+def initialize_git_repo(module, path, mode):
     """Initialize git repository if it doesn't exist.
 
     Creates repository, adds post-commit hook, README.md, and makes initial commit.
 
     :param module: AnsibleModule instance
     :param path: Path to the git repository
+    :param mode: daemon or managed, managed mode hooks are installed separately
     :returns: Tuple of (changed, message)
     :raises: Fails module if git init fails
     """
@@ -164,6 +256,9 @@ def initialize_git_repo(module, path):
         if not success:
             module.fail_json(msg=f"Failed to initialize git repository: {stderr}")
 
+        if mode == "managed":
+            return True, "Initialized git repository"
+
         # Create post-commit hook for ArgoCD refresh
         create_post_commit_hook(module, git_dir)
 
@@ -269,12 +364,15 @@ def main():
             path=dict(type="str", required=True),
             user_name=dict(type="str", default="Hotstack Automation"),
             user_email=dict(type="str", default="hotstack@openstack.lab"),
+            mode=dict(type="str", choices=["daemon", "managed"], default="daemon"),
+            http_port=dict(type="int", default=8080),
         ),
     )
 
     path = module.params["path"]
     user_name = module.params["user_name"]
     user_email = module.params["user_email"]
+    mode = module.params["mode"]
 
     # Derive base_path from repository path (parent directory)
     base_path = os.path.dirname(path)
@@ -283,7 +381,7 @@ def main():
     messages = []
 
     # Initialize git repository
-    repo_changed, repo_msg = initialize_git_repo(module, path)
+    repo_changed, repo_msg = initialize_git_repo(module, path, mode)
     messages.append(repo_msg)
     if repo_changed:
         changed = True
@@ -297,6 +395,20 @@ def main():
         create_initial_commit(module, path)
         messages.append("Created initial commit")
 
+    if mode == "managed":
+        # The git server and git-daemon are run by systemd units
+        if install_notify_hooks(
+            module,
+            os.path.join(path, ".git"),
+            os.path.basename(path),
+            module.params["http_port"],
+        ):
+            changed = True
+            messages.append("Installed git server notify hooks")
+        configure_managed_repo(module, path)
+        messages.append("Configured bitmap-indexed packs")
+        module.exit_json(changed=changed, message="; ".join(messages))
+
     # Manage git-daemon
     daemon_changed, daemon_msg = manage_git_daemon(module, base_path)
     messages.append(daemon_msg)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# Copyright Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Multiplexed Nova serial console poller
+
+Polls the serial console output of all instances from a single process:
+- One OpenStack connection, sharing the auth token and HTTP connection pool
+- Console fetches of all instances run concurrently each poll round, bounded
+  by MAX_CONCURRENCY
+- Only the tail of the console is requested, sized by the new output of the
+  previous poll, new lines are found by diffing against the previously seen
+  tail
+
+New console lines are appended to <OUTPUT_DIR>/<instance name>.log, rotated
+and gzip compressed when they reach ROTATE_BYTES, or printed prefixed with
+the instance name when OUTPUT_DIR is not set. Per-instance request count,
+bytes and API latency are reported every STATS_INTERVAL seconds.
+
+Configuration is read from the environment:
+- OS_CLOUD: cloud name in clouds.yaml
+- INSTANCE_UUIDS: comma separated list of instance UUIDs
+- POLL_INTERVAL: seconds between poll rounds (default: 5)
+- OVERLAP_LINES: previously seen lines requested again for the diff
+  (default: 20)
+- MAX_CONCURRENCY: maximum concurrent console fetches (default: 10)
+- OUTPUT_DIR: directory for the console log files (default: unset)
+- ROTATE_BYTES: log file size to rotate at, 0 disables (default: 10485760)
+- STATS_INTERVAL: seconds between stats reports, 0 disables (default: 60)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent import futures
+
+import openstack
+from openstack import exceptions
+
+# Fewest new lines a poll requests beyond the overlap
+MIN_NEW_LINES = 10
+# Tails longer than this are fetched as the complete console
+MAX_TAIL_LINES = 100000
+# Bytes read from the end of an existing log file when resuming
+RESUME_READ_BYTES = 65536
+
+
+def find_new_lines(previous, current, complete):
+    """Find the lines of current that follow the previously seen tail
+
+    :param previous: previously seen tail of the console
+    :param current: tail of the console just fetched
+    :param complete: whether current is the complete console output
+    :return: list of new lines, or None if the tail did not reach back to
+        the previously seen lines and a longer tail is needed
+    """
+    if not previous:
+        return current
+
+    # Find the last position in current where the previous tail ends. The
+    # previous tail may be cut at the start of a complete console.
+    for end in range(len(current), 0, -1):
+        overlap = min(len(previous), end)
+        if overlap < len(previous) and not complete:
+            break
+        if current[end - overlap : end] == previous[-overlap:]:
+            return current[end:]
+
+    # No overlap with a complete console means the console was reset,
+    # e.g. the instance was rebuilt.
+    return current if complete else None
+
+
+def _read_tail(path, lines):
+    """Read the last lines of a file, used to resume after a restart"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(size - RESUME_READ_BYTES, 0))
+            data = f.read()
+    except OSError:
+        return [], 0
+
+    return data.decode(errors="replace").splitlines()[-lines:], size
+
+
+def _compress(path):
+    """Gzip a rotated console log and remove the uncompressed file"""
+    with open(path, "rb") as fin, gzip.open(path + ".gz", "wb") as fout:
+        shutil.copyfileobj(fin, fout)
+    os.unlink(path)
+
+
+class InstanceConsole:
+    """Console state of a single instance"""
+
+    def __init__(self, uuid):
+        self.uuid = uuid
+        self.name = uuid
+        self.tail = []
+        self.expected_new = MIN_NEW_LINES
+        self.offset = 0
+        self.path = None
+        self.requests = 0
+        self.api_seconds = 0.0
+        self.last_latency = 0.0
+        self.bytes_fetched = 0
+        self.bytes_written = 0
+        self.lines = 0
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_written": self.bytes_written,
+            "lines": self.lines,
+            "offset": self.offset,
+            "last_latency": round(self.last_latency, 3),
+            "avg_latency": round(self.api_seconds / max(self.requests, 1), 3),
+        }
+
+
+class ConsolePoller:
+    """Poll the serial consoles of a set of instances"""
+
+    def __init__(
+        self,
+        cloud,
+        instance_uuids,
+        overlap_lines,
+        max_concurrency,
+        output_dir=None,
+        rotate_bytes=0,
+    ):
+        self.conn = openstack.connect(cloud=cloud)
+        self.overlap_lines = overlap_lines
+        self.output_dir = output_dir
+        self.rotate_bytes = rotate_bytes
+        self.executor = futures.ThreadPoolExecutor(max_workers=max_concurrency)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.consoles = [InstanceConsole(x) for x in instance_uuids]
+
+    async def _call(self, func, *args, **kwargs):
+        """Run a blocking openstacksdk call in the thread pool"""
+        async with self.semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: func(*args, **kwargs)
+            )
+
+    async def _console_lines(self, console, length):
+        """Fetch the last length console lines, all lines if length is None"""
+        start = time.monotonic()
+        output = await self._call(
+            self.conn.compute.get_server_console_output, console.uuid, length=length
+        )
+        console.last_latency = time.monotonic() - start
+        console.api_seconds += console.last_latency
+        console.requests += 1
+        output = output.get("output") or ""
+        console.bytes_fetched += len(output.encode())
+        return output.splitlines()
+
+    async def _setup(self, console):
+        """Resolve the instance name and resume from an existing log file"""
+        try:
+            server = await self._call(self.conn.compute.get_server, console.uuid)
+            console.name = server.name
+        except exceptions.SDKException:
+            pass
+
+        if self.output_dir:
+            console.path = os.path.join(self.output_dir, f"{console.name}.log")
+            console.tail, console.offset = _read_tail(console.path, self.overlap_lines)
+
+    async def _rotate(self, console):
+        """Rotate and compress the log file of an instance"""
+        rotated = os.path.join(
+            self.output_dir,
+            "{}-{}.log".format(console.name, time.strftime("%Y%m%d-%H%M%S")),
+        )
+        os.rename(console.path, rotated)
+        console.offset = 0
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, _compress, rotated
+        )
+
+    async def _write(self, console, lines):
+        """Write new console lines to the log file or stdout"""
+        if not console.path:
+            for line in lines:
+                print(f"[{console.name}] {line}", flush=True)
+            return
+
+        data = "".join(line + "\n" for line in lines).encode()
+        with open(console.path, "ab") as f:
+            f.write(data)
+        console.offset += len(data)
+        console.bytes_written += len(data)
+        if self.rotate_bytes and console.offset >= self.rotate_bytes:
+            await self._rotate(console)
+
+    async def poll_instance(self, console):
+        """Fetch and write the new console lines of an instance
+
+        The requested tail is sized by the number of new lines seen in the
+        previous poll plus overlap_lines of context for the diff, so the
+        bytes fetched follow the new output rather than the console size.
+        """
+        if console.tail:
+            length = self.overlap_lines + console.expected_new
+        else:
+            length = None
+
+        while True:
+            lines = await self._console_lines(console, length)
+            complete = length is None or len(lines) < length
+            new_lines = find_new_lines(console.tail, lines, complete)
+            if new_lines is not None:
+                break
+            # More new lines than requested, widen the tail
+            length = length * 4 if length * 4 < MAX_TAIL_LINES else None
+
+        console.tail = lines[-self.overlap_lines :]
+        console.expected_new = max(len(new_lines), MIN_NEW_LINES)
+        console.lines += len(new_lines)
+        if new_lines:
+            await self._write(console, new_lines)
+
+    async def poll_round(self):
+        """Poll all instances concurrently"""
+        results = await asyncio.gather(
+            *(self.poll_instance(x) for x in self.consoles),
+            return_exceptions=True,
+        )
+        for console, result in zip(self.consoles, results):
+            if isinstance(result, Exception):
+                print(
+                    f"Failed to poll console of {console.name}: {result}",
+                    file=sys.stderr,
+                    flush=True,
+                )
+
+    def report(self):
+        """Print per-instance stats and write them to stats.json"""
+        stats = {x.uuid: x.stats() for x in self.consoles}
+        for s in stats.values():
+            print(
+                "[stats] {name}: {requests} requests, {bytes_fetched} bytes "
+                "fetched, {bytes_written} bytes written, latency "
+                "{last_latency}s (avg {avg_latency}s)".format(**s),
+                flush=True,
+            )
+
+        if self.output_dir:
+            tmp_path = os.path.join(self.output_dir, ".stats.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, os.path.join(self.output_dir, "stats.json"))
+
+    async def run(self, poll_interval, stats_interval):
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        await asyncio.gather(*(self._setup(x) for x in self.consoles))
+
+        last_report = time.monotonic()
+        while True:
+            start = time.monotonic()
+            await self.poll_round()
+            if stats_interval and start - last_report >= stats_interval:
+                self.report()
+                last_report = start
+            await asyncio.sleep(max(poll_interval - (time.monotonic() - start), 0))
+
+
+def main():
+    instance_uuids = [
+        x.strip() for x in os.environ.get("INSTANCE_UUIDS", "").split(",") if x.strip()
+    ]
+    if not instance_uuids:
+        print("INSTANCE_UUIDS is not set", file=sys.stderr)
+        sys.exit(1)
+
+    async def _run():
+        poller = ConsolePoller(
+            os.environ.get("OS_CLOUD"),
+            instance_uuids,
+            int(os.environ.get("OVERLAP_LINES", "20")),
+            int(os.environ.get("MAX_CONCURRENCY", "10")),
+            output_dir=os.environ.get("OUTPUT_DIR") or None,
+            rotate_bytes=int(os.environ.get("ROTATE_BYTES", "10485760")),
+        )
+        await poller.run(
+            int(os.environ.get("POLL_INTERVAL", "5")),
+            int(os.environ.get("STATS_INTERVAL", "60")),
+        )
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()